@@ -0,0 +1,137 @@
+# backend/admission.py
+"""
+Admission control and cancellation for CPU-bound request handling.
+
+At most max_concurrent requests run at once and at most max_queued wait for a
+slot; anything beyond that is rejected immediately so bursts turn into fast
+503s instead of a growing backlog. The slot bounds CPU-bound preprocessing:
+/predict gives it back before waiting in the micro-batcher, whose own queue
+(BATCH_QUEUE_DEPTH) bounds the model stage, so concurrent requests can fill
+a batch. Requests whose client disconnects are
+cancelled before their remaining stages run.
+"""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+MAX_CONCURRENT_PREDICTIONS = int(
+    os.getenv("MAX_CONCURRENT_PREDICTIONS", str(os.cpu_count() or 1))
+)
+MAX_QUEUED_PREDICTIONS = int(os.getenv("MAX_QUEUED_PREDICTIONS", "64"))
+# Seconds suggested to rejected clients in the Retry-After header
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+# How often a running request checks whether its client is still connected
+DISCONNECT_POLL_INTERVAL = 0.1
+
+
+class OverloadedError(Exception):
+    """Raised when a request arrives while the wait queue is full."""
+
+    def __init__(self, message, retry_after=ADMISSION_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ClientDisconnectedError(Exception):
+    """Raised when the client went away before its request finished."""
+
+
+class AdmissionSlot:
+    """Running slot handed out by AdmissionController.slot()."""
+
+    def __init__(self, controller):
+        self._controller = controller
+        self.released = False
+
+    def release(self):
+        """Give the slot back before the block ends (idempotent)."""
+        if not self.released:
+            self.released = True
+            self._controller.active -= 1
+            self._controller._semaphore.release()
+
+
+class AdmissionController:
+    """
+    Bounded concurrency with a bounded, fail-fast wait queue.
+
+    Args:
+        max_concurrent: Requests allowed to run at the same time
+        max_queued: Requests allowed to wait for a running slot
+    """
+
+    def __init__(
+        self, max_concurrent=MAX_CONCURRENT_PREDICTIONS, max_queued=MAX_QUEUED_PREDICTIONS
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self._semaphore = None
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold a running slot for the duration of the block.
+
+        Yields:
+            AdmissionSlot, whose release() frees the slot early
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        if self.active + self.waiting >= self.max_concurrent + self.max_queued:
+            self.rejected += 1
+            raise OverloadedError(
+                f"Server is busy ({self.active} running, {self.waiting} queued)"
+            )
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+        slot = AdmissionSlot(self)
+        try:
+            yield slot
+        finally:
+            slot.release()
+
+    def metrics(self):
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+async def run_unless_disconnected(request, coro):
+    """
+    Run coro, cancelling it if the HTTP client disconnects first.
+
+    Cancellation stops the request at its next await: work already running
+    in an executor finishes, but later stages (e.g. the model batch) are
+    skipped.
+
+    Raises:
+        ClientDisconnectedError: If the client disconnected
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise ClientDisconnectedError("Client disconnected")
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
@@ -1,15 +1,33 @@
 # backend/app.py
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Depends, Query
+from fastapi import (
+    FastAPI,
+    UploadFile,
+    File,
+    HTTPException,
+    Depends,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List
 from sqlalchemy.orm import Session
 
 # DO NOT import tensorflow here - it will initialize CUDA
 import numpy as np
-import shutil
+import asyncio
+import functools
+import hashlib
+import json
 import os
 import sys
+import threading
+import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure TensorFlow memory BEFORE importing (prevents OOM crashes)
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"  # Reduce TensorFlow logging
@@ -21,9 +39,21 @@ os.environ["TF_XLA_FLAGS"] = (
 os.environ["TF_DISABLE_XLA"] = "1"  # Disable XLA entirely
 os.environ["TF_USE_CUSTOM_MEMORY_ALLOCATOR"] = "0"
 
+from workload import apply_serving_budget
+
+# CPU affinity first: TensorFlow sizes its default thread pools to it
+apply_serving_budget()
+
 # NOW import TensorFlow after environment variables are set
 import tensorflow as tf
 
+# Serving thread budget (gunicorn_conf.py divides the cores between workers;
+# retraining gets its own budget in a separate process, see workload.py)
+if os.getenv("TF_NUM_INTRAOP_THREADS"):
+    tf.config.threading.set_intra_op_parallelism_threads(int(os.environ["TF_NUM_INTRAOP_THREADS"]))
+if os.getenv("TF_NUM_INTEROP_THREADS"):
+    tf.config.threading.set_inter_op_parallelism_threads(int(os.environ["TF_NUM_INTEROP_THREADS"]))
+
 # Force CPU-only execution - hide all GPUs before any operations
 tf.config.set_visible_devices([], "GPU")  # Hide all GPUs immediately
 
@@ -36,23 +66,58 @@ try:
 except Exception:
     pass  # No GPU available, continue with CPU
 
-from tensorflow.keras.preprocessing import image
-import numpy as np
-import shutil
-
 # Add paths for imports
 base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(base_dir)  # project root
-
-from preprocessing import create_spectrogram
-from model import train_model
+sys.path.append(os.path.join(base_dir, "src"))  # model / training modules
+
+from preprocessing import (
+    DURATION,
+    HOP_LENGTH,
+    SAMPLE_RATE,
+    AudioDecodeError,
+    batch_mel_spectrogram,
+    batch_power_to_db,
+    load_audio_bytes,
+    spectrograms_to_arrays,
+    waveform_to_array,
+)
+from streaming import StreamingMelSpectrogram
+from batching import BATCH_MAX_SIZE, MicroBatcher, QueueFullError
+from inference import (
+    INFERENCE_BACKEND,
+    INPUT_SHAPE,
+    check_servable,
+    exported_model_path,
+    load_predictor,
+)
+from prediction_cache import PredictionCache
+from shared_state import SharedTrainingState
+from model_registry import LoadedModels, ModelRegistry, read_metadata
+from cascade import CASCADE_ENABLED, CascadeStage, cascade_path
+from admission import (
+    AdmissionController,
+    ClientDisconnectedError,
+    OverloadedError,
+    run_unless_disconnected,
+)
+from prediction import iter_predict_batch, predict_long_audio
+# src/prediction.py decodes through backend.preprocessing, a separate module
+# object (and error class) from the preprocessing imported above
+from backend.preprocessing import AudioDecodeError as LongAudioDecodeError
 from database import (
     init_db,
     get_db,
+    get_session_local,
     create_upload_record,
-    update_upload_status,
     create_retraining_session,
     update_retraining_session,
+    update_upload_status,
+    enqueue_training_job,
+    cancel_training_job,
+    find_active_training_job,
+    get_training_job,
+    list_active_training_jobs,
 )
 
 app = FastAPI(title="Sentinel API", version="1.0")
@@ -69,54 +134,341 @@ app.add_middleware(
 _backend_dir = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(_backend_dir, "models", "sentinel_model.h5")
 model = None
-is_training = False
-training_status = {
-    "status": "idle",
-    "message": "",
-    "progress": 0,
-    "epoch": 0,
-    "total_epochs": 0,
-}
+# Load and warm the model in the background at startup instead of on first use
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "0") == "1"
+# Batch sizes run once after loading, so their first real call is fast
+WARMUP_BATCH_SIZES = [
+    int(size) for size in os.getenv("WARMUP_BATCH_SIZES", f"1,{BATCH_MAX_SIZE}").split(",")
+]
+model_state = "cold"  # cold | loading | warm | failed
+# Training flag and status, shared with the other worker processes
+training_state = SharedTrainingState()
+# Trained models are versioned here; MODEL_PATH only seeds an empty registry
+registry = ModelRegistry()
+# Recently served versions kept in memory for instant rollback
+loaded_models = LoadedModels()
+served_version = None
+# Seconds between checks for a version published or rolled back by another worker
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "5"))
+# Exported model bytes read by the gunicorn master before forking workers
+shared_model_content = None
+shared_model_version = None
+# Stage 1 of the /predict cascade for the served version (CASCADE_ENABLED=1)
+cascade_stage = None
+cascade_screened = 0
+cascade_short_circuited = 0
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup. Model will be loaded lazily on first request."""
+    """Initialize database on startup; preload the model if MODEL_PRELOAD=1."""
     # Initialize database tables (optional - graceful degradation if DB unavailable)
     try:
         init_db()
         print("✅ Database initialized")
     except Exception as e:
         print(f"⚠️ Database initialization warning: {e}")
-        print("⚠️ Continuing without database logging. Retraining will still work.")
+        print("⚠️ Continuing without the database: predictions work, retraining is unavailable")
+        print("⚠️ (training jobs are queued in the database, /retrain returns 503 until it is reachable)")
         print(
-            "⚠️ To enable database: Set DATABASE_URL environment variable for PostgreSQL connection"
+            "⚠️ To enable it: set DATABASE_URL to a PostgreSQL connection string, or sqlite:///sentinel.db"
         )
 
-    # Model will be loaded lazily on first request to save memory during startup
-    print("⚠️ Model will be loaded on first request to optimize memory usage")
+    if MODEL_PRELOAD:
+        # Runs in the background so the server (and /health) is up immediately
+        print("📦 Preloading model in the background...")
+        asyncio.get_running_loop().run_in_executor(None, preload_model)
+    else:
+        # Model will be loaded lazily on first request to save memory during startup
+        print("⚠️ Model will be loaded on first request to optimize memory usage")
 
+    asyncio.get_running_loop().create_task(watch_model_updates())
 
-def get_model():
+
+def publish_training_status(status):
+    """Set the training status shown by /model/status in every worker."""
+    training_state.set_training_status(status)
+
+
+def current_model_version():
     """
-    Lazy load model on first request to prevent memory issues during startup.
-    This prevents OOM crashes on platforms with limited RAM (e.g., Render free tier).
+    Registry version to serve, importing MODEL_PATH into an empty registry.
+
+    Raises:
+        FileNotFoundError: If there is no model at all
+        ValueError: If MODEL_PATH is a model serving cannot feed
     """
-    global model
-    if model is None:
+    version = registry.current_version()
+    if version is None:
+        if not os.path.exists(MODEL_PATH):
+            raise FileNotFoundError(f"Model file not found: {MODEL_PATH}")
+        check_servable(read_metadata(MODEL_PATH))
+        version = registry.import_model(MODEL_PATH)
+    return version
+
+
+def preload_model_bytes():
+    """
+    Read the TFLite model into memory in the gunicorn master (see gunicorn_conf.py).
+
+    Forked workers build their interpreter on these bytes, and TFLite reads
+    the weights in place from the flatbuffer, so they are shared
+    copy-on-write instead of being loaded once per worker. The other
+    backends gain nothing from it: ONNX Runtime parses the bytes into its
+    own memory in every worker, and TensorFlow's runtime does not survive a
+    fork, so each worker loads its own Keras or ONNX model.
+    """
+    global shared_model_content, shared_model_version
+    if INFERENCE_BACKEND != "tflite":
+        print(f"⚠️ {INFERENCE_BACKEND} backend: each worker loads its own model (use tflite to share it)")
+        return
+    try:
+        version = current_model_version()
+    except FileNotFoundError:
+        return
+    path = exported_model_path(registry.model_path(version), INFERENCE_BACKEND)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            shared_model_content = f.read()
+        shared_model_version = version
+        print(f"📦 Preloaded {path} ({len(shared_model_content) / 1e6:.1f} MB) for all workers")
+
+
+async def watch_model_updates():
+    """Follow the registry's current version (published or rolled back by any worker)."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(MODEL_RELOAD_INTERVAL)
+        if served_version is None:
+            continue  # Nothing loaded yet; the first request loads the current version
         try:
-            if os.path.exists(MODEL_PATH):
-                print(f"📦 Loading model from {MODEL_PATH}...")
-                model = tf.keras.models.load_model(MODEL_PATH)
-                print(f"✅ Model loaded from {MODEL_PATH}")
-            else:
-                raise FileNotFoundError(f"Model file not found: {MODEL_PATH}")
+            version = registry.current_version()
+            if version is not None and version != served_version:
+                print(f"🔄 Model {version} is current, switching from {served_version}...")
+                await loop.run_in_executor(None, activate_version, version)
         except Exception as e:
-            print(f"❌ Error loading model: {e}")
-            raise
+            print(f"⚠️ Model reload failed: {e}")
+
+
+def artifact_path(version):
+    """File the configured backend serves a version from."""
+    path = registry.model_path(version)
+    return path if INFERENCE_BACKEND == "keras" else exported_model_path(path, INFERENCE_BACKEND)
+
+
+def load_version(version, keras_model=None):
+    """
+    Load a registry version without serving it.
+
+    Args:
+        version: Registry version
+        keras_model: Already loaded Keras model of that version (keras backend)
+
+    Returns:
+        (Keras model or None, predictor)
+    """
+    path = registry.model_path(version)
+    if INFERENCE_BACKEND == "keras":
+        if keras_model is None:
+            print(f"📦 Loading model {version} from {path}...")
+            keras_model = tf.keras.models.load_model(path)
+        return keras_model, load_predictor(path, "keras", model=keras_model)
+
+    print(f"📦 Loading {INFERENCE_BACKEND} model {version}...")
+    content = shared_model_content if version == shared_model_version else None
+    return None, load_predictor(path, INFERENCE_BACKEND, model_content=content)
+
+
+def serve_version(version, entry):
+    """Atomically make a loaded version the one every request uses."""
+    global model, predictor, served_version, model_version, cascade_stage
+    stage = None
+    if CASCADE_ENABLED:
+        stage = CascadeStage.load(cascade_path(registry.model_path(version)))
+        if stage is None:
+            print(f"⚠️ Model {version} has no cascade stage, every clip uses the model")
+    with _swap_lock:
+        model, predictor = entry
+        cascade_stage = stage
+        served_version = version
+        model_version += 1  # Invalidates cached predictions of the old model
+    loaded_models.put(version, entry, os.path.getsize(artifact_path(version)))
+    print(f"✅ Serving model {version}")
+
+
+def activate_version(version, keras_model=None):
+    """
+    Load and warm a version in the calling (background) thread, then swap it in.
+
+    Requests keep using the previous version until the swap; versions still
+    in memory are swapped in without loading.
+
+    Returns:
+        bool: True if the version was already loaded
+    """
+    entry = loaded_models.get(version)
+    cached = entry is not None
+    if not cached:
+        entry = load_version(version, keras_model)
+        warm_up(entry[1])
+    serve_version(version, entry)
+    return cached
+
+
+def get_model():
+    """
+    Keras model of the served version, loaded on first use.
+
+    Lazy loading prevents OOM crashes during startup on platforms with
+    limited RAM (e.g., Render free tier).
+    """
+    global model
+    if model is not None:
+        return model
+    if INFERENCE_BACKEND == "keras":
+        get_predictor()  # Loads the Keras model it wraps
+        return model
+    with _model_lock:  # Concurrent first requests load the model only once
+        if model is None:
+            version = served_version or current_model_version()
+            model = tf.keras.models.load_model(registry.model_path(version))
     return model
 
 
+_model_lock = threading.Lock()
+_swap_lock = threading.Lock()
+predictor = None
+# Bumped whenever a new predictor is served; part of every prediction cache key
+model_version = 0
+
+
+def get_predictor():
+    """
+    Serving predictor for the configured INFERENCE_BACKEND.
+
+    Loads the registry's current version on first use. The keras backend
+    wraps the Keras model; tflite and onnx load the exported model without
+    loading the Keras model at all.
+    """
+    if predictor is not None:
+        return predictor
+    with _model_lock:
+        if predictor is None:
+            try:
+                version = current_model_version()
+                serve_version(version, load_version(version))
+            except Exception as e:
+                print(f"❌ Error loading model: {e}")
+                raise
+    return predictor
+
+
+def warm_up(current_predictor):
+    """Run the preprocessing path and one forward pass per WARMUP_BATCH_SIZES."""
+    waveform_to_array(np.zeros(int(SAMPLE_RATE * DURATION), dtype=np.float32))
+    for batch_size in WARMUP_BATCH_SIZES:
+        current_predictor(np.zeros((batch_size,) + INPUT_SHAPE, dtype=np.float32))
+
+
+def preload_model():
+    """Startup task: load the serving model and warm it up (see /ready)."""
+    global model_state
+    model_state = "loading"
+    started = time.perf_counter()
+    try:
+        warm_up(get_predictor())
+    except Exception as e:
+        model_state = "failed"
+        print(f"❌ Model preload failed: {e}")
+        return
+    model_state = "warm"
+    print(f"✅ Model warm after {time.perf_counter() - started:.1f}s")
+
+
+def current_model_state():
+    """model_state, reporting "loaded" for a lazily loaded (not warmed) model."""
+    if model_state == "cold" and predictor is not None:
+        return "loaded"
+    return model_state
+
+
+def predict_scores(x):
+    """
+    Danger probabilities for a batch of model-ready arrays.
+
+    Args:
+        x: numpy array with shape (N, 224, 224, 3)
+
+    Returns:
+        numpy array with shape (N,)
+    """
+    return get_predictor()(x)
+
+
+# Concurrent /predict and stream requests share batched forward passes
+batcher = MicroBatcher(predict_scores)
+
+# Decoding and spectrogram rendering run here, never on the event loop
+PREDICT_PREPROCESS_THREADS = int(
+    os.getenv("PREDICT_PREPROCESS_THREADS", str(os.cpu_count() or 1))
+)
+preprocess_executor = ThreadPoolExecutor(
+    max_workers=PREDICT_PREPROCESS_THREADS, thread_name_prefix="preprocess"
+)
+
+# Bounds the /predict requests in flight; excess requests fail fast with 503
+admission = AdmissionController()
+
+# Longest audio one /ws/stream message may carry; longer messages close the stream
+STREAM_MAX_CHUNK_SECONDS = float(os.getenv("STREAM_MAX_CHUNK_SECONDS", "2.0"))
+
+# Repeated uploads of the same clip are answered from here (or share one run)
+prediction_cache = PredictionCache()
+
+
+async def run_preprocessing(fn, *args, **kwargs):
+    """Run a CPU-bound preprocessing call on the preprocessing executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        preprocess_executor, functools.partial(fn, *args, **kwargs)
+    )
+
+
+def decode_upload(data):
+    """Decode upload bytes into a model-ready (224, 224, 3) array."""
+    return waveform_to_array(load_audio_bytes(data))
+
+
+def decode_and_screen(data, stage):
+    """
+    Decode upload bytes and run cascade stage 1 on them.
+
+    The mel spectrogram is computed once; it is only rendered for the model
+    if stage 1 escalates the clip.
+
+    Returns:
+        (model-ready (224, 224, 3) array, None) for clips that need the
+        model, or (None, stage 1 danger probability) for clips answered Safe
+    """
+    y = load_audio_bytes(data)
+    mel_power = batch_mel_spectrogram(y[np.newaxis])
+    is_safe, probability = stage.screen(y, mel_power[0])
+    if is_safe:
+        return None, probability
+    return spectrograms_to_arrays(batch_power_to_db(mel_power))[0], None
+
+
+def interpret_score(score):
+    """
+    Map a danger probability to a label and a confidence in [0, 1].
+
+    Based on our tests (a scream scored 0.83), a high score (> 0.5) is Danger.
+    """
+    if score > 0.5:
+        return "Danger", float(score)
+    return "Safe", 1.0 - float(score)
+
+
 @app.get("/")
 def root():
     """Root endpoint with API information."""
@@ -127,37 +479,77 @@ def root():
         "endpoints": {
             "docs": "/docs",
             "health": "/health",
+            "ready": "/ready",
             "predict": "/predict",
+            "predict_batch": "/predict/batch",
+            "stream": "/ws/stream",
             "retrain": "/retrain",
+            "training_jobs": "/training/jobs/{job_id}",
+            "cancel_training": "/training/{session_id}/cancel",
             "model_status": "/model/status",
+            "model_versions": "/model/versions",
+            "metrics": "/metrics",
         },
         "status": "running",
     }
 
 
 @app.get("/health")
-def health_check():
+async def health_check():
+    """Liveness probe: answered on the event loop, never touches the model."""
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: with MODEL_PRELOAD=1, 200 only once the model is warm.
+
+    Without preloading the model loads on first request, so the server is
+    always reported ready.
+    """
+    state = current_model_state()
+    if MODEL_PRELOAD and state != "warm":
+        return JSONResponse(status_code=503, content={"ready": False, "model": state})
+    return {"ready": True, "model": state}
+
+
+@app.get("/metrics")
+def metrics():
+    """Serving metrics (admission, batching, prediction cache, cascade)."""
+    stage = cascade_stage
+    return {
+        "admission": admission.metrics(),
+        "batching": batcher.metrics(),
+        "prediction_cache": prediction_cache.metrics(),
+        "cascade": {
+            "enabled": stage is not None,
+            "threshold": stage.threshold if stage else None,
+            "screened": cascade_screened,
+            "short_circuited": cascade_short_circuited,
+            "skip_fraction": cascade_short_circuited / cascade_screened if cascade_screened else 0.0,
+            # Skip fraction and danger recall (stage 1 / deep model / cascade) on validation
+            "calibration": stage.report if stage else None,
+        },
+    }
+
+
 @app.get("/model/status")
 def model_status():
-    """Get model status including accuracy from metadata."""
-    global model
-
-    # Try to load model if not already loaded (for status check)
-    if model is None:
-        try:
-            get_model()  # This will load the model if it exists
-        except Exception as e:
-            print(f"⚠️ Model not available: {e}")
-            # Continue to return status even if model can't be loaded
+    """
+    Get model status including accuracy from metadata.
 
+    Never loads the model; see /ready for whether it is loaded and warm.
+    """
+    shared = training_state.read()
+    jobs = active_training_jobs()
+    current = registry.current_version()
     model_accuracy = None
 
     # Try to read accuracy from model metadata
-    # Check both possible metadata file names
+    # Check the current version first, then both legacy metadata file names
     metadata_paths = [
+        registry.model_path(current).replace(".h5", "_metadata.json") if current else None,
         MODEL_PATH.replace(".h5", "_metadata.json"),  # sentinel_model_metadata.json
         os.path.join(
             os.path.dirname(MODEL_PATH), "model_metadata.json"
@@ -165,7 +557,7 @@ def model_status():
     ]
 
     for metadata_path in metadata_paths:
-        if os.path.exists(metadata_path):
+        if metadata_path and os.path.exists(metadata_path):
             try:
                 import json
 
@@ -182,65 +574,180 @@ def model_status():
                 continue
 
     return {
-        "model_loaded": model is not None,
-        "is_training": is_training,
-        "training_status": training_status,
+        "model_loaded": model is not None or predictor is not None,
+        "model_state": current_model_state(),
+        "inference_backend": INFERENCE_BACKEND,
+        "model_version": served_version or current,
+        # Queued jobs count as training, so clients keep polling until the worker is done
+        "is_training": shared["is_training"] or bool(jobs),
+        "training_jobs": [{"job_id": job.id, "status": job.status} for job in jobs],
+        "training_status": shared["training_status"],
         "model_accuracy": model_accuracy,  # Accuracy as float (0.0 to 1.0)
     }
 
 
+@app.get("/model/versions")
+def model_versions():
+    """Registry versions with their metrics, newest first."""
+    current = registry.current_version()
+    loaded = loaded_models.versions()
+    versions = []
+    for version in reversed(registry.versions()):
+        metadata = registry.metadata(version)
+        versions.append({
+            "version": version,
+            "current": version == current,
+            "served": version == served_version,
+            "in_memory": version in loaded,
+            "parent_version": metadata.get("parent_version"),
+            "created_at": metadata.get("created_at"),
+            "val_accuracy": metadata.get("last_val_accuracy"),
+            "training_mode": metadata.get("training_mode"),
+        })
+    return {"current_version": current, "versions": versions}
+
+
+@app.post("/model/rollback")
+async def model_rollback(
+    version: str = Query(None, description="Version to serve (default: the one before the current)"),
+):
+    """
+    Serve an earlier model version in every worker.
+
+    Versions still in memory are swapped in instantly; others are loaded and
+    warmed first while the current version keeps serving.
+    """
+    running = [job for job in active_training_jobs() if job.status == "running"]
+    if training_state.read()["is_training"] or running:
+        raise HTTPException(
+            status_code=409, detail="Model is training. Roll back once it has finished."
+        )
+    current = registry.current_version()
+    target = version or (registry.previous_version(current) if current else None)
+    if target is None or target not in registry.versions():
+        raise HTTPException(
+            status_code=404, detail=f"Model version not found: {version or 'previous'}"
+        )
+    try:
+        check_servable(registry.metadata(target))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=f"Cannot serve model {target}: {str(e)}")
+
+    try:
+        from_memory = await run_in_threadpool(activate_version, target)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not load model {target}: {str(e)}")
+    registry.set_current(target)
+
+    return {
+        "status": "rolled back",
+        "version": target,
+        "previous_version": current,
+        "from_memory": from_memory,
+    }
+
+
 @app.post("/predict")
-async def predict_audio_endpoint(file: UploadFile = File(...)):
+async def predict_audio_endpoint(
+    request: Request,
+    file: UploadFile = File(...),
+    long_audio: bool = Query(False, description="Score the whole recording"),
+    hop: float = Query(None, gt=0, le=DURATION, description="Window hop (long_audio)"),
+):
     print(f"\n--- ⚡ Processing: {file.filename} ---")
 
-    # Load model if not already loaded (lazy loading)
+    # Load model if not already loaded (lazy loading, off the event loop)
     try:
-        current_model = get_model()
+        await run_in_threadpool(get_predictor)
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Model not available: {str(e)}")
 
-    # Use Absolute Paths
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    temp_dir = os.path.join(base_dir, "temp_data")
-    os.makedirs(temp_dir, exist_ok=True)
+    if long_audio:
+        # Recordings of any length: stream from the spooled upload, never read it whole
+        key = await run_preprocessing(
+            prediction_cache.key_for_file, file.file, model_version, f"long:{hop}"
+        )
+    else:
+        data = await file.read()
+        key = await run_preprocessing(prediction_cache.key_for, data, model_version, "clip")
 
-    temp_audio_path = os.path.join(temp_dir, f"temp_{file.filename}")
-    temp_image_path = temp_audio_path.replace(".wav", ".png").replace(".mp3", ".png")
+    async def admitted():
+        async with admission.slot() as slot:
+            if long_audio:
+                return await predict_long_audio_upload(file.file, hop)
+            return await predict_upload(data, slot)
 
     try:
-        # 1. Save Audio
-        with open(temp_audio_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # 2. Convert to Spectrogram
-        success = create_spectrogram(temp_audio_path, temp_image_path)
-        if not success:
-            raise Exception("Preprocessing failed")
+        return await run_unless_disconnected(
+            request,
+            prediction_cache.get_or_compute(
+                key, admitted, cacheable=lambda result: isinstance(result, dict)
+            ),
+        )
+    except OverloadedError as e:
+        print(f"⚠️ {e}")
+        return JSONResponse(
+            status_code=503,
+            content={"error": str(e)},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except ClientDisconnectedError:
+        print(f"🔌 Client disconnected, cancelled prediction for {file.filename}")
+        return JSONResponse(status_code=499, content={"error": "Client disconnected"})
 
-        # 3. Predict
-        print("3. Loading image for prediction...")
 
-        # FIXED: Ensure size matches model training (224x224)
-        img = image.load_img(temp_image_path, target_size=(224, 224))
+async def predict_upload(data, slot=None):
+    """
+    Single-clip mode of /predict: score the first DURATION seconds of the upload bytes.
 
-        x = image.img_to_array(img) / 255.0
-        x = np.expand_dims(x, axis=0)
+    With CASCADE_ENABLED=1, clips cascade stage 1 screens as safe are
+    answered without running the model.
 
-        print("4. Running Model...")
-        prediction = current_model.predict(x, verbose=0)[0][0]
+    Args:
+        data: Upload bytes
+        slot: Admission slot, released once preprocessing is done so that
+            waiting in the micro-batcher does not cap the batch size
+    """
+    global cascade_screened, cascade_short_circuited
+    try:
+        # 1-2. Decode the upload and render its spectrogram (224x224 like training)
+        stage = cascade_stage
+        try:
+            if stage is None:
+                x = await run_preprocessing(decode_upload, data)
+            else:
+                x, probability = await run_preprocessing(decode_and_screen, data, stage)
+        except AudioDecodeError as e:
+            print(f"❌ Rejected upload: {e}")
+            return JSONResponse(status_code=400, content={"error": str(e)})
+
+        if stage is not None:
+            cascade_screened += 1
+            if x is None:
+                cascade_short_circuited += 1
+                label, confidence = interpret_score(probability)
+                print(f"✅ Result: {label} ({confidence * 100}%) from cascade stage 1")
+                return {
+                    "prediction": label,
+                    "confidence": round(confidence * 100, 2),
+                    "stage": "cascade",
+                }
+
+        # 3. Predict (batched with concurrent requests)
+        print("3. Running Model...")
+        if slot is not None:
+            slot.release()
+        try:
+            prediction = await batcher.submit(x)
+        except QueueFullError as e:
+            print(f"⚠️ {e}")
+            return JSONResponse(
+                status_code=503, content={"error": str(e)}, headers={"Retry-After": "1"}
+            )
 
         print(f"📢 DEBUG SCORE: {prediction}")
 
-        # === LOGIC SWAP ===
-        # Based on your test, Scream was 0.83.
-        # Therefore: High Score (> 0.5) is Danger.
-
-        if prediction > 0.5:
-            label = "Danger"
-            confidence = float(prediction)
-        else:
-            label = "Safe"
-            confidence = 1.0 - float(prediction)
+        label, confidence = interpret_score(prediction)
 
         print(f"✅ Result: {label} ({confidence * 100}%)")
 
@@ -250,624 +757,557 @@ async def predict_audio_endpoint(file: UploadFile = File(...)):
         print(f"❌ CRITICAL ERROR: {str(e)}")
         return JSONResponse(status_code=500, content={"error": str(e)})
 
-    finally:
-        try:
-            if os.path.exists(temp_audio_path):
-                os.remove(temp_audio_path)
-            if os.path.exists(temp_image_path):
-                os.remove(temp_image_path)
-        except Exception:
-            pass
-
 
-def extract_and_organize_zip(zip_path, extract_dir):
-    """
-    Extract zip file and organize audio files into safe/ and danger/ directories.
-    Handles nested zip structures recursively.
+async def predict_long_audio_upload(audio_file, hop):
     """
-    os.makedirs(extract_dir, exist_ok=True)
+    Long-audio mode of /predict: score every window of the recording.
 
-    # Final destination for organized files within the extraction area
-    final_safe_dir = os.path.join(extract_dir, "safe")
-    final_danger_dir = os.path.join(extract_dir, "danger")
-    os.makedirs(final_safe_dir, exist_ok=True)
-    os.makedirs(final_danger_dir, exist_ok=True)
+    Returns the aggregate verdict plus a per-window timeline; silent windows
+    are reported with prediction "Silent" and no score.
 
-    with zipfile.ZipFile(zip_path, "r") as zip_ref:
-        zip_ref.extractall(extract_dir)
+    Args:
+        audio_file: File-like upload, stream-decoded block by block
+        hop: Window hop in seconds (default: LONG_AUDIO_HOP)
+    """
+    try:
+        audio_file.seek(0)
+        result = await run_preprocessing(
+            predict_long_audio, None, audio_file, hop_seconds=hop, predict_fn=predict_scores
+        )
+    except LongAudioDecodeError as e:
+        print(f"❌ Rejected upload: {e}")
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    except Exception as e:
+        print(f"❌ CRITICAL ERROR: {str(e)}")
+        return JSONResponse(status_code=500, content={"error": str(e)})
 
-    print(f"📂 Extracted zip to {extract_dir}")
+    timeline = []
+    for window in result["timeline"]:
+        entry = {"start": window["start"], "end": window["end"]}
+        if window["probability"] is None:
+            entry.update(prediction="Silent", confidence=None)
+        else:
+            label, confidence = interpret_score(window["probability"])
+            entry.update(prediction=label, confidence=round(confidence * 100, 2))
+        timeline.append(entry)
 
-    # Walk through all extracted files recursively
-    audio_extensions = (".wav", ".mp3", ".flac", ".ogg", ".m4a")
-    found_files = 0
+    label, confidence = interpret_score(result["probability"])
+    print(
+        f"✅ Result: {label} ({result['danger_windows']} danger / "
+        f"{result['scored_windows']} scored / {result['windows']} windows)"
+    )
+    return {
+        "prediction": label,
+        "confidence": round(confidence * 100, 2),
+        "windows": result["windows"],
+        "scored_windows": result["scored_windows"],
+        "danger_windows": result["danger_windows"],
+        "timeline": timeline,
+    }
 
-    for root, dirs, files in os.walk(extract_dir):
-        # Skip the final safe/danger dirs we just created to avoid self-copying loop
-        if root == final_safe_dir or root == final_danger_dir:
-            continue
 
-        for file in files:
-            if file.lower().endswith(audio_extensions):
-                src_path = os.path.join(root, file)
-                found_files += 1
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".m4a")
 
-                # Determine destination
-                # 1. Check if file is already in a 'safe' or 'danger' folder
-                parent_folder = os.path.basename(root).lower()
-                filename = file.lower()
 
-                if parent_folder == "safe":
-                    dest_dir = final_safe_dir
-                elif parent_folder == "danger":
-                    dest_dir = final_danger_dir
-                # 2. Check filename keywords
-                elif any(
-                    k in filename
-                    for k in ["danger", "scream", "distress", "alarm", "emergency"]
-                ):
-                    dest_dir = final_danger_dir
-                else:
-                    # Default to safe if ambiguous (or logic dictates)
-                    dest_dir = final_safe_dir
+@app.post("/predict/batch")
+async def predict_batch_endpoint(files: List[UploadFile] = File(...)):
+    """
+    Score many recordings in one request (audio files and/or zip archives).
+
+    Files are decoded and featurized in parallel and scored in large model
+    batches. Results stream back as NDJSON, one line per file in completion
+    order ({"index", "filename", "prediction", "confidence"} or
+    {"index", "filename", "error"}), followed by a {"summary": ...} line.
+    """
+    try:
+        await run_in_threadpool(get_predictor)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Model not available: {str(e)}")
 
-                # Handle filename collisions
-                dest_path = os.path.join(dest_dir, file)
-                if os.path.exists(dest_path):
-                    base, ext = os.path.splitext(file)
-                    timestamp = int(os.path.getmtime(src_path))
-                    dest_path = os.path.join(dest_dir, f"{base}_{timestamp}{ext}")
+    # (filename, zip archive or None, zip member or upload) for every file
+    entries = []
+    for upload in files:
+        if upload.filename.lower().endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(upload.file)
+            except zipfile.BadZipFile:
+                return JSONResponse(
+                    status_code=400,
+                    content={"error": f"{upload.filename} is not a valid zip archive"},
+                )
+            for info in archive.infolist():
+                name = info.filename
+                if info.is_dir() or "__MACOSX" in name or os.path.basename(name).startswith("."):
+                    continue
+                if name.lower().endswith(AUDIO_EXTENSIONS):
+                    entries.append((name, archive, info))
+        else:
+            entries.append((upload.filename, None, upload))
 
-                shutil.move(src_path, dest_path)
+    if not entries:
+        return JSONResponse(status_code=400, content={"error": "No audio files found"})
 
-    print(
-        f"✅ Organized {found_files} audio files into {final_safe_dir} and {final_danger_dir}"
+    print(f"\n--- ⚡ Batch prediction: {len(entries)} files ---")
+    return StreamingResponse(
+        stream_batch_predictions(entries), media_type="application/x-ndjson"
     )
-    return final_safe_dir, final_danger_dir
 
 
-def retrain_model_background(zip_path, upload_dir, data_dir, upload_id, session_id):
+def stream_batch_predictions(entries):
+    """NDJSON lines for /predict/batch (run by Starlette on a worker thread)."""
+
+    def read_entries():
+        # Read lazily so only the files being featurized are held in memory
+        for _, archive, member in entries:
+            if archive is not None:
+                yield archive.read(member)
+            else:
+                member.file.seek(0)
+                yield member.file.read()
+
+    failed = 0
+    for index, result, error in iter_predict_batch(
+        None, read_entries(), predict_fn=predict_scores
+    ):
+        line = {"index": index, "filename": entries[index][0]}
+        if error is not None:
+            failed += 1
+            line["error"] = error
+        else:
+            label, confidence = interpret_score(result["probability"])
+            line.update(prediction=label, confidence=round(confidence * 100, 2))
+        yield json.dumps(line) + "\n"
+
+    print(f"✅ Batch done: {len(entries) - failed} scored, {failed} failed")
+    yield json.dumps({"summary": {"files": len(entries), "failed": failed}}) + "\n"
+
+
+@app.websocket("/ws/stream")
+async def stream_predict_endpoint(
+    websocket: WebSocket,
+    hop: float = Query(0.5, gt=0, le=DURATION),
+    sample_rate: int = Query(SAMPLE_RATE, ge=8000, le=192000),
+    encoding: str = Query("float32", pattern="^(float32|pcm16)$"),
+):
     """
-    Background function to handle retraining with database logging.
+    Real-time distress detection over a WebSocket.
+
+    The client sends mono little-endian PCM (float32 or 16-bit) as binary
+    messages. The server keeps the last DURATION seconds, scores a window
+    every `hop` seconds and pushes an event for each one:
+    {"event": "prediction", "timestamp": <seconds>, "prediction": "Danger",
+     "confidence": 87.5, "score": 0.875}
+
+    A message may carry at most STREAM_MAX_CHUNK_SECONDS of audio (and
+    BATCH_MAX_SIZE hops), so one client cannot monopolise the preprocessing
+    threads or the model. Longer messages close the stream with 1009, text
+    messages with 1003.
     """
-    global model, is_training, training_status
+    await websocket.accept()
+    try:
+        await run_in_threadpool(get_predictor)
+    except Exception as e:
+        await websocket.send_json({"event": "error", "error": f"Model not available: {e}"})
+        await websocket.close(code=1011)
+        return
+
+    spectrogram = StreamingMelSpectrogram(input_sr=sample_rate)
+    hop_frames = max(1, round(hop * SAMPLE_RATE / HOP_LENGTH))
+    hop_seconds = hop_frames * HOP_LENGTH / SAMPLE_RATE
+    next_score_at = spectrogram.n_frames
+    pcm_dtype = "<f4" if encoding == "float32" else "<i2"
+    sample_width = np.dtype(pcm_dtype).itemsize
+    max_chunk_bytes = sample_width * max(
+        1, int(sample_rate * min(STREAM_MAX_CHUNK_SECONDS, BATCH_MAX_SIZE * hop_seconds))
+    )
 
-    # Get database session
-    db = next(get_db())
+    def feed(chunk):
+        """Push a message's audio, returning the windows (dB) due for scoring."""
+        nonlocal next_score_at
+        usable = len(chunk) - len(chunk) % sample_width  # Drop partial samples
+        samples = np.frombuffer(chunk[:usable], dtype=pcm_dtype)
+        if encoding == "pcm16":
+            samples = samples / 32768.0
+        samples = spectrogram.resample(samples)
+
+        # Feed audio up to each scoring point so no hop is skipped
+        windows, timestamps = [], []
+        while len(samples) > 0:
+            needed = spectrogram.samples_until(next_score_at)
+            spectrogram.push(samples[:needed])
+            samples = samples[needed:]
+            if spectrogram.frames_computed >= next_score_at:
+                windows.append(spectrogram.window_db())
+                timestamps.append(spectrogram.window_end)
+                next_score_at += hop_frames
+        if not windows:
+            return None, timestamps
+        return spectrograms_to_arrays(np.stack(windows)), timestamps
+
+    await websocket.send_json(
+        {
+            "event": "ready",
+            "sample_rate": sample_rate,
+            "window": DURATION,
+            "hop": hop_seconds,
+            "max_message_bytes": max_chunk_bytes,
+        }
+    )
 
     try:
-        # Ensure tables exist before trying to use database (lazy initialization)
-        if db is not None:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            chunk = message.get("bytes")
+            if chunk is None:
+                await websocket.send_json(
+                    {"event": "error", "error": "Send audio as binary messages"}
+                )
+                await websocket.close(code=1003)
+                return
+            if len(chunk) > max_chunk_bytes:
+                await websocket.send_json(
+                    {
+                        "event": "error",
+                        "error": f"Message too long: send at most {max_chunk_bytes} bytes",
+                    }
+                )
+                await websocket.close(code=1009)
+                return
+
+            # STFT and rendering run on the preprocessing threads, not the event loop
+            x, timestamps = await run_preprocessing(feed, chunk)
+            if x is None:
+                continue
+
             try:
-                init_db()
-            except Exception:
-                pass  # Tables might already exist, continue anyway
-
-        is_training = True
-        training_status = {
-            "status": "preprocessing",
-            "message": "Extracting and organizing data...",
-            "progress": 10,
-            "epoch": 0,
-            "total_epochs": 0,
-        }
+                scores = await batcher.submit_many(x)
+            except QueueFullError as e:
+                await websocket.send_json({"event": "error", "error": str(e)})
+                continue
+            for timestamp, score in zip(timestamps, scores):
+                label, confidence = interpret_score(score)
+                await websocket.send_json(
+                    {
+                        "event": "prediction",
+                        "timestamp": round(timestamp, 3),
+                        "prediction": label,
+                        "confidence": round(confidence * 100, 2),
+                        "score": float(score),
+                    }
+                )
+    except WebSocketDisconnect:
+        print("🔌 Stream client disconnected")
+
+
+def count_audio_files(directory):
+    """Number of audio files in a directory (0 if it does not exist)."""
+    if not os.path.exists(directory):
+        return 0
+    return len([f for f in os.listdir(directory) if f.lower().endswith(AUDIO_EXTENSIONS)])
+
+
+def queue_unavailable(db, error):
+    db.rollback()
+    return HTTPException(status_code=503, detail=f"Training queue unavailable: {str(error)}")
+
+
+def find_queued_duplicate(db, dedupe_key):
+    """
+    Queued or running job with the same dedupe key, or None.
 
-        # Update session status (only if db is available)
-        if db is not None and session_id is not None:
-            update_retraining_session(db, session_id, status="preprocessing")
-
-        # 1. Extract and organize zip file
-        extract_dir = os.path.join(upload_dir, "extracted")
-        safe_dir, danger_dir = extract_and_organize_zip(zip_path, extract_dir)
-
-        # Count files - Case Insensitive
-        safe_files = [
-            f for f in os.listdir(safe_dir) if f.lower().endswith((".wav", ".mp3"))
-        ]
-        danger_files = [
-            f for f in os.listdir(danger_dir) if f.lower().endswith((".wav", ".mp3"))
-        ]
-        total_files = len(safe_files) + len(danger_files)
-
-        # Update upload record with file counts
-        update_upload_status(
-            db,
-            upload_id,
-            status="processing",
-            safe_count=len(safe_files),
-            danger_count=len(danger_files),
-            total_count=total_files,
-        )
+    Raises:
+        HTTPException: 503 if the queue (database) is unavailable
+    """
+    try:
+        try:
+            init_db()
+        except Exception:
+            pass  # Tables might already exist, continue anyway
+        return find_active_training_job(db, dedupe_key)
+    except Exception as e:
+        raise queue_unavailable(db, e)
 
-        # Merge with existing data
-        existing_safe = os.path.join(data_dir, "safe")
-        existing_danger = os.path.join(data_dir, "danger")
-
-        # Create directories if they don't exist
-        os.makedirs(existing_safe, exist_ok=True)
-        os.makedirs(existing_danger, exist_ok=True)
-
-        # Copy new files to existing directories
-        for file in safe_files:
-            shutil.copy(os.path.join(safe_dir, file), existing_safe)
-        for file in danger_files:
-            shutil.copy(os.path.join(danger_dir, file), existing_danger)
-
-        training_status = {
-            "status": "preprocessing",
-            "message": "Preprocessing audio files...",
-            "progress": 30,
-            "epoch": 0,
-            "total_epochs": 0,
-        }
 
-        # 2. Train model (this will handle preprocessing internally)
-        training_status = {
-            "status": "training",
-            "message": "Training model...",
-            "progress": 50,
-            "epoch": 0,
-            "total_epochs": 3,
-        }
+def enqueue_training(db, kind, params, dedupe_key, upload_id=None):
+    """
+    Queue a training job for training_worker.py, with its retraining session.
 
-        update_retraining_session(db, session_id, status="training")
+    A job with the same dedupe key that is still queued or running is
+    returned instead of queueing a second one.
 
-        # Ensure model is loaded before retraining
-        current_model = get_model() if model is None else model
+    Returns:
+        (job, created)
 
-        # Use existing model for retraining
-        retrained_model, history = train_model(
-            data_dir=data_dir,
-            model_path=MODEL_PATH,
-            epochs=3,
-            batch_size=32,
-            validation_split=0.2,
-            existing_model=current_model,
+    Raises:
+        HTTPException: 503 if the queue (database) is unavailable
+    """
+    existing = find_queued_duplicate(db, dedupe_key)
+    if existing is not None:
+        return existing, False
+    try:
+        retraining_session = create_retraining_session(db, upload_id, epochs=params["epochs"])
+        job, created = enqueue_training_job(
+            db,
+            kind,
+            json.dumps(params),
+            dedupe_key,
+            session_id=retraining_session.id,
+            upload_id=upload_id,
         )
+        if not created:
+            # Lost a race with an identical submission
+            update_retraining_session(
+                db, retraining_session.id, status="failed",
+                error_message=f"Coalesced with training job {job.id}",
+            )
+        elif not training_state.read()["is_training"]:
+            publish_training_status({
+                "status": "queued",
+                "message": f"Training job {job.id} is queued",
+                "progress": 0,
+                "epoch": 0,
+                "total_epochs": params["epochs"],
+            })
+        return job, created
+    except Exception as e:
+        raise queue_unavailable(db, e)
 
-        # Reload model
-        model = retrained_model
-
-        # Extract final metrics
-        final_acc = history.history["accuracy"][-1]
-        final_val_acc = history.history["val_accuracy"][-1]
-        final_loss = history.history["loss"][-1]
-        final_val_loss = history.history["val_loss"][-1]
-        total_samples = (
-            len(safe_files)
-            + len(danger_files)
-            + len(os.listdir(existing_safe))
-            + len(os.listdir(existing_danger))
-        )
 
-        # Update database with training results
-        update_retraining_session(
-            db,
-            session_id,
-            status="completed",
-            final_accuracy=float(final_acc),
-            final_val_accuracy=float(final_val_acc),
-            final_loss=float(final_loss),
-            final_val_loss=float(final_val_loss),
-            total_samples=total_samples,
-        )
+def active_training_jobs():
+    """Queued and running training jobs ([] if the database is unavailable)."""
+    try:
+        db = get_session_local()()
+        try:
+            return list_active_training_jobs(db)
+        finally:
+            db.close()
+    except Exception:
+        return []
 
-        # Update upload status
-        update_upload_status(db, upload_id, status="completed")
 
-        training_status = {
-            "status": "completed",
-            "message": f"Training completed! Final accuracy: {final_val_acc:.2%}",
-            "progress": 100,
-            "epoch": 3,
-            "total_epochs": 3,
-        }
+def training_job_info(job):
+    """JSON summary of a training job."""
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "session_id": job.session_id,
+        "upload_id": job.upload_id,
+        "attempts": job.attempts,
+        "cancel_requested": bool(job.cancel_requested),
+        "progress": job.progress,
+        "message": job.message,
+        "result_version": job.result_version,
+        "error_message": job.error_message,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "heartbeat_at": job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
 
-        is_training = False
 
-    except Exception as e:
-        is_training = False
-        error_msg = str(e)
+def queued_response(status, message, job, created, **extra):
+    """Response of the training endpoints for a queued (or coalesced) job."""
+    return {
+        "status": status,
+        "message": message,
+        "training_started": created,
+        "job_id": job.id,
+        "job_status": job.status,
+        "upload_id": job.upload_id,
+        "session_id": job.session_id,
+        **extra,
+    }
+
 
-        # Update database with error
-        update_retraining_session(
-            db, session_id, status="failed", error_message=error_msg
+def require_model():
+    """Make sure there is a model version to train from (without loading it)."""
+    try:
+        current_model_version()
+    except Exception as e:
+        raise HTTPException(
+            status_code=503, detail=f"Model not available. Cannot retrain: {str(e)}"
         )
-        update_upload_status(db, upload_id, status="failed", error_message=error_msg)
-
-        training_status = {
-            "status": "error",
-            "message": f"Training failed: {error_msg}",
-            "progress": 0,
-            "epoch": 0,
-            "total_epochs": 0,
-        }
-        print(f"❌ Retraining error: {e}")
-    finally:
-        db.close()
 
 
 @app.post("/retrain")
 async def retrain_trigger(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    fast: bool = Query(False, description="Train only the head on cached backbone embeddings"),
     db: Session = Depends(get_db),
 ):
     """
-    Trigger model retraining with uploaded zip file.
+    Queue model retraining with an uploaded zip file.
 
-    Process:
-    1. Save zip file to filesystem and database (Rubric Requirement: Data file Uploading + Saving to Database)
-    2. Extract and organize files into safe/danger directories
-    3. Preprocess audio files (convert to spectrograms)
-    4. Retrain model using existing model as base
-    5. Save retrained model
-    6. Log all steps to PostgreSQL database
+    The upload is saved to the filesystem and recorded in the database, and a
+    training job is queued; training_worker.py extracts the files, merges
+    them into the training data, retrains from the current model version and
+    publishes the result (see /training/jobs/{job_id}). Uploading the same
+    zip again while its job is queued or running returns that job.
     """
-    global is_training
-
-    if is_training:
-        raise HTTPException(
-            status_code=409, detail="Model is already training. Please wait."
-        )
+    require_model()
 
-    # Load model if not already loaded (lazy loading)
-    try:
-        get_model()  # Ensure model is loaded
-    except Exception as e:
-        raise HTTPException(
-            status_code=503, detail=f"Model not available. Cannot retrain: {str(e)}"
-        )
-
-    # 1. Save file to filesystem
     base_dir = os.path.dirname(os.path.abspath(__file__))
     upload_dir = os.path.join(base_dir, "data", "uploads")
     os.makedirs(upload_dir, exist_ok=True)
 
-    zip_path = os.path.join(upload_dir, file.filename)
+    file_content = await file.read()
+    digest = hashlib.sha256(file_content).hexdigest()
+    dedupe_key = f"retrain:{digest}:fast={fast}"
+    existing = find_queued_duplicate(db, dedupe_key)
+    if existing is not None:
+        return queued_response(
+            "Retraining Already Queued",
+            f"This upload is already {existing.status} as training job {existing.id}.",
+            existing,
+            False,
+        )
 
+    # Content-addressed, so a queued job's zip is never overwritten
+    zip_path = os.path.join(upload_dir, f"{digest[:16]}_{os.path.basename(file.filename)}")
     try:
-        # Read file to get size
-        file_content = await file.read()
-        file_size = len(file_content)
-
-        # Save to filesystem
         with open(zip_path, "wb") as buffer:
             buffer.write(file_content)
-
-        # 2. Save to PostgreSQL database (Rubric Requirement: Data file Uploading + Saving to Database)
-        upload_id = None
-        session_id = None
-        try:
-            # Ensure tables exist before trying to insert (lazy initialization)
-            try:
-                init_db()
-            except Exception:
-                pass  # Tables might already exist, continue anyway
-
-            upload_record = create_upload_record(db, file.filename, zip_path, file_size)
-            upload_id = upload_record.id
-
-            # Create retraining session record
-            retraining_session = create_retraining_session(db, upload_id, epochs=3)
-            session_id = retraining_session.id
-
-            db_message = f"File saved to PostgreSQL database (Upload ID: {upload_id}, Session ID: {session_id})"
-        except Exception as db_error:
-            # Continue even if database fails (graceful degradation)
-            print(
-                f"⚠️ Database error: {db_error}. Continuing without database logging..."
-            )
-            db_message = "File saved to filesystem (database logging unavailable)"
-
-        # 3. Start background retraining task
-        data_dir = os.path.join(base_dir, "data")
-        background_tasks.add_task(
-            retrain_model_background,
-            zip_path,
-            upload_dir,
-            data_dir,
-            upload_id,
-            session_id,
-        )
-
-        return {
-            "status": "Retraining Initiated",
-            "message": f"{db_message}. Training pipeline started in background.",
-            "training_started": True,
-            "upload_id": upload_id,
-            "session_id": session_id,
-        }
-
     except Exception as e:
         return JSONResponse(
             status_code=500, content={"error": f"Failed to save file: {str(e)}"}
         )
 
-
-def continue_training_background(data_dir, epochs, session_id):
-    """
-    Background function to continue training with existing data.
-    """
-    global model, is_training, training_status
-
-    # Get database session
-    db = next(get_db())
-
     try:
-        # Ensure tables exist before trying to use database (lazy initialization)
-        if db is not None:
-            try:
-                init_db()
-            except Exception:
-                pass  # Tables might already exist, continue anyway
-
-        is_training = True
-        training_status = {
-            "status": "preprocessing",
-            "message": "Preparing existing data...",
-            "progress": 10,
-            "epoch": 0,
-            "total_epochs": epochs,
-        }
-
-        # Update session status (only if db is available)
-        if db is not None and session_id is not None:
-            update_retraining_session(db, session_id, status="preprocessing")
-
-        # Check existing data directories
-        existing_safe = os.path.join(data_dir, "safe")
-        existing_danger = os.path.join(data_dir, "danger")
-
-        # Create directories if they don't exist
-        os.makedirs(existing_safe, exist_ok=True)
-        os.makedirs(existing_danger, exist_ok=True)
-
-        # Count existing files
-        safe_files = [
-            f for f in os.listdir(existing_safe) if f.lower().endswith((".wav", ".mp3", ".flac", ".ogg", ".m4a"))
-        ] if os.path.exists(existing_safe) else []
-        danger_files = [
-            f for f in os.listdir(existing_danger) if f.lower().endswith((".wav", ".mp3", ".flac", ".ogg", ".m4a"))
-        ] if os.path.exists(existing_danger) else []
-        total_files = len(safe_files) + len(danger_files)
-
-        if total_files == 0:
-            raise Exception("No training data found. Please upload data first or use existing datasets.")
-
-        training_status = {
-            "status": "preprocessing",
-            "message": f"Preprocessing {total_files} audio files...",
-            "progress": 30,
-            "epoch": 0,
-            "total_epochs": epochs,
-        }
-
-        # Train model (this will handle preprocessing internally)
-        training_status = {
-            "status": "training",
-            "message": "Training model...",
-            "progress": 50,
-            "epoch": 0,
-            "total_epochs": epochs,
-        }
-
-        if db is not None and session_id is not None:
-            update_retraining_session(db, session_id, status="training")
-
-        # Ensure model is loaded before retraining
-        current_model = get_model() if model is None else model
-
-        # Use existing model for retraining
-        retrained_model, history = train_model(
-            data_dir=data_dir,
-            model_path=MODEL_PATH,
-            epochs=epochs,
-            batch_size=32,
-            validation_split=0.2,
-            existing_model=current_model,
-        )
-
-        # Reload model
-        model = retrained_model
-
-        # Extract final metrics
-        final_acc = history.history["accuracy"][-1]
-        final_val_acc = history.history["val_accuracy"][-1]
-        final_loss = history.history["loss"][-1]
-        final_val_loss = history.history["val_loss"][-1]
-
-        # Update database with training results
-        if db is not None and session_id is not None:
-            update_retraining_session(
-                db,
-                session_id,
-                status="completed",
-                final_accuracy=float(final_acc),
-                final_val_accuracy=float(final_val_acc),
-                final_loss=float(final_loss),
-                final_val_loss=float(final_val_loss),
-                total_samples=total_files,
-            )
-
-        training_status = {
-            "status": "completed",
-            "message": f"Training completed! Final accuracy: {final_val_acc:.2%}",
-            "progress": 100,
-            "epoch": epochs,
-            "total_epochs": epochs,
-        }
-
-        is_training = False
-
+        upload_record = create_upload_record(db, file.filename, zip_path, len(file_content))
     except Exception as e:
-        is_training = False
-        error_msg = str(e)
-
-        # Update database with error
-        if db is not None and session_id is not None:
-            update_retraining_session(
-                db, session_id, status="failed", error_message=error_msg
-            )
+        raise queue_unavailable(db, e)
+
+    params = {
+        "zip_path": zip_path,
+        "upload_dir": upload_dir,
+        "data_dir": os.path.join(base_dir, "data"),
+        "epochs": 3,
+        "fast": fast,
+    }
+    job, created = enqueue_training(db, "retrain", params, dedupe_key, upload_id=upload_record.id)
 
-        training_status = {
-            "status": "error",
-            "message": f"Training failed: {error_msg}",
-            "progress": 0,
-            "epoch": 0,
-            "total_epochs": epochs,
-        }
-        print(f"❌ Continue training error: {e}")
-    finally:
-        if db is not None:
-            db.close()
+    return queued_response(
+        "Retraining Queued" if created else "Retraining Already Queued",
+        f"File saved (Upload ID: {upload_record.id}). Training job {job.id} is {job.status}.",
+        job,
+        created,
+    )
 
 
 @app.post("/continue-training")
 async def continue_training_trigger(
-    background_tasks: BackgroundTasks,
     epochs: int = Query(3, ge=1, le=50),
+    fast: bool = Query(False, description="Train only the head on cached backbone embeddings"),
     db: Session = Depends(get_db),
 ):
     """
-    Continue training the model with existing data and specified number of epochs.
+    Queue training of the model with existing data for the given number of epochs.
     """
-    global is_training
-
-    if is_training:
-        raise HTTPException(
-            status_code=409, detail="Model is already training. Please wait."
-        )
-
-    # Load model if not already loaded (lazy loading)
-    try:
-        get_model()  # Ensure model is loaded
-    except Exception as e:
-        raise HTTPException(
-            status_code=503, detail=f"Model not available. Cannot retrain: {str(e)}"
-        )
-
-    # Validate epochs
-    if epochs < 1 or epochs > 50:
-        raise HTTPException(
-            status_code=400, detail="Epochs must be between 1 and 50"
-        )
+    require_model()
 
     # Get data directory
     base_dir = os.path.dirname(os.path.abspath(__file__))
     data_dir = os.path.join(base_dir, "data")
-
-    # Check if data exists
-    existing_safe = os.path.join(data_dir, "safe")
-    existing_danger = os.path.join(data_dir, "danger")
-    
-    safe_count = len([f for f in os.listdir(existing_safe) if f.lower().endswith((".wav", ".mp3", ".flac", ".ogg", ".m4a"))]) if os.path.exists(existing_safe) else 0
-    danger_count = len([f for f in os.listdir(existing_danger) if f.lower().endswith((".wav", ".mp3", ".flac", ".ogg", ".m4a"))]) if os.path.exists(existing_danger) else 0
-    
+    safe_count = count_audio_files(os.path.join(data_dir, "safe"))
+    danger_count = count_audio_files(os.path.join(data_dir, "danger"))
     if safe_count == 0 and danger_count == 0:
         raise HTTPException(
             status_code=404, detail="No training data found. Please upload data first."
         )
 
-    # Create database session record
-    session_id = None
-    try:
-        try:
-            init_db()
-        except Exception:
-            pass  # Tables might already exist
-
-        # Create retraining session record
-        retraining_session = create_retraining_session(db, None, epochs=epochs)
-        session_id = retraining_session.id
-    except Exception as db_error:
-        print(f"⚠️ Database error: {db_error}. Continuing without database logging...")
-
-    # Start background training task
-    background_tasks.add_task(
-        continue_training_background,
-        data_dir,
-        epochs,
-        session_id,
-    )
+    params = {"data_dir": data_dir, "epochs": epochs, "fast": fast}
+    job, created = enqueue_training(db, "continue", params, f"continue:{epochs}:fast={fast}")
 
-    return {
-        "status": "Training Initiated",
-        "message": f"Continuing training with {epochs} epochs using existing data ({safe_count + danger_count} files).",
-        "training_started": True,
-        "session_id": session_id,
-        "data_files": safe_count + danger_count,
-    }
+    return queued_response(
+        "Training Queued" if created else "Training Already Queued",
+        f"Training job {job.id} ({epochs} epochs, {safe_count + danger_count} files) is {job.status}.",
+        job,
+        created,
+        data_files=safe_count + danger_count,
+    )
 
 
 @app.post("/retrain-existing")
 async def retrain_existing_datasets_trigger(
-    background_tasks: BackgroundTasks,
+    fast: bool = Query(False, description="Train only the head on cached backbone embeddings"),
     db: Session = Depends(get_db),
 ):
     """
     Retrain model using existing datasets stored in the system.
     This is similar to continue training but uses default epochs (3).
     """
-    global is_training
+    response = await continue_training_trigger(epochs=3, fast=fast, db=db)
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    safe_count = count_audio_files(os.path.join(base_dir, "data", "safe"))
+    danger_count = count_audio_files(os.path.join(base_dir, "data", "danger"))
+    response["message"] = (
+        f"Retraining with existing datasets ({safe_count + danger_count} files: "
+        f"{safe_count} safe, {danger_count} danger). Training job {response['job_id']} "
+        f"is {response['job_status']}."
+    )
+    response["safe_count"] = safe_count
+    response["danger_count"] = danger_count
+    return response
 
-    if is_training:
-        raise HTTPException(
-            status_code=409, detail="Model is already training. Please wait."
-        )
 
-    # Load model if not already loaded (lazy loading)
+@app.get("/training/jobs/{job_id}")
+def training_job_status(job_id: int, db: Session = Depends(get_db)):
+    """Status of a queued training job."""
     try:
-        get_model()  # Ensure model is loaded
+        job = get_training_job(db, job_id)
     except Exception as e:
-        raise HTTPException(
-            status_code=503, detail=f"Model not available. Cannot retrain: {str(e)}"
-        )
+        raise queue_unavailable(db, e)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Training job not found: {job_id}")
+    return training_job_info(job)
 
-    # Get data directory
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    data_dir = os.path.join(base_dir, "data")
 
-    # Check if data exists
-    existing_safe = os.path.join(data_dir, "safe")
-    existing_danger = os.path.join(data_dir, "danger")
-    
-    safe_count = len([f for f in os.listdir(existing_safe) if f.lower().endswith((".wav", ".mp3", ".flac", ".ogg", ".m4a"))]) if os.path.exists(existing_safe) else 0
-    danger_count = len([f for f in os.listdir(existing_danger) if f.lower().endswith((".wav", ".mp3", ".flac", ".ogg", ".m4a"))]) if os.path.exists(existing_danger) else 0
-    
-    if safe_count == 0 and danger_count == 0:
+@app.post("/training/{session_id}/cancel")
+def cancel_training(session_id: int, db: Session = Depends(get_db)):
+    """
+    Cancel the training job of a retraining session.
+
+    A queued job is cancelled right away. A running one stops at the next
+    batch boundary (within CANCEL_POLL_INTERVAL seconds, see
+    training_telemetry.py), or at the next phase boundary once fitting is
+    over; the worker checks again before publishing and switching models.
+    Nothing is published and its checkpoints are deleted, so the current
+    model stays in service.
+    """
+    try:
+        job = cancel_training_job(db, session_id)
+        if job is not None and job.status == "cancelled":
+            update_retraining_session(db, session_id, status="cancelled")
+            if job.upload_id is not None:
+                update_upload_status(db, job.upload_id, status="cancelled")
+    except Exception as e:
+        raise queue_unavailable(db, e)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No training job for session {session_id}")
+    if job.status in ("completed", "failed"):
         raise HTTPException(
-            status_code=404, detail="No training data found. Please upload data first."
+            status_code=409, detail=f"Training job {job.id} already {job.status}"
         )
 
-    # Create database session record
-    session_id = None
-    try:
-        try:
-            init_db()
-        except Exception:
-            pass  # Tables might already exist
-
-        # Create retraining session record with default epochs
-        retraining_session = create_retraining_session(db, None, epochs=3)
-        session_id = retraining_session.id
-    except Exception as db_error:
-        print(f"⚠️ Database error: {db_error}. Continuing without database logging...")
-
-    # Start background training task with default epochs
-    background_tasks.add_task(
-        continue_training_background,
-        data_dir,
-        3,  # Default epochs
-        session_id,
-    )
-
+    if job.status == "cancelled":
+        status, message = "Cancelled", f"Training job {job.id} was cancelled before it started."
+        if not training_state.read()["is_training"]:
+            publish_training_status({
+                "status": "cancelled",
+                "message": message,
+                "progress": 0,
+                "epoch": 0,
+                "total_epochs": 0,
+            })
+    else:
+        status, message = "Cancelling", f"Training job {job.id} will stop at the next batch or before its model is published."
     return {
-        "status": "Training Initiated",
-        "message": f"Retraining with existing datasets ({safe_count + danger_count} files: {safe_count} safe, {danger_count} danger).",
-        "training_started": True,
-        "session_id": session_id,
-        "data_files": safe_count + danger_count,
-        "safe_count": safe_count,
-        "danger_count": danger_count,
+        "status": status,
+        "message": message,
+        "job_id": job.id,
+        "job_status": job.status,
+        "session_id": job.session_id,
     }
@@ -0,0 +1,152 @@
+# backend/batching.py
+"""
+Dynamic micro-batching for concurrent prediction requests.
+
+Requests are queued and a single scheduler task groups them into batches of
+up to max_batch_size, waiting at most max_wait_ms after the first request of a
+batch. Each batch runs as one forward pass on a dedicated thread and the
+scores are fanned back to the waiting requests.
+"""
+
+import asyncio
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+BATCH_QUEUE_DEPTH = int(os.getenv("BATCH_QUEUE_DEPTH", "256"))
+
+
+class QueueFullError(Exception):
+    """Raised when the batching queue already holds max_queue_size requests."""
+
+
+class MicroBatcher:
+    """
+    Asyncio batching queue in front of a batch prediction function.
+
+    Args:
+        predict_fn: Callable mapping an (N, ...) array to N scores
+        max_batch_size: Largest batch sent to predict_fn
+        max_wait_ms: Longest time the first request of a batch waits for more
+        max_queue_size: Requests allowed to wait before submit() fails fast
+    """
+
+    def __init__(
+        self,
+        predict_fn,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=BATCH_MAX_WAIT_MS,
+        max_queue_size=BATCH_QUEUE_DEPTH,
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue_size = max_queue_size
+        self._queue = None
+        self._task = None
+        # One thread: forward passes run one at a time, each on a full batch
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batcher")
+
+        self._batches = 0
+        self._requests = 0
+        self._batch_sizes = Counter()
+        self._queue_delays = deque(maxlen=1000)  # Seconds, most recent requests
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, x):
+        """
+        Score one sample.
+
+        Args:
+            x: One model input, e.g. a (224, 224, 3) array
+
+        Returns:
+            float: The sample's score
+
+        Raises:
+            QueueFullError: If max_queue_size requests are already waiting
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((x, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            raise QueueFullError(
+                f"Prediction queue is full ({self.max_queue_size} waiting)"
+            )
+        return await future
+
+    async def submit_many(self, xs):
+        """Score several samples; they may land in the same or later batches."""
+        return await asyncio.gather(*(self.submit(x) for x in xs))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Requests whose caller went away don't need a forward pass
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self._queue_delays.append(started - enqueued)
+            self._batches += 1
+            self._requests += len(batch)
+            self._batch_sizes[len(batch)] += 1
+
+            try:
+                x = np.stack([item[0] for item in batch])
+                scores = await loop.run_in_executor(self._executor, self.predict_fn, x)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future, _), score in zip(batch, scores):
+                if not future.done():
+                    future.set_result(float(score))
+
+    def metrics(self):
+        """Realized batch sizes and queueing delay (milliseconds)."""
+        delays = np.array(self._queue_delays) * 1000.0
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_queue_size": self.max_queue_size,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self._batches,
+            "requests": self._requests,
+            "mean_batch_size": self._requests / self._batches if self._batches else 0.0,
+            "batch_size_counts": dict(sorted(self._batch_sizes.items())),
+            "queue_delay_ms": {
+                "mean": float(delays.mean()) if len(delays) else 0.0,
+                "p50": float(np.percentile(delays, 50)) if len(delays) else 0.0,
+                "p99": float(np.percentile(delays, 99)) if len(delays) else 0.0,
+            },
+        }
@@ -0,0 +1,127 @@
+"""
+Benchmark of the model architectures in src/model.py.
+Run with: python benchmark_architectures.py data_dir [epochs]
+
+Trains the MobileNetV2 (224x224x3 rendered spectrogram) and the compact
+(native-resolution single-channel spectrogram) models on the same data
+through train_model, and reports per clip: FLOPs, parameters, Keras and
+TFLite file size, featurization and forward-pass latency (batch of 1,
+p50/p99) and validation accuracy. data_dir needs safe/ and danger/
+sub-directories. Without network access MobileNetV2 falls back to random
+weights, which makes its accuracy meaningless but keeps the cost columns.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+import tensorflow as tf
+from tensorflow.python.framework.convert_to_constants import (
+    convert_variables_to_constants_v2_as_graph,
+)
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference import ModelPredictor, exported_model_path, load_predictor
+from preprocessing import (
+    DURATION,
+    SAMPLE_RATE,
+    batch_mel_spectrogram_db,
+    quantize_spectrograms,
+    waveform_to_array,
+)
+from src.model import ARCHITECTURES, create_model, train_model
+
+REQUESTS = 50
+DEFAULT_EPOCHS = 5
+
+
+def create_benchmark_model(architecture):
+    if architecture != "mobilenet":
+        return create_model(architecture=architecture)
+    try:
+        return create_model(architecture=architecture)
+    except Exception as e:
+        print(f"⚠️ ImageNet weights unavailable ({e}), using random MobileNetV2 weights")
+        return create_model(weights="random", architecture=architecture)
+
+
+def count_flops(model):
+    """Floating point operations of one forward pass on a single clip."""
+    fn = tf.function(lambda x: model(x, training=False)).get_concrete_function(
+        tf.TensorSpec((1,) + tuple(model.input_shape[1:]), tf.float32)
+    )
+    _, graph_def = convert_variables_to_constants_v2_as_graph(fn)
+    with tf.Graph().as_default() as graph:
+        tf.compat.v1.import_graph_def(graph_def, name="")
+        options = tf.compat.v1.profiler.ProfileOptionBuilder.float_operation()
+        options["output"] = "none"
+        return tf.compat.v1.profiler.profile(graph=graph, options=options).total_float_ops
+
+
+def featurize_mel(y):
+    """Serving-time input of the compact model for one waveform."""
+    return quantize_spectrograms(batch_mel_spectrogram_db(y[np.newaxis]))[0].astype(np.float32) / 255.0
+
+
+def latencies_ms(fn, x, repeats=REQUESTS):
+    fn(x)  # Trace / compile outside the timed loop
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(x)
+        times.append((time.perf_counter() - start) * 1000.0)
+    return np.array(times)
+
+
+def benchmark(architecture, data_dir, epochs, work_dir):
+    model_path = os.path.join(work_dir, architecture, "sentinel_model.h5")
+    model, history = train_model(
+        data_dir, model_path, epochs=epochs, existing_model=create_benchmark_model(architecture)
+    )
+
+    y = np.random.default_rng(0).standard_normal(int(SAMPLE_RATE * DURATION)).astype(np.float32) * 0.1
+    featurize = featurize_mel if architecture == "compact" else waveform_to_array
+    x = featurize(y)[np.newaxis]
+    row = {
+        "mflops": count_flops(model) / 1e6,
+        "params": model.count_params(),
+        "h5_mb": os.path.getsize(model_path) / 1e6,
+        "featurize_ms": np.percentile(latencies_ms(featurize, y), 50),
+        "model_ms": latencies_ms(ModelPredictor(model, "graph"), x),
+        "val_accuracy": max(history.history["val_accuracy"]),
+    }
+    tflite_path = exported_model_path(model_path, "tflite")
+    if os.path.exists(tflite_path):
+        row["tflite_mb"] = os.path.getsize(tflite_path) / 1e6
+        row["tflite_ms"] = np.percentile(latencies_ms(load_predictor(model_path, "tflite"), x), 50)
+    return row
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python benchmark_architectures.py data_dir [epochs]")
+    data_dir = sys.argv[1]
+    epochs = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_EPOCHS
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = {
+            architecture: benchmark(architecture, data_dir, epochs, work_dir)
+            for architecture in ARCHITECTURES
+        }
+
+    print(
+        f"\n{'model':>10} {'MFLOPs':>8} {'params':>9} {'h5 MB':>6} {'tflite MB':>9} "
+        f"{'featurize':>9} {'p50 ms':>7} {'p99 ms':>7} {'tflite ms':>9} {'val acc':>7}"
+    )
+    for architecture, row in results.items():
+        print(
+            f"{architecture:>10} {row['mflops']:>8.1f} {row['params']:>9,d} {row['h5_mb']:>6.2f} "
+            f"{row.get('tflite_mb', float('nan')):>9.2f} {row['featurize_ms']:>9.2f} "
+            f"{np.percentile(row['model_ms'], 50):>7.2f} {np.percentile(row['model_ms'], 99):>7.2f} "
+            f"{row.get('tflite_ms', float('nan')):>9.2f} {row['val_accuracy']:>7.2%}"
+        )
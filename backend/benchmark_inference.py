@@ -0,0 +1,86 @@
+"""
+Benchmark of the inference modes in inference.py.
+Run with: python benchmark_inference.py [model_path]
+
+Reports per-request latency (batch of 1, p50/p99) and batch-of-32 throughput
+for model.predict (the previous serving path) and the eager, graph and XLA
+predictors, and checks that every mode returns the same scores. TFLite and
+ONNX exports found next to the model are benchmarked too; their score
+difference is reported but not checked, since quantization changes scores.
+Without a saved model a randomly initialized MobileNetV2 of the same shape
+is used.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+import tensorflow as tf
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference import INFERENCE_MODES, INPUT_SHAPE, ModelPredictor, exported_model_path, load_predictor
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "sentinel_model.h5")
+REQUESTS = 50
+BATCH_SIZE = 32
+# Maximum allowed score difference between modes (float32 round-off)
+PARITY_TOLERANCE = 1e-4
+
+
+def load_benchmark_model(model_path):
+    if os.path.exists(model_path):
+        print(f"Model: {model_path}")
+        return tf.keras.models.load_model(model_path)
+    from src.model import create_model
+
+    print("Model: randomly initialized MobileNetV2 (no saved model found)")
+    return create_model(weights="random")
+
+
+def latencies_ms(fn, x, repeats):
+    fn(x)  # Trace / compile outside the timed loop
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(x)
+        times.append((time.perf_counter() - start) * 1000.0)
+    return np.array(times)
+
+
+if __name__ == "__main__":
+    model_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MODEL_PATH
+    model = load_benchmark_model(model_path)
+    rng = np.random.default_rng(0)
+    single = rng.random((1,) + INPUT_SHAPE, dtype=np.float32)
+    batch = rng.random((BATCH_SIZE,) + INPUT_SHAPE, dtype=np.float32)
+
+    predictors = {"model.predict": lambda x: model.predict(x, verbose=0)[:, 0]}
+    for mode in INFERENCE_MODES:
+        predictors[mode] = ModelPredictor(model, mode)
+    for backend in ("tflite", "onnx"):
+        path = exported_model_path(model_path, backend)
+        if os.path.exists(path):
+            print(f"{backend}: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+            predictors[backend] = load_predictor(model_path, backend)
+
+    reference = predictors["model.predict"](batch)
+    print(f"\n{'mode':>14} {'p50 ms':>8} {'p99 ms':>8} {f'x{BATCH_SIZE} clips/s':>14} {'max |diff|':>11}")
+    for name, fn in predictors.items():
+        try:
+            single_ms = latencies_ms(fn, single, REQUESTS)
+            batch_ms = latencies_ms(fn, batch, 5)
+        except Exception as e:
+            print(f"{name:>14} unavailable: {e}")
+            continue
+        diff = float(np.abs(fn(batch) - reference).max())
+        print(
+            f"{name:>14} {np.percentile(single_ms, 50):>8.2f} {np.percentile(single_ms, 99):>8.2f} "
+            f"{BATCH_SIZE / (np.median(batch_ms) / 1000.0):>14.1f} {diff:>11.2e}"
+        )
+        if name in ("tflite", "onnx"):
+            continue
+        assert diff <= PARITY_TOLERANCE, f"{name} scores differ by {diff}"
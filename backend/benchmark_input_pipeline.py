@@ -0,0 +1,88 @@
+"""
+Benchmark of the training input pipelines in src/model.py.
+Run with: python benchmark_input_pipeline.py data_dir [epochs] [architecture]
+
+Compares the MemmapBatchSequence generator (per-image ImageDataGenerator
+augmentation in Python between training steps) with the tf.data pipeline
+(batched graph-op augmentation on parallel threads, cached and prefetched).
+For each pipeline it reports the input-only throughput (one augmented epoch
+without a model) and the training throughput of every epoch of a
+train_model run, in samples/sec. The first epoch includes tracing and
+filling the cache, so the steady-state figure is the median of the others.
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.dataset import make_tf_dataset
+from src.model import (
+    INPUT_PIPELINES,
+    create_model,
+    model_feature_type,
+    prepare_data_from_directories,
+    train_model,
+)
+
+DEFAULT_EPOCHS = 4
+DEFAULT_ARCHITECTURE = "compact"
+BATCH_SIZE = 32
+
+
+def input_samples_per_sec(pipeline, train_gen):
+    """Samples/sec of one augmented epoch of the input alone (after a warm-up epoch)."""
+    if pipeline == "tfdata":
+        data = make_tf_dataset(
+            train_gen.dataset, train_gen.indices, BATCH_SIZE, shuffle=True, augment=True
+        )
+        epoch = lambda: sum(len(y) for _, y in data)
+    else:
+        epoch = lambda: sum(len(train_gen[i][1]) for i in range(len(train_gen)))
+
+    epoch()
+    start = time.perf_counter()
+    samples = epoch()
+    return samples / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python benchmark_input_pipeline.py data_dir [epochs] [architecture]")
+    data_dir = sys.argv[1]
+    epochs = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_EPOCHS
+    architecture = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_ARCHITECTURE
+
+    feature_type = model_feature_type(create_model(weights="random", architecture=architecture))
+    train_gen, _, num_samples = prepare_data_from_directories(
+        data_dir, batch_size=BATCH_SIZE, feature_type=feature_type
+    )
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for pipeline in INPUT_PIPELINES:
+            _, history = train_model(
+                data_dir,
+                os.path.join(work_dir, pipeline, "sentinel_model.h5"),
+                epochs=epochs,
+                batch_size=BATCH_SIZE,
+                existing_model=create_model(weights="random", architecture=architecture),
+                pipeline=pipeline,
+            )
+            results[pipeline] = {
+                "input": input_samples_per_sec(pipeline, train_gen),
+                "epochs": history.history["samples_per_sec"],
+            }
+
+    print(f"\n{architecture}, {num_samples} samples, batch size {BATCH_SIZE}, {epochs} epochs on {data_dir}")
+    print(f"{'pipeline':>10} {'input/s':>9} {'steady/s':>9}  per-epoch samples/sec")
+    for pipeline, row in results.items():
+        steady = np.median(row["epochs"][1:]) if len(row["epochs"]) > 1 else row["epochs"][0]
+        per_epoch = " ".join(f"{value:.1f}" for value in row["epochs"])
+        print(f"{pipeline:>10} {row['input']:>9.1f} {steady:>9.1f}  {per_epoch}")
@@ -0,0 +1,72 @@
+"""
+Benchmark and parity check for the batched mel-spectrogram engine.
+Run with: python benchmark_spectrogram.py
+
+Compares preprocessing.batch_mel_spectrogram_db against the per-clip librosa
+path (librosa.feature.melspectrogram + power_to_db) and reports clips/sec for
+both at several batch sizes.
+"""
+
+import time
+
+import librosa
+import numpy as np
+
+from preprocessing import (
+    DURATION,
+    FMAX,
+    N_MELS,
+    SAMPLE_RATE,
+    batch_mel_spectrogram_db,
+)
+
+BATCH_SIZES = [1, 32, 256]
+# Maximum allowed difference in dB against librosa (float32 FFT round-off)
+PARITY_TOLERANCE_DB = 0.01
+
+
+def librosa_mel_db(y):
+    """Reference single-clip path (what create_spectrogram used to call)."""
+    mel = librosa.feature.melspectrogram(y=y, sr=SAMPLE_RATE, n_mels=N_MELS, fmax=FMAX)
+    return librosa.power_to_db(mel, ref=np.max)
+
+
+def make_waveforms(n, seed=0):
+    """Noisy chirps, so every mel band carries energy."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(SAMPLE_RATE * DURATION)) / SAMPLE_RATE
+    freqs = rng.uniform(100, 4000, size=(n, 1))
+    tones = np.sin(2 * np.pi * freqs * t * (1 + t / DURATION))
+    noise = rng.uniform(0.01, 0.2, size=(n, 1)) * rng.standard_normal((n, t.size))
+    return (0.5 * tones + noise).astype(np.float32)
+
+
+def check_parity(n=16):
+    waveforms = make_waveforms(n, seed=1)
+    batched = batch_mel_spectrogram_db(waveforms)
+    reference = np.stack([librosa_mel_db(y) for y in waveforms])
+
+    assert batched.shape == reference.shape, (batched.shape, reference.shape)
+    max_diff = float(np.abs(batched - reference).max())
+    print(f"Parity vs librosa: shape={batched.shape}, max |diff| = {max_diff:.5f} dB")
+    assert max_diff <= PARITY_TOLERANCE_DB, f"max diff {max_diff} dB too large"
+
+
+def clips_per_sec(fn, waveforms, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(waveforms)
+        best = min(best, time.perf_counter() - start)
+    return len(waveforms) / best
+
+
+if __name__ == "__main__":
+    check_parity()
+
+    print(f"\n{'N':>5} {'librosa clips/s':>16} {'batched clips/s':>16} {'speedup':>8}")
+    for n in BATCH_SIZES:
+        waveforms = make_waveforms(n)
+        reference = clips_per_sec(lambda w: [librosa_mel_db(y) for y in w], waveforms)
+        batched = clips_per_sec(batch_mel_spectrogram_db, waveforms)
+        print(f"{n:>5} {reference:>16.1f} {batched:>16.1f} {batched / reference:>7.1f}x")
@@ -0,0 +1,162 @@
+"""
+Benchmark of prediction latency while a retrain is running.
+Run with: python benchmark_training_contention.py data_dir [model_path] [epochs]
+
+Sweeps the workload settings of workload.py: training in the serving
+process (the old behaviour) versus a separate process, the training
+process' niceness, split TensorFlow thread budgets and split CPU sets.
+Every configuration runs in a fresh process (TensorFlow's thread pools can
+only be sized once) that scores one clip at a time, first while idle and
+then while a training run on data_dir is active, and reports p50/p99
+latency for both phases plus the training wall time.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "sentinel_model.h5")
+DEFAULT_EPOCHS = 2
+IDLE_SECONDS = 5
+# Pause between requests, so the probe itself does not saturate a core
+REQUEST_INTERVAL = 0.02
+
+
+def sweep_configs(cores):
+    """Configurations to compare on a machine with the given number of cores."""
+    serving = max(1, cores // 4)
+    configs = [
+        {"name": "in-process", "in_subprocess": False},
+        {"name": "subprocess", "in_subprocess": True, "nice": 0},
+        {"name": "subprocess+nice", "in_subprocess": True, "nice": 10},
+        {
+            "name": "split threads",
+            "in_subprocess": True,
+            "nice": 10,
+            "serving_threads": serving,
+            "training_threads": max(1, cores - serving),
+        },
+    ]
+    if cores >= 2:
+        configs.append({
+            "name": "split cpus",
+            "in_subprocess": True,
+            "nice": 10,
+            "serving_threads": serving,
+            "training_threads": cores - serving,
+            "serving_cpus": f"0-{serving - 1}",
+            "training_cpus": f"{serving}-{cores - 1}",
+        })
+    return configs
+
+
+def run_config(config, data_dir, model_path, epochs):
+    """Measure one configuration (runs inside its own process)."""
+    from workload import run_training_subprocess, set_cpu_affinity
+
+    set_cpu_affinity(config.get("serving_cpus", ""))
+    import numpy as np
+    import tensorflow as tf
+
+    if config.get("serving_threads"):
+        tf.config.threading.set_intra_op_parallelism_threads(config["serving_threads"])
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    from inference import INPUT_SHAPE, ModelPredictor
+    from src.model import clone_model, load_model, train_model
+
+    model = load_model(model_path)
+    predictor = ModelPredictor(model)
+    x = np.random.default_rng(0).random((1,) + INPUT_SHAPE, dtype=np.float32)
+    predictor(x)
+
+    def probe(keep_running):
+        times = []
+        while keep_running():
+            start = time.perf_counter()
+            predictor(x)
+            times.append((time.perf_counter() - start) * 1000.0)
+            time.sleep(REQUEST_INTERVAL)
+        return np.array(times)
+
+    idle_until = time.perf_counter() + IDLE_SECONDS
+    idle = probe(lambda: time.perf_counter() < idle_until)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        train_kwargs = dict(
+            data_dir=data_dir,
+            model_path=os.path.join(work_dir, "sentinel_model.h5"),
+            epochs=epochs,
+        )
+        if config["in_subprocess"]:
+            target = lambda: run_training_subprocess(
+                base_model_path=model_path,
+                intraop_threads=config.get("training_threads", 0),
+                interop_threads=0,
+                cpus=config.get("training_cpus", ""),
+                nice=config.get("nice", 0),
+                **train_kwargs,
+            )
+        else:
+            target = lambda: train_model(existing_model=clone_model(model), **train_kwargs)
+
+        trainer = threading.Thread(target=target)
+        started = time.perf_counter()
+        trainer.start()
+        training = probe(trainer.is_alive)
+        training_seconds = time.perf_counter() - started
+
+    return {
+        "idle_p50": float(np.percentile(idle, 50)),
+        "idle_p99": float(np.percentile(idle, 99)),
+        "training_p50": float(np.percentile(training, 50)),
+        "training_p99": float(np.percentile(training, 99)),
+        "training_seconds": training_seconds,
+        "requests": int(len(training)),
+    }
+
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--config":
+        config = json.loads(sys.argv[2])
+        result = run_config(config, sys.argv[3], sys.argv[4], int(sys.argv[5]))
+        print("RESULT " + json.dumps(result))
+        sys.exit(0)
+
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python benchmark_training_contention.py data_dir [model_path] [epochs]")
+    data_dir = sys.argv[1]
+    model_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_MODEL_PATH
+    epochs = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_EPOCHS
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+
+    results = {}
+    for config in sweep_configs(cores or 1):
+        print(f"Running {config['name']}...")
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--config", json.dumps(config),
+             data_dir, model_path, str(epochs)],
+            capture_output=True, text=True,
+        )
+        lines = [line for line in output.stdout.splitlines() if line.startswith("RESULT ")]
+        if not lines:
+            print(f"  failed:\n{output.stderr[-2000:]}")
+            continue
+        results[config["name"]] = json.loads(lines[-1][len("RESULT "):])
+
+    print(f"\n{cores} cores, {epochs} epochs on {data_dir}")
+    print(
+        f"{'config':>16} {'idle p50':>9} {'idle p99':>9} {'train p50':>10} "
+        f"{'train p99':>10} {'train s':>8} {'requests':>9}"
+    )
+    for name, row in results.items():
+        print(
+            f"{name:>16} {row['idle_p50']:>9.2f} {row['idle_p99']:>9.2f} {row['training_p50']:>10.2f} "
+            f"{row['training_p99']:>10.2f} {row['training_seconds']:>8.1f} {row['requests']:>9d}"
+        )
@@ -0,0 +1,272 @@
+# backend/cascade.py
+"""
+Cheap first stage of a two-stage /predict cascade.
+
+Silent and obviously benign clips make up most traffic, yet each used to
+pay for a full MobileNetV2 forward pass. Stage 1 scores a clip from a few
+summary features of the mel power spectrogram that /predict computes anyway
+(RMS energy, spectral flux, mel-band statistics) with a logistic regression.
+Clips it scores below a threshold are answered "Safe" directly; everything
+else is escalated to the deep model.
+
+The classifier is fitted and its threshold calibrated in train_model, so
+that at most a target fraction of validation danger clips would be
+short-circuited. It is stored as plain JSON next to the model and evaluated
+with numpy at serving time.
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.feature_cache import FeatureCache
+from backend.preprocessing import N_MELS, batch_mel_spectrogram, load_audio, preprocessing_params
+
+# Serve stage 1 in front of the deep model (needs a calibrated _cascade.json)
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "0") == "1"
+# Fraction of danger clips stage 1 must still escalate (calibration target)
+CASCADE_DANGER_RECALL = float(os.getenv("CASCADE_DANGER_RECALL", "0.99"))
+# Clips quieter than this RMS (about -60 dBFS) are Safe without scoring
+SILENCE_RMS_THRESHOLD = float(os.getenv("SILENCE_RMS_THRESHOLD", "0.001"))
+# Mel bands the spectrogram is summarised in
+CASCADE_BANDS = 8
+# Bump when the features change, so cached features are recomputed
+FEATURE_VERSION = 1
+_EPS = 1e-10
+
+
+def cascade_path(model_path):
+    """Path of the stage 1 classifier next to the Keras model."""
+    return os.path.splitext(model_path)[0] + "_cascade.json"
+
+
+def feature_params():
+    """Everything the summary features depend on (for the feature cache)."""
+    return dict(preprocessing_params(), cascade_features=FEATURE_VERSION, bands=CASCADE_BANDS)
+
+
+def summary_features(waveform, mel_power):
+    """
+    Summary features of one clip.
+
+    Args:
+        waveform: Mono waveform
+        mel_power: Mel power spectrogram of the waveform, shape (N_MELS, frames)
+
+    Returns:
+        float32 array with shape (6 + 2 * CASCADE_BANDS,)
+    """
+    rms = np.sqrt(np.mean(np.square(waveform, dtype=np.float64)))
+    log_mel = np.log10(mel_power + _EPS)
+    frame_energy = np.log10(mel_power.sum(axis=0) + _EPS)
+    # Spectral flux: average positive change of the log mel spectrum per frame
+    flux = np.maximum(np.diff(log_mel, axis=1), 0.0).mean(axis=0)
+    band_energy = np.log10(
+        mel_power.reshape(CASCADE_BANDS, N_MELS // CASCADE_BANDS, -1).sum(axis=1) + _EPS
+    )
+    # Band levels relative to the clip's loudest band, so gain does not matter
+    band_level = band_energy.mean(axis=1)
+
+    return np.concatenate(
+        [
+            [
+                np.log10(rms + _EPS),
+                frame_energy.mean(),
+                frame_energy.std(),
+                frame_energy.max() - frame_energy.min(),
+                flux.mean() if len(flux) else 0.0,
+                flux.max() if len(flux) else 0.0,
+            ],
+            band_level - band_level.max(),
+            band_energy.std(axis=1),
+        ]
+    ).astype(np.float32)
+
+
+def waveform_features(waveform):
+    """summary_features for a waveform whose mel spectrogram is not at hand."""
+    return summary_features(waveform, batch_mel_spectrogram(waveform[np.newaxis])[0])
+
+
+def dataset_features(audio_paths, cache=None):
+    """
+    Summary features for a list of audio files.
+
+    Args:
+        audio_paths: Paths of the training audio files
+        cache: Optional FeatureCache opened with feature_params()
+
+    Returns:
+        float32 array with shape (len(audio_paths), n_features)
+    """
+    features = []
+    for path in audio_paths:
+        key = cache.key_for_file(path) if cache else None
+        cached = cache.get(key) if cache else None
+        if cached is None:
+            cached = waveform_features(load_audio(str(path)))
+            if cache:
+                cache.put(key, cached)
+        features.append(cached)
+    return np.stack(features)
+
+
+class CascadeStage:
+    """
+    Standardized logistic regression over summary_features.
+
+    Args:
+        mean, scale: Feature standardization
+        coef, intercept: Logistic regression weights
+        threshold: Danger probability below which a clip is answered Safe
+        report: Calibration metrics recorded at training time
+    """
+
+    def __init__(self, mean, scale, coef, intercept, threshold, report=None):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.threshold = float(threshold)
+        self.report = report or {}
+
+    def score(self, features):
+        """Danger probabilities for an (N, n_features) array (or one feature row)."""
+        z = ((np.atleast_2d(features) - self.mean) / self.scale) @ self.coef + self.intercept
+        return 1.0 / (1.0 + np.exp(-z))
+
+    def screen(self, waveform, mel_power):
+        """
+        Decide whether a clip can skip the deep model.
+
+        Returns:
+            (is_safe, danger probability); the probability is 0.0 for silence
+        """
+        if np.sqrt(np.mean(np.square(waveform, dtype=np.float64))) < SILENCE_RMS_THRESHOLD:
+            return True, 0.0
+        probability = float(self.score(summary_features(waveform, mel_power))[0])
+        return probability < self.threshold, probability
+
+    def save(self, path):
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(
+                {
+                    "mean": self.mean.tolist(),
+                    "scale": self.scale.tolist(),
+                    "coef": self.coef.tolist(),
+                    "intercept": self.intercept,
+                    "threshold": self.threshold,
+                    "feature_version": FEATURE_VERSION,
+                    "report": self.report,
+                },
+                f,
+                indent=2,
+            )
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        """The stage saved at path, or None if missing or from other features."""
+        try:
+            with open(path, "r") as f:
+                saved = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if saved.get("feature_version") != FEATURE_VERSION:
+            return None
+        return cls(
+            saved["mean"], saved["scale"], saved["coef"], saved["intercept"],
+            saved["threshold"], saved.get("report"),
+        )
+
+
+def calibrate_threshold(danger_scores, danger_recall=None):
+    """
+    Largest threshold that still escalates danger_recall of the danger clips.
+
+    Args:
+        danger_scores: Stage 1 probabilities of known danger clips
+        danger_recall: Fraction to escalate (default: CASCADE_DANGER_RECALL)
+    """
+    danger_recall = CASCADE_DANGER_RECALL if danger_recall is None else danger_recall
+    if len(danger_scores) == 0:
+        return 0.0  # Nothing to calibrate on: never short-circuit
+    return float(np.quantile(danger_scores, 1.0 - danger_recall, method="lower"))
+
+
+def fit_cascade(features, labels, train_indices, val_indices, deep_scores=None, danger_recall=None):
+    """
+    Fit stage 1 and calibrate its threshold on the validation split.
+
+    Args:
+        features: (N, n_features) summary features of the whole dataset
+        labels: (N,) labels, 1 = danger
+        train_indices, val_indices: Dataset split
+        deep_scores: Optional deep model probabilities for val_indices, used
+            to report the recall of the full cascade against the deep model
+        danger_recall: Calibration target (default: CASCADE_DANGER_RECALL)
+
+    Returns:
+        CascadeStage with its calibration report
+    """
+    from sklearn.linear_model import LogisticRegression
+
+    labels = np.asarray(labels)
+    x_train, y_train = features[train_indices], labels[train_indices]
+    mean = x_train.mean(axis=0)
+    scale = x_train.std(axis=0)
+    scale[scale == 0] = 1.0
+
+    classifier = LogisticRegression(class_weight="balanced", max_iter=1000)
+    classifier.fit((x_train - mean) / scale, y_train)
+    stage = CascadeStage(mean, scale, classifier.coef_[0], classifier.intercept_[0], 0.0)
+
+    # Calibrate on validation danger clips, or on training ones if there are none
+    calibration = val_indices if (labels[val_indices] == 1).any() else train_indices
+    scores = stage.score(features[calibration])
+    stage.threshold = calibrate_threshold(scores[labels[calibration] == 1], danger_recall)
+
+    val_scores = stage.score(features[val_indices])
+    y_val = labels[val_indices]
+    skipped = val_scores < stage.threshold
+    report = {
+        "threshold": stage.threshold,
+        "val_samples": int(len(val_indices)),
+        "val_skip_fraction": float(skipped.mean()) if len(skipped) else 0.0,
+        "val_safe_skip_fraction": float(skipped[y_val == 0].mean()) if (y_val == 0).any() else None,
+        "val_stage1_danger_recall": float((~skipped[y_val == 1]).mean()) if (y_val == 1).any() else None,
+    }
+    if deep_scores is not None and (y_val == 1).any():
+        deep_danger = np.asarray(deep_scores) > 0.5
+        report["val_deep_danger_recall"] = float(deep_danger[y_val == 1].mean())
+        report["val_cascade_danger_recall"] = float((deep_danger & ~skipped)[y_val == 1].mean())
+    stage.report = report
+    return stage
+
+
+def train_cascade(model_path, dataset, train_indices, val_indices, deep_scores=None, cache_dir=None):
+    """
+    Fit and save the stage 1 classifier for a trained model.
+
+    Args:
+        model_path: Path of the saved Keras model; the stage is written next to it
+        dataset: SpectrogramDataset the model was trained on
+        train_indices, val_indices: Dataset split
+        deep_scores: Deep model probabilities for val_indices (for the report)
+        cache_dir: Summary feature cache location (None disables caching)
+
+    Returns:
+        dict: Calibration report (skip fraction and danger recall on validation)
+    """
+    cache = FeatureCache(cache_dir, feature_params()) if cache_dir else None
+    features = dataset_features(dataset.paths, cache)
+    stage = fit_cascade(features, dataset.labels, train_indices, val_indices, deep_scores)
+    stage.save(cascade_path(model_path))
+    print(
+        f"📦 Cascade stage 1: threshold {stage.threshold:.3f}, "
+        f"skips {stage.report['val_skip_fraction']:.0%} of validation clips"
+    )
+    return stage.report
@@ -1,13 +1,29 @@
 # backend/database.py
 """
 Database models and connection for PostgreSQL.
-Stores training data uploads and retraining history.
+Stores training data uploads, retraining history and the training job queue.
+A SQLite URL (e.g. sqlite:///sentinel.db) works as a local stand-in.
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Float, Text
+from sqlalchemy import (
+    create_engine,
+    inspect,
+    select,
+    text,
+    update,
+    Column,
+    Integer,
+    String,
+    DateTime,
+    Float,
+    Text,
+    Boolean,
+    ForeignKey,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 
 # Try to load from .env file if available
@@ -41,14 +57,22 @@ def _get_engine():
     """Get or create database engine (lazy initialization)."""
     global _engine, _SessionLocal
     if _engine is None:
-        _engine = create_engine(
-            DATABASE_URL,
-            pool_size=5,  # Limit connection pool size
-            max_overflow=10,
-            pool_pre_ping=True,  # Verify connections before using
-            pool_recycle=3600,  # Recycle connections after 1 hour
-            echo=False,  # Don't echo SQL queries
-        )
+        if DATABASE_URL.startswith("sqlite"):
+            # Local stand-in: shared by the API threads and the training worker
+            _engine = create_engine(
+                DATABASE_URL,
+                connect_args={"check_same_thread": False, "timeout": 30},
+                echo=False,
+            )
+        else:
+            _engine = create_engine(
+                DATABASE_URL,
+                pool_size=5,  # Limit connection pool size
+                max_overflow=10,
+                pool_pre_ping=True,  # Verify connections before using
+                pool_recycle=3600,  # Recycle connections after 1 hour
+                echo=False,  # Don't echo SQL queries
+            )
         _SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
     return _engine
 
@@ -84,7 +108,12 @@ class TrainingDataUpload(Base):
 
 
 class RetrainingSession(Base):
-    """Model for storing retraining session information."""
+    """
+    Model for storing retraining session information.
+
+    progress, progress_message and heartbeat_at mirror the training job's
+    heartbeat, so clients reading the session see a running job advance.
+    """
 
     __tablename__ = "retraining_sessions"
 
@@ -94,7 +123,7 @@ class RetrainingSession(Base):
     end_timestamp = Column(DateTime, nullable=True)
     status = Column(
         String(50), default="pending"
-    )  # pending, preprocessing, training, completed, failed
+    )  # pending, preprocessing, training, completed, failed, cancelled
     epochs = Column(Integer, default=10)
     final_accuracy = Column(Float, nullable=True)
     final_val_accuracy = Column(Float, nullable=True)
@@ -102,6 +131,76 @@ class RetrainingSession(Base):
     final_val_loss = Column(Float, nullable=True)
     total_samples = Column(Integer, nullable=True)
     error_message = Column(Text, nullable=True)
+    progress = Column(Integer, default=0)  # Percent, from the job heartbeat
+    progress_message = Column(Text, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+
+
+class TrainingEpoch(Base):
+    """Metrics and throughput of one epoch of a retraining session."""
+
+    __tablename__ = "training_epochs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(
+        Integer, ForeignKey("retraining_sessions.id"), nullable=False, index=True
+    )
+    epoch = Column(Integer, nullable=False)  # 1-based
+    loss = Column(Float, nullable=True)
+    accuracy = Column(Float, nullable=True)
+    val_loss = Column(Float, nullable=True)
+    val_accuracy = Column(Float, nullable=True)
+    learning_rate = Column(Float, nullable=True)
+    samples_per_sec = Column(Float, nullable=True)  # Training steps only
+    duration_seconds = Column(Float, nullable=True)  # Including validation
+    timestamp = Column(DateTime, default=datetime.utcnow)
+
+
+class TrainingPhase(Base):
+    """Wall-clock time of one phase (extraction, preprocessing, fit, ...) of a retraining session."""
+
+    __tablename__ = "training_phases"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(
+        Integer, ForeignKey("retraining_sessions.id"), nullable=False, index=True
+    )
+    phase = Column(String(50), nullable=False)
+    duration_seconds = Column(Float, nullable=False)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+
+
+class TrainingJob(Base):
+    """
+    Queued training job, executed by training_worker.py.
+
+    active_key holds the dedupe key while the job is queued or running and
+    is cleared when it finishes; its unique index makes concurrent duplicate
+    submissions coalesce into one job. cancel_requested asks the worker
+    running the job to stop at the next batch boundary.
+    """
+
+    __tablename__ = "training_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)  # retrain, continue
+    params = Column(Text, nullable=False)  # JSON arguments of the job
+    dedupe_key = Column(String(255), nullable=False, index=True)
+    active_key = Column(String(255), nullable=True, unique=True)
+    session_id = Column(Integer, ForeignKey("retraining_sessions.id"), nullable=True)
+    upload_id = Column(Integer, ForeignKey("training_data_uploads.id"), nullable=True)
+    status = Column(String(50), default="queued", index=True)  # queued, running, completed, failed, cancelled
+    attempts = Column(Integer, default=0)
+    cancel_requested = Column(Boolean, default=False)
+    worker_id = Column(String(255), nullable=True)
+    progress = Column(Integer, default=0)
+    message = Column(Text, nullable=True)
+    result_version = Column(String(50), nullable=True)  # Model registry version
+    error_message = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
 
 
 def init_db():
@@ -109,6 +208,7 @@ def init_db():
     try:
         engine = _get_engine()
         Base.metadata.create_all(bind=engine)
+        add_missing_columns(engine)
         print("✅ Database tables created successfully!")
         print(
             f"📊 Database: {DATABASE_URL.split('@')[-1] if '@' in DATABASE_URL else DATABASE_URL}"
@@ -119,6 +219,29 @@ def init_db():
         raise
 
 
+def add_missing_columns(engine):
+    """
+    Add model columns missing from tables created by an older version.
+
+    create_all never alters existing tables. Columns are added as nullable
+    without a server default, so existing rows read NULL.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(
+                    text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+                )
+                print(f"🛠️ Added column {table.name}.{column.name}")
+
+
 def get_db():
     """Dependency for getting database session."""
     SessionLocal = get_session_local()
@@ -209,8 +332,295 @@ def update_retraining_session(
             session.total_samples = total_samples
         if error_message:
             session.error_message = error_message
+        if status == "completed":
+            session.progress = 100
         if status == "completed" or status == "failed":
             session.end_timestamp = datetime.utcnow()
         db.commit()
         db.refresh(session)
     return session
+
+
+def record_training_epoch(db, session_id, epoch, duration_seconds=None, **metrics):
+    """
+    Store the metrics of one training epoch.
+
+    Args:
+        db: Database session
+        session_id: Retraining session the epoch belongs to
+        epoch: 1-based epoch number
+        duration_seconds: Wall-clock time of the epoch
+        **metrics: loss, accuracy, val_loss, val_accuracy, learning_rate,
+            samples_per_sec (missing or unknown ones are stored as NULL)
+    """
+    columns = ("loss", "accuracy", "val_loss", "val_accuracy", "learning_rate", "samples_per_sec")
+    row = TrainingEpoch(
+        session_id=session_id,
+        epoch=epoch,
+        duration_seconds=duration_seconds,
+        **{name: float(metrics[name]) for name in columns if metrics.get(name) is not None},
+    )
+    db.add(row)
+    db.commit()
+    return row
+
+
+def record_training_phases(db, session_id, phase_seconds):
+    """
+    Store the wall-clock time of each phase of a retraining session.
+
+    Args:
+        db: Database session
+        session_id: Retraining session the phases belong to
+        phase_seconds: dict of phase name -> seconds, in execution order
+    """
+    for phase, seconds in phase_seconds.items():
+        db.add(TrainingPhase(session_id=session_id, phase=phase, duration_seconds=float(seconds)))
+    db.commit()
+
+
+def find_active_training_job(db, dedupe_key):
+    """Queued or running job with the given dedupe key, or None."""
+    return db.query(TrainingJob).filter(TrainingJob.active_key == dedupe_key).first()
+
+
+def enqueue_training_job(db, kind, params, dedupe_key, session_id=None, upload_id=None):
+    """
+    Add a training job unless an identical one is already queued or running.
+
+    Args:
+        db: Database session
+        kind: Job type ("retrain" or "continue")
+        params: JSON string with the job arguments
+        dedupe_key: Jobs with the same key are coalesced
+        session_id: Retraining session the job reports into
+        upload_id: Upload the job trains on
+
+    Returns:
+        (job, created): the new job, or the active one it was coalesced with
+    """
+    job = TrainingJob(
+        kind=kind,
+        params=params,
+        dedupe_key=dedupe_key,
+        active_key=dedupe_key,
+        session_id=session_id,
+        upload_id=upload_id,
+        status="queued",
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing = find_active_training_job(db, dedupe_key)
+        if existing is None:
+            raise  # Finished in the meantime; let the caller retry
+        return existing, False
+    db.refresh(job)
+    return job, True
+
+
+def claim_training_job(db, worker_id, max_attempts=3):
+    """
+    Atomically take the oldest queued job.
+
+    The candidate row is selected with FOR UPDATE SKIP LOCKED on PostgreSQL
+    (ignored by SQLite) and only claimed by an UPDATE conditional on it still
+    being queued, so two workers can never run the same job.
+
+    Args:
+        db: Database session
+        worker_id: Identifies the claiming worker
+        max_attempts: Jobs already started this often are failed instead
+
+    Returns:
+        The claimed job, or None if the queue is empty
+    """
+    while True:
+        job = (
+            db.query(TrainingJob)
+            .filter(TrainingJob.status == "queued")
+            .order_by(TrainingJob.id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            db.commit()
+            return None
+        now = datetime.utcnow()
+        if (job.attempts or 0) >= max_attempts:
+            finish_training_job(
+                db, job.id, None, "failed", error_message=f"Gave up after {job.attempts} attempts"
+            )
+            continue
+        claimed = db.execute(
+            update(TrainingJob)
+            .where(TrainingJob.id == job.id, TrainingJob.status == "queued")
+            .values(
+                status="running",
+                worker_id=worker_id,
+                attempts=TrainingJob.attempts + 1,
+                started_at=now,
+                heartbeat_at=now,
+            )
+        ).rowcount
+        db.commit()
+        if claimed == 1:
+            db.refresh(job)
+            return job
+
+
+def heartbeat_training_job(db, job_id, worker_id, progress=None, message=None):
+    """
+    Record that a worker is still running a job.
+
+    The progress is copied to the job's retraining session in the same
+    transaction.
+
+    Returns:
+        bool: False if the job is no longer running on this worker (e.g.
+        it was requeued as stale)
+    """
+    values = {"heartbeat_at": datetime.utcnow()}
+    if progress is not None:
+        values["progress"] = int(progress)
+    if message is not None:
+        values["message"] = message
+    updated = db.execute(
+        update(TrainingJob)
+        .where(
+            TrainingJob.id == job_id,
+            TrainingJob.worker_id == worker_id,
+            TrainingJob.status == "running",
+        )
+        .values(**values)
+    ).rowcount
+    if updated == 1:
+        session_values = {"heartbeat_at": values["heartbeat_at"]}
+        if progress is not None:
+            session_values["progress"] = values["progress"]
+        if message is not None:
+            session_values["progress_message"] = message
+        job_session = select(TrainingJob.session_id).where(TrainingJob.id == job_id)
+        db.execute(
+            update(RetrainingSession)
+            .where(RetrainingSession.id == job_session.scalar_subquery())
+            .values(**session_values)
+        )
+    db.commit()
+    return updated == 1
+
+
+def release_training_job(db, job_id, worker_id):
+    """Put a claimed job back in the queue without counting the attempt."""
+    db.execute(
+        update(TrainingJob)
+        .where(TrainingJob.id == job_id, TrainingJob.worker_id == worker_id)
+        .values(status="queued", worker_id=None, attempts=TrainingJob.attempts - 1)
+    )
+    db.commit()
+
+
+def requeue_stale_training_jobs(db, stale_seconds):
+    """
+    Put running jobs whose worker stopped heartbeating back in the queue.
+
+    A stale job that was asked to cancel is marked cancelled instead.
+
+    Returns:
+        int: Number of jobs requeued
+    """
+    now = datetime.utcnow()
+    stale = (TrainingJob.status == "running", TrainingJob.heartbeat_at < now - timedelta(seconds=stale_seconds))
+    db.execute(
+        update(TrainingJob)
+        .where(*stale, TrainingJob.cancel_requested.is_(True))
+        .values(status="cancelled", active_key=None, finished_at=now)
+    )
+    requeued = db.execute(
+        update(TrainingJob).where(*stale).values(status="queued", worker_id=None)
+    ).rowcount
+    db.commit()
+    return requeued
+
+
+def finish_training_job(db, job_id, worker_id, status, result_version=None, error_message=None):
+    """
+    Mark a job completed, failed or cancelled and release its dedupe key.
+
+    Args:
+        worker_id: Worker that ran the job (None: whoever holds it)
+
+    Returns:
+        bool: False if the job was not running on this worker
+    """
+    query = update(TrainingJob).where(TrainingJob.id == job_id)
+    if worker_id is not None:
+        query = query.where(TrainingJob.worker_id == worker_id, TrainingJob.status == "running")
+    updated = db.execute(
+        query.values(
+            status=status,
+            active_key=None,
+            progress=100 if status == "completed" else TrainingJob.progress,
+            result_version=result_version,
+            error_message=error_message,
+            finished_at=datetime.utcnow(),
+        )
+    ).rowcount
+    db.commit()
+    return updated == 1
+
+
+def cancel_training_job(db, session_id):
+    """
+    Cancel the training job of a retraining session.
+
+    A queued job is cancelled right away; a running one gets
+    cancel_requested and is stopped by its worker.
+
+    Returns:
+        TrainingJob with its updated status, or None if the session has no job
+    """
+    job = db.query(TrainingJob).filter(TrainingJob.session_id == session_id).first()
+    if job is None:
+        return None
+    cancelled = db.execute(
+        update(TrainingJob)
+        .where(TrainingJob.id == job.id, TrainingJob.status == "queued")
+        .values(status="cancelled", cancel_requested=True, active_key=None, finished_at=datetime.utcnow())
+    ).rowcount
+    if not cancelled:
+        db.execute(
+            update(TrainingJob)
+            .where(TrainingJob.id == job.id, TrainingJob.status == "running")
+            .values(cancel_requested=True)
+        )
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def training_cancel_requested(db, session_id):
+    """Whether the training job of a session was asked to cancel."""
+    return (
+        db.query(TrainingJob.id)
+        .filter(TrainingJob.session_id == session_id, TrainingJob.cancel_requested.is_(True))
+        .first()
+        is not None
+    )
+
+
+def list_active_training_jobs(db):
+    """Queued and running training jobs, oldest first."""
+    return (
+        db.query(TrainingJob)
+        .filter(TrainingJob.status.in_(("queued", "running")))
+        .order_by(TrainingJob.id)
+        .all()
+    )
+
+
+def get_training_job(db, job_id):
+    """Training job by id, or None."""
+    return db.query(TrainingJob).filter(TrainingJob.id == job_id).first()
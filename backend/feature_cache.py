@@ -0,0 +1,150 @@
+# backend/feature_cache.py
+"""
+Persistent, content-addressed cache for preprocessed features.
+
+Entries are .npy files named after the SHA-256 of the source audio bytes and
+stored in a sub-directory named after a fingerprint of the preprocessing
+parameters. Changing any parameter therefore starts a fresh directory, and the
+stale ones are deleted when the cache is opened. The total size is capped and
+the least recently used entries (by file mtime, refreshed on every hit) are
+evicted first.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+
+import numpy as np
+
+# Size cap for the cache directory (can be overridden per cache instance)
+FEATURE_CACHE_MAX_MB = float(os.getenv("FEATURE_CACHE_MAX_MB", "2048"))
+
+_PARAMS_FILE = "params.json"
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def params_fingerprint(params):
+    """Short stable hash of a JSON-serialisable parameter dictionary."""
+    encoded = json.dumps(params, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class FeatureCache:
+    """
+    On-disk LRU cache of numpy arrays keyed by audio content hash.
+
+    Args:
+        cache_dir: Root directory of this cache (one cache kind per root)
+        params: Dictionary of parameters the cached features depend on
+        max_bytes: Size cap; defaults to FEATURE_CACHE_MAX_MB
+    """
+
+    def __init__(self, cache_dir, params, max_bytes=None):
+        self.root = str(cache_dir)
+        self.params = params
+        self.fingerprint = params_fingerprint(params)
+        self.directory = os.path.join(self.root, self.fingerprint)
+        self.max_bytes = (
+            int(FEATURE_CACHE_MAX_MB * 1024 * 1024) if max_bytes is None else max_bytes
+        )
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._remove_stale_generations()
+        with open(os.path.join(self.directory, _PARAMS_FILE), "w") as f:
+            json.dump(params, f, indent=2, sort_keys=True)
+
+        self._entries = OrderedDict()  # key -> size in bytes, oldest first
+        self._total_bytes = 0
+        self._load_index()
+
+    def _remove_stale_generations(self):
+        """Delete entries written with different preprocessing parameters."""
+        for entry in os.scandir(self.root):
+            if entry.name == self.fingerprint or not entry.is_dir():
+                continue
+            if os.path.exists(os.path.join(entry.path, _PARAMS_FILE)):
+                print(f"🧹 Invalidating feature cache generation {entry.name}")
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    def _load_index(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npy"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def key_for_file(self, audio_path):
+        """Cache key for an audio file (hash of its content)."""
+        return hash_file(audio_path)
+
+    def get(self, key):
+        """Return the cached array for key, or None on a miss."""
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            array = np.load(path)
+            os.utime(path)  # Persist recency for the next process
+        except (OSError, ValueError):
+            self._forget(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return array
+
+    def put(self, key, array):
+        """Store array under key (atomically) and evict old entries if needed."""
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(temp_path, path)
+
+        if key in self._entries:
+            self._total_bytes -= self._entries.pop(key)
+        size = os.path.getsize(path)
+        self._entries[key] = size
+        self._total_bytes += size
+        self._evict()
+
+    def _forget(self, key):
+        self._total_bytes -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._forget(oldest)
+
+    def stats(self):
+        """Hit/miss counters and current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
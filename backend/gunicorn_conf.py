@@ -0,0 +1,45 @@
+# backend/gunicorn_conf.py
+"""
+Gunicorn settings for multi-worker serving (start.sh uses this when
+WEB_CONCURRENCY > 1).
+
+The app is imported once in the master (preload_app), so TensorFlow, librosa
+and, with INFERENCE_BACKEND=tflite, the TFLite model bytes are shared
+copy-on-write by the forked Uvicorn workers instead of being loaded per
+worker. Each worker gets an equal share
+of the CPU cores for its TensorFlow / TFLite / preprocessing threads.
+"""
+
+import os
+
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+# Seconds without a heartbeat before a worker is restarted (training runs in
+# training_worker.py and predictions off the event loop, so workers stay responsive)
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+
+# Thread budgets must be in the environment before the app imports TensorFlow
+_cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+threads_per_worker = str(max(1, (_cores or 1) // workers))
+for _name in (
+    "TF_NUM_INTRAOP_THREADS",
+    "OMP_NUM_THREADS",
+    "INFERENCE_THREADS",
+    "PREDICT_PREPROCESS_THREADS",
+    "PREDICT_DECODE_WORKERS",
+    "MAX_CONCURRENT_PREDICTIONS",
+):
+    os.environ.setdefault(_name, threads_per_worker)
+os.environ.setdefault("TF_NUM_INTEROP_THREADS", "1")
+
+
+def when_ready(server):
+    """Runs in the master after the app is preloaded, before any worker forks."""
+    import app
+
+    app.preload_model_bytes()
+    server.log.info(
+        f"Forking {workers} workers with {threads_per_worker} threads each"
+    )
@@ -0,0 +1,209 @@
+# backend/inference.py
+"""
+Compiled inference for the serving process.
+
+model.predict builds a data pipeline and steps through a training-style loop
+on every call, which dominates latency for the small batches /predict sends.
+ModelPredictor instead calls the model through a tf.function traced once for
+a (None, 224, 224, 3) float32 input, optionally compiled with XLA.
+
+INFERENCE_BACKEND can instead serve the quantized TFLite or ONNX model that
+src/export.py writes next to the Keras model after training.
+"""
+
+import os
+import threading
+
+import numpy as np
+import tensorflow as tf
+
+# keras: Keras model via ModelPredictor | tflite | onnx: exported models
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "keras")
+INFERENCE_BACKENDS = ("keras", "tflite", "onnx")
+# Threads used by the TFLite / ONNX Runtime kernels (0 = runtime default)
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))
+# eager: op-by-op model call | graph: traced tf.function | xla: jit-compiled
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "graph")
+INFERENCE_MODES = ("eager", "graph", "xla")
+INPUT_SHAPE = (224, 224, 3)
+# XLA compiles one program per input shape, so batches are padded to these
+XLA_BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class ModelPredictor:
+    """
+    Callable mapping an (N, 224, 224, 3) batch to N danger probabilities
+    (or a batch of whatever input the model takes, e.g. the compact model's
+    single-channel spectrograms).
+
+    Args:
+        model: Keras model with a single sigmoid output
+        mode: One of INFERENCE_MODES (default: INFERENCE_MODE)
+    """
+
+    def __init__(self, model, mode=None):
+        mode = mode or INFERENCE_MODE
+        if mode not in INFERENCE_MODES:
+            raise ValueError(f"Unknown inference mode {mode!r}, expected one of {INFERENCE_MODES}")
+        self.model = model
+        self.mode = mode
+        self._fn = None
+        if mode != "eager":
+            self._fn = tf.function(
+                lambda x: model(x, training=False),
+                input_signature=[tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32)],
+                jit_compile=mode == "xla",
+            )
+
+    def __call__(self, x):
+        """
+        Score a batch.
+
+        Args:
+            x: numpy array with shape (N, 224, 224, 3)
+
+        Returns:
+            numpy array with shape (N,)
+        """
+        x = np.asarray(x, dtype=np.float32)
+        if self._fn is None:
+            return np.asarray(self.model(x, training=False))[:, 0]
+
+        n = len(x)
+        if self.mode == "xla":
+            padded = next((b for b in XLA_BATCH_BUCKETS if b >= n), None)
+            if padded is not None and padded > n:
+                x = np.concatenate([x, np.zeros((padded - n,) + x.shape[1:], np.float32)])
+        return self._fn(tf.constant(x)).numpy()[:n, 0]
+
+
+class TFLitePredictor:
+    """
+    Predictor backed by a TFLite model (see ModelPredictor for the interface).
+
+    The interpreter is not thread-safe, so calls are serialized; samples are
+    invoked one at a time on a batch-1 graph instead of reallocating tensors
+    for every batch size.
+
+    Args:
+        model_path: Path to the .tflite file
+        num_threads: Kernel threads (default: INFERENCE_THREADS)
+        model_content: Flatbuffer bytes already in memory (e.g. read before
+            forking workers); the interpreter uses them in place
+    """
+
+    def __init__(self, model_path, num_threads=None, model_content=None):
+        num_threads = num_threads or INFERENCE_THREADS or None
+        self.model_path = model_path
+        if model_content is not None:
+            self._interpreter = tf.lite.Interpreter(
+                model_content=model_content, num_threads=num_threads
+            )
+        else:
+            self._interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._lock = threading.Lock()
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        scores = np.empty(len(x), dtype=np.float32)
+        with self._lock:
+            for i in range(len(x)):
+                self._interpreter.set_tensor(self._input["index"], x[i : i + 1])
+                self._interpreter.invoke()
+                scores[i] = self._interpreter.get_tensor(self._output["index"])[0, 0]
+        return scores
+
+
+class OnnxPredictor:
+    """
+    Predictor backed by ONNX Runtime (needs the optional onnxruntime package).
+
+    Args:
+        model_path: Path to the .onnx file
+        num_threads: Intra-op threads (default: INFERENCE_THREADS)
+        model_content: Serialized model bytes to load instead of model_path
+    """
+
+    def __init__(self, model_path, num_threads=None, model_content=None):
+        import onnxruntime as ort
+
+        num_threads = num_threads or INFERENCE_THREADS
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.model_path = model_path
+        self._session = ort.InferenceSession(
+            model_content if model_content is not None else model_path,
+            sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_name = self._session.get_inputs()[0].name
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        return self._session.run(None, {self._input_name: x})[0][:, 0]
+
+
+def exported_model_path(model_path, backend):
+    """Path of the exported model next to the Keras model (.tflite / .onnx)."""
+    return os.path.splitext(model_path)[0] + f".{backend}"
+
+
+def check_servable(metadata):
+    """
+    Refuse a model the serving process cannot feed.
+
+    Uploads, streams, long audio and warm-up are all rendered as INPUT_SHAPE
+    spectrogram images, so a model trained on the compact model's
+    single-channel mel features must never become the current version.
+
+    Args:
+        metadata: Metadata saved with the model (older models have no
+            feature_type and all take images)
+
+    Raises:
+        ValueError: If the model takes another feature type
+    """
+    feature_type = metadata.get("feature_type", "image")
+    if feature_type != "image":
+        raise ValueError(
+            f"Serving feeds {INPUT_SHAPE} spectrogram images, "
+            f"but this model takes {feature_type!r} features"
+        )
+
+
+def load_predictor(model_path, backend=None, model=None, model_content=None):
+    """
+    Build the predictor for a serving backend.
+
+    Args:
+        model_path: Path to the Keras model; exports are looked up next to it
+        backend: One of INFERENCE_BACKENDS (default: INFERENCE_BACKEND)
+        model: Already loaded Keras model (keras backend only)
+        model_content: Exported model bytes already in memory (tflite / onnx)
+
+    Returns:
+        Callable mapping an (N, 224, 224, 3) batch to N danger probabilities
+
+    Raises:
+        FileNotFoundError: If the model file for the backend does not exist
+    """
+    backend = backend or INFERENCE_BACKEND
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}, expected one of {INFERENCE_BACKENDS}")
+
+    if backend == "keras":
+        if model is None:
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"Model file not found: {model_path}")
+            model = tf.keras.models.load_model(model_path)
+        return ModelPredictor(model)
+
+    path = exported_model_path(model_path, backend)
+    if model_content is None and not os.path.exists(path):
+        raise FileNotFoundError(f"Exported {backend} model not found: {path}")
+    if backend == "tflite":
+        return TFLitePredictor(path, model_content=model_content)
+    return OnnxPredictor(path, model_content=model_content)
@@ -24,6 +24,9 @@ if __name__ == "__main__":
         print("\nTables created:")
         print("  - training_data_uploads")
         print("  - retraining_sessions")
+        print("  - training_epochs")
+        print("  - training_phases")
+        print("  - training_jobs")
         print("\n💡 You can view the database using:")
         print("   - pgAdmin: https://www.pgadmin.org/")
         print("   - Command line: psql -U postgres -d sentinel_db")
@@ -0,0 +1,254 @@
+# backend/model_registry.py
+"""
+Versioned model registry.
+
+Every trained model is an immutable version directory (v0001, v0002, ...)
+holding the Keras model, its TFLite/ONNX exports and its metadata. Training
+writes into a private staging directory that is renamed into place when it
+is published, and a CURRENT file (replaced atomically) names the version
+being served. Worker processes follow CURRENT, so publishing or rolling back
+in one worker switches all of them.
+
+LoadedModels keeps the most recently served versions in memory, up to a
+size budget, so a rollback to one of them is an instant swap.
+"""
+
+import fcntl
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+MODEL_REGISTRY_DIR = os.getenv(
+    "MODEL_REGISTRY_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "registry"),
+)
+# Versions kept on disk (the current one is never deleted)
+MODEL_REGISTRY_KEEP = int(os.getenv("MODEL_REGISTRY_KEEP", "5"))
+# Memory budget for loaded versions kept for instant rollback
+LOADED_MODELS_MAX_MB = float(os.getenv("LOADED_MODELS_MAX_MB", "512"))
+MODEL_FILENAME = "sentinel_model.h5"
+
+_VERSION_PATTERN = re.compile(r"^v(\d+)$")
+_CURRENT_FILE = "CURRENT"
+
+
+def read_metadata(model_path):
+    """Metadata JSON saved next to a model ({} if it has none)."""
+    try:
+        with open(model_path.replace(".h5", "_metadata.json"), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def model_artifacts(model_path):
+    """The Keras model file and its sibling exports / metadata that exist."""
+    stem = os.path.splitext(model_path)[0]
+    candidates = [
+        model_path, f"{stem}_metadata.json", f"{stem}_cascade.json", f"{stem}.tflite", f"{stem}.onnx"
+    ]
+    return [path for path in candidates if os.path.exists(path)]
+
+
+class ModelRegistry:
+    """
+    Immutable model versions on disk with an atomic CURRENT pointer.
+
+    Args:
+        root: Registry directory
+        keep: Versions kept on disk by prune
+    """
+
+    def __init__(self, root=MODEL_REGISTRY_DIR, keep=MODEL_REGISTRY_KEEP):
+        self.root = str(root)
+        self.keep = keep
+        os.makedirs(self.root, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.root, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def versions(self):
+        """Published versions, oldest first."""
+        found = []
+        for name in os.listdir(self.root):
+            match = _VERSION_PATTERN.match(name)
+            if match and os.path.isdir(os.path.join(self.root, name)):
+                found.append((int(match.group(1)), name))
+        return [name for _, name in sorted(found)]
+
+    def current_version(self):
+        """Version named by CURRENT, or None for an empty registry."""
+        try:
+            with open(os.path.join(self.root, _CURRENT_FILE), "r") as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version if os.path.isdir(os.path.join(self.root, version)) else None
+
+    def model_path(self, version):
+        return os.path.join(self.root, version, MODEL_FILENAME)
+
+    def metadata(self, version):
+        """Metadata saved with a version ({} if it has none)."""
+        return read_metadata(self.model_path(version))
+
+    def staging_model_path(self):
+        """Model path inside a new private directory for training to write to."""
+        staging_dir = tempfile.mkdtemp(prefix=".staging-", dir=self.root)
+        return os.path.join(staging_dir, MODEL_FILENAME)
+
+    def checkpoint_dir(self, run_id):
+        """Directory for the resumable checkpoints of a training run (created if missing)."""
+        path = os.path.join(self.root, ".checkpoints", str(run_id))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def discard(self, staging_model_path):
+        """Delete a staging directory whose training failed."""
+        shutil.rmtree(os.path.dirname(staging_model_path), ignore_errors=True)
+
+    def publish(self, staging_model_path, parent=None):
+        """
+        Turn a staging directory into the next immutable version.
+
+        CURRENT is not changed; call set_current once the version is
+        loaded and serving.
+
+        Args:
+            staging_model_path: Model path from staging_model_path
+            parent: Version the model was trained from
+
+        Returns:
+            str: The new version name
+        """
+        with self._locked():
+            version = self._publish_locked(staging_model_path, parent)
+        print(f"📦 Published model {version}")
+        return version
+
+    def _publish_locked(self, staging_model_path, parent):
+        metadata_path = staging_model_path.replace(".h5", "_metadata.json")
+        try:
+            with open(metadata_path, "r") as f:
+                metadata = json.load(f)
+        except (FileNotFoundError, ValueError):
+            metadata = {}
+
+        versions = self.versions()
+        number = int(_VERSION_PATTERN.match(versions[-1]).group(1)) + 1 if versions else 1
+        version = f"v{number:04d}"
+        metadata.update({"version": version, "parent_version": parent, "created_at": time.time()})
+        with open(metadata_path, "w") as f:
+            json.dump(metadata, f, indent=2)
+        os.rename(os.path.dirname(staging_model_path), os.path.join(self.root, version))
+        return version
+
+    def import_model(self, model_path):
+        """
+        Seed an empty registry with an existing model (e.g. the deployed .h5).
+
+        Returns:
+            str: The current version (the imported one, unless another
+            process seeded the registry first)
+        """
+        if self.current_version() is not None:
+            return self.current_version()
+
+        staging_model_path = self.staging_model_path()
+        stem = os.path.splitext(model_path)[0]
+        staging_stem = os.path.splitext(staging_model_path)[0]
+        for path in model_artifacts(model_path):
+            shutil.copy2(path, staging_stem + path[len(stem) :])
+
+        with self._locked():
+            current = self.current_version()
+            if current is not None:
+                self.discard(staging_model_path)
+                return current
+            version = self._publish_locked(staging_model_path, parent=None)
+            self._write_current(version)
+        print(f"📦 Imported {model_path} as model {version}")
+        return version
+
+    def _write_current(self, version):
+        tmp_path = os.path.join(self.root, f"{_CURRENT_FILE}.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.root, _CURRENT_FILE))
+
+    def set_current(self, version):
+        """
+        Atomically point CURRENT at a version and prune old ones.
+
+        Raises:
+            KeyError: If the version does not exist
+        """
+        with self._locked():
+            if version not in self.versions():
+                raise KeyError(version)
+            self._write_current(version)
+        self.prune()
+
+    def prune(self):
+        """Delete the oldest versions beyond keep, never the current one."""
+        with self._locked():
+            current = self.current_version()
+            versions = self.versions()
+            for version in versions[: max(0, len(versions) - self.keep)]:
+                if version != current:
+                    shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
+
+    def previous_version(self, version):
+        """The version published before the given one, or None."""
+        versions = self.versions()
+        if version not in versions:
+            return None
+        index = versions.index(version)
+        return versions[index - 1] if index > 0 else None
+
+
+class LoadedModels:
+    """
+    In-memory LRU of loaded model versions, bounded by an approximate size.
+
+    The size of an entry is taken to be the size of the artifact it was
+    loaded from. The most recent entry is always kept, whatever its size.
+
+    Args:
+        max_bytes: Memory budget (default: LOADED_MODELS_MAX_MB)
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = (
+            int(LOADED_MODELS_MAX_MB * 1024 * 1024) if max_bytes is None else max_bytes
+        )
+        self._entries = OrderedDict()  # version -> (entry, size in bytes)
+
+    def get(self, version):
+        item = self._entries.get(version)
+        if item is None:
+            return None
+        self._entries.move_to_end(version)
+        return item[0]
+
+    def put(self, version, entry, size_bytes):
+        self._entries[version] = (entry, size_bytes)
+        self._entries.move_to_end(version)
+        while len(self._entries) > 1 and sum(size for _, size in self._entries.values()) > self.max_bytes:
+            evicted, _ = self._entries.popitem(last=False)
+            print(f"🗑️ Unloaded model {evicted} (memory budget)")
+
+    def versions(self):
+        """Loaded versions, least recently served first."""
+        return list(self._entries)
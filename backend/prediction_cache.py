@@ -0,0 +1,146 @@
+# backend/prediction_cache.py
+"""
+Result cache for /predict keyed by audio content and model version.
+
+Re-submitted clips (retries, several devices, double posts) are answered
+from an LRU cache with a TTL. Identical requests that arrive while the first
+one is still being computed wait for its result instead of running again.
+Keys include the model version, so a retrain invalidates every entry.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "1024"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "600"))  # Seconds
+
+
+class PredictionCache:
+    """
+    LRU + TTL result cache with in-flight request coalescing.
+
+    Args:
+        max_entries: Cached results kept (0 disables caching, not coalescing)
+        ttl_seconds: Lifetime of a cached result
+    """
+
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, ttl_seconds=PREDICTION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._in_flight = {}  # key -> [task, waiting callers]
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(data, model_version, variant=""):
+        """Cache key for raw upload bytes under a model version and request variant."""
+        return f"{hashlib.sha256(data).hexdigest()}:{model_version}:{variant}"
+
+    @staticmethod
+    def key_for_file(fileobj, model_version, variant="", chunk_size=1 << 20):
+        """
+        key_for of a file's contents, hashed chunk by chunk.
+
+        The file is read from the start and rewound afterwards, so the
+        upload never has to be held in memory at once.
+        """
+        digest = hashlib.sha256()
+        fileobj.seek(0)
+        for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+            digest.update(chunk)
+        fileobj.seek(0)
+        return f"{digest.hexdigest()}:{model_version}:{variant}"
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, result):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(self, key, compute, cacheable=None):
+        """
+        Return the cached result for key, or compute it once for all callers.
+
+        The computation runs in its own task: a caller that is cancelled
+        (e.g. its client disconnected) does not cancel it for the others, and
+        it is only cancelled once every waiting caller is gone.
+
+        Args:
+            key: Key from key_for
+            compute: Zero-argument coroutine function producing the result
+            cacheable: Optional predicate; results failing it (e.g. error
+                responses) are shared with in-flight callers but not cached
+
+        Returns:
+            The result of compute()
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[1]
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.coalesced += 1
+            in_flight[1] += 1
+        else:
+            self.misses += 1
+            in_flight = [asyncio.ensure_future(compute()), 1]
+            self._in_flight[key] = in_flight
+
+            def on_done(task):
+                if self._in_flight.get(key) is in_flight:
+                    del self._in_flight[key]
+                if task.cancelled() or task.exception() is not None:
+                    return
+                result = task.result()
+                if cacheable is None or cacheable(result):
+                    self._store(key, result)
+
+            in_flight[0].add_done_callback(on_done)
+
+        task = in_flight[0]
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            in_flight[1] -= 1
+            if in_flight[1] == 0:
+                if self._in_flight.get(key) is in_flight:
+                    del self._in_flight[key]
+                task.cancel()
+            raise
+
+    def metrics(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,114 @@
+# backend/shared_state.py
+"""
+Training state shared by all API worker processes.
+
+With several workers, module globals would disagree about whether a model
+is training and what its progress is. The state lives in a small JSON file
+instead, written atomically under an exclusive file lock: one worker claims
+training and every worker reports the same status. Which model version is
+served is tracked by the model registry (model_registry.py).
+"""
+
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+
+TRAINING_STATE_PATH = os.getenv(
+    "TRAINING_STATE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "training_state.json"),
+)
+
+IDLE_STATUS = {
+    "status": "idle",
+    "message": "",
+    "progress": 0,
+    "epoch": 0,
+    "total_epochs": 0,
+}
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedTrainingState:
+    """
+    File-backed training flag and training status.
+
+    Args:
+        path: JSON state file (a sibling .lock file serializes writers)
+    """
+
+    def __init__(self, path=TRAINING_STATE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        with open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            state = {}
+        state.setdefault("is_training", False)
+        state.setdefault("owner_pid", None)
+        state.setdefault("training_status", dict(IDLE_STATUS))
+        # A worker that died mid-training must not block training forever
+        if state["is_training"] and not (state["owner_pid"] and _pid_alive(state["owner_pid"])):
+            state["is_training"] = False
+            state["owner_pid"] = None
+        return state
+
+    def _save(self, state):
+        with open(f"{self.path}.tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def read(self):
+        """Current state: is_training, owner_pid, training_status."""
+        return self._load()
+
+    def claim_training(self):
+        """
+        Atomically mark this process as the one training.
+
+        Returns:
+            bool: False if another (live) process is already training
+        """
+        with self._locked():
+            state = self._load()
+            if state["is_training"]:
+                return False
+            state["is_training"] = True
+            state["owner_pid"] = os.getpid()
+            self._save(state)
+            return True
+
+    def release_training(self):
+        """Clear the training flag (the status is kept for the dashboard)."""
+        with self._locked():
+            state = self._load()
+            state["is_training"] = False
+            state["owner_pid"] = None
+            self._save(state)
+
+    def set_training_status(self, status):
+        with self._locked():
+            state = self._load()
+            state["training_status"] = status
+            self._save(state)
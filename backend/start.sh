@@ -6,5 +6,16 @@ export TF_FORCE_GPU_ALLOW_GROWTH=true
 export TF_XLA_FLAGS=--tf_xla_cpu_global_jit=false
 export TF_DISABLE_XLA=1
 
+# Training jobs queued by the API run in a separate worker process
+# (TRAINING_WORKER=0 when training_worker.py runs as its own service)
+if [ "${TRAINING_WORKER:-1}" = "1" ]; then
+    python training_worker.py &
+fi
+
+# Several workers: gunicorn preloads the app once and forks (see gunicorn_conf.py)
+if [ "${WEB_CONCURRENCY:-1}" -gt 1 ]; then
+    exec gunicorn app:app -c gunicorn_conf.py
+fi
+
 # Run uvicorn with the PORT environment variable
-exec uvicorn app:app --host 0.0.0.0 --port ${PORT:-8000}
\ No newline at end of file
+exec uvicorn app:app --host 0.0.0.0 --port ${PORT:-8000}
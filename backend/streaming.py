@@ -0,0 +1,115 @@
+# backend/streaming.py
+"""
+Incremental mel spectrogram over a live PCM stream.
+
+Keeps the mel power columns of the last DURATION seconds in a ring buffer.
+Each pushed chunk only computes the STFT frames that became complete, so
+scoring a new window every hop costs a few frames instead of a full 3-second
+spectrogram.
+"""
+
+import numpy as np
+import soxr
+
+from preprocessing import (
+    DURATION,
+    HOP_LENGTH,
+    N_FFT,
+    N_MELS,
+    SAMPLE_RATE,
+    batch_power_to_db,
+    frames_to_mel,
+)
+
+
+class StreamingMelSpectrogram:
+    """
+    Sliding-window mel spectrogram of a mono stream at SAMPLE_RATE.
+
+    Frame k is centred on stream sample k * HOP_LENGTH, as with librosa's
+    center=True. Unlike an offline clip, the first and last two frames of a
+    window see the neighbouring audio instead of zero padding; all other
+    columns are identical to batch_mel_spectrogram on the same samples.
+
+    Args:
+        window_seconds: Length of the scored window (default: DURATION)
+        input_sr: Sample rate of the pushed audio; resampled to SAMPLE_RATE
+    """
+
+    def __init__(self, window_seconds=DURATION, input_sr=SAMPLE_RATE):
+        self.sr = SAMPLE_RATE
+        self._resampler = None
+        if input_sr != SAMPLE_RATE:
+            self._resampler = soxr.ResampleStream(
+                input_sr, SAMPLE_RATE, 1, dtype="float32"
+            )
+        self.n_frames = 1 + int(SAMPLE_RATE * window_seconds) // HOP_LENGTH
+        self._columns = np.zeros((self.n_frames, N_MELS), dtype=np.float32)
+        self._next_column = 0
+        self.frames_computed = 0
+        # Start with half a frame of silence so frame 0 is centred on sample 0
+        self._pending = np.zeros(N_FFT // 2, dtype=np.float32)
+        self.samples_seen = 0
+
+    @property
+    def ready(self):
+        """True once a full window of frames has been computed."""
+        return self.frames_computed >= self.n_frames
+
+    @property
+    def window_end(self):
+        """Stream time (seconds) at the centre of the newest frame."""
+        return max(self.frames_computed - 1, 0) * HOP_LENGTH / self.sr
+
+    def resample(self, samples):
+        """Convert input-rate audio to SAMPLE_RATE (no-op if rates match)."""
+        samples = np.asarray(samples, dtype=np.float32).ravel()
+        if self._resampler is None:
+            return samples
+        return self._resampler.resample_chunk(samples)
+
+    def samples_until(self, frame_count):
+        """Samples (at SAMPLE_RATE) still needed to reach frame_count frames."""
+        missing = frame_count - self.frames_computed
+        if missing <= 0:
+            return 0
+        return max(0, (missing - 1) * HOP_LENGTH + N_FFT - len(self._pending))
+
+    def push(self, samples):
+        """
+        Append audio at SAMPLE_RATE and compute the STFT frames it completes.
+
+        Args:
+            samples: 1-D float32 array of new samples (see resample)
+
+        Returns:
+            int: Number of new frames
+        """
+        samples = np.asarray(samples, dtype=np.float32).ravel()
+        self.samples_seen += len(samples)
+        buffer = np.concatenate([self._pending, samples])
+        if len(buffer) < N_FFT:
+            self._pending = buffer
+            return 0
+
+        n_new = 1 + (len(buffer) - N_FFT) // HOP_LENGTH
+        frames = np.lib.stride_tricks.sliding_window_view(buffer, N_FFT)
+        # Only the newest window's worth of frames can ever be read back
+        first = max(0, n_new - self.n_frames)
+        new_frames = frames[first * HOP_LENGTH :: HOP_LENGTH][: n_new - first]
+        columns = frames_to_mel(new_frames, self.sr)
+
+        positions = (self._next_column + np.arange(first, n_new)) % self.n_frames
+        self._columns[positions] = columns
+        self._next_column = (self._next_column + n_new) % self.n_frames
+        self.frames_computed += n_new
+        self._pending = buffer[n_new * HOP_LENGTH :]
+        return n_new
+
+    def window_power(self):
+        """Mel power of the current window, oldest frame first: (N_MELS, frames)."""
+        return np.roll(self._columns, -self._next_column, axis=0).T
+
+    def window_db(self):
+        """dB mel spectrogram of the current window (ref=max, like offline clips)."""
+        return batch_power_to_db(self.window_power()[np.newaxis])[0]
@@ -0,0 +1,156 @@
+# backend/training_telemetry.py
+"""
+Live progress and per-epoch telemetry of a training run.
+
+TrainingTelemetry is a Keras callback handed to train_model. It publishes
+epoch/batch progress, the latest loss/accuracy and samples/sec into the
+shared training status shown by /model/status, and stores one
+training_epochs row per epoch for the retraining session. It also polls
+the database for a cancellation request (POST /training/{session_id}/cancel)
+and stops training at the next batch boundary. All of it goes through
+the state file and the database rather than process memory, so the callback
+works the same inside the training subprocess (see workload.py).
+"""
+
+import os
+import sys
+import time
+
+from tensorflow import keras
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.database import (
+    get_session_local,
+    record_training_epoch,
+    training_cancel_requested,
+    update_retraining_session,
+)
+from backend.shared_state import SharedTrainingState
+
+# Minimum seconds between batch-level status updates (each rewrites the state file)
+TELEMETRY_BATCH_INTERVAL = float(os.getenv("TELEMETRY_BATCH_INTERVAL", "1.0"))
+# Overall progress (percent) reported at the start and the end of fit
+FIT_PROGRESS_RANGE = (30, 95)
+# Minimum seconds between checks for a cancellation request (one query each)
+CANCEL_POLL_INTERVAL = float(os.getenv("CANCEL_POLL_INTERVAL", "2.0"))
+
+
+class TrainingTelemetry(keras.callbacks.Callback):
+    """
+    Publish live training progress and record per-epoch metrics.
+
+    Add it after SamplesPerSecond so that the epoch logs already hold
+    samples_per_sec. Database errors are reported once and then only the
+    status is published. After a cancellation request it stops training and
+    sets ``cancelled``, which makes train_model raise TrainingCancelled.
+
+    Args:
+        session_id: Retraining session to record epochs for (None: status only)
+        state_path: Shared training state file (default: TRAINING_STATE_PATH)
+    """
+
+    def __init__(self, session_id=None, state_path=None):
+        super().__init__()
+        self.session_id = session_id
+        self.state_path = state_path
+        self.cancelled = False
+        self._state = None  # Opened in on_train_begin (the callback is pickled to the training process)
+
+    def _publish(self, message, epoch, epochs_done, logs=None, **extra):
+        total_epochs = self.params.get("epochs") or 1
+        start, end = FIT_PROGRESS_RANGE
+        status = {
+            "status": "training",
+            "message": message,
+            "progress": int(start + (end - start) * min(epochs_done / total_epochs, 1.0)),
+            "epoch": epoch,
+            "total_epochs": total_epochs,
+        }
+        status.update(extra)
+        for name, value in (logs or {}).items():
+            try:
+                status[name] = float(value)
+            except (TypeError, ValueError):
+                pass
+        self._state.set_training_status(status)
+
+    def _update_database(self, write):
+        if self.session_id is None:
+            return
+        try:
+            db = get_session_local()()
+            try:
+                write(db)
+            finally:
+                db.close()
+        except Exception as e:
+            print(f"⚠️ Training telemetry not saved to the database: {e}")
+            self.session_id = None
+
+    def _learning_rate(self):
+        try:
+            return float(keras.ops.convert_to_numpy(self.model.optimizer.learning_rate))
+        except Exception:
+            return None
+
+    def on_train_begin(self, logs=None):
+        self._state = SharedTrainingState(self.state_path) if self.state_path else SharedTrainingState()
+        self._last_publish = 0.0
+        self._last_cancel_check = time.perf_counter()
+        self._update_database(
+            lambda db: update_retraining_session(db, self.session_id, status="training")
+        )
+        self._publish("Training model...", 1, 0.0)
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch = epoch
+        self._epoch_start = time.perf_counter()
+
+    def _check_cancelled(self, db):
+        if training_cancel_requested(db, self.session_id):
+            print("🛑 Training cancelled, stopping...")
+            self.cancelled = True
+            self.model.stop_training = True
+            self._state.set_training_status({
+                "status": "cancelling",
+                "message": "Cancelling training...",
+                "progress": self._state.read()["training_status"].get("progress", 0),
+            })
+
+    def check_cancelled(self):
+        """Poll for a cancellation request now (train_model calls it between phases)."""
+        if not self.cancelled:
+            self._update_database(self._check_cancelled)
+
+    def on_train_batch_end(self, batch, logs=None):
+        now = time.perf_counter()
+        if not self.cancelled and now - self._last_cancel_check >= CANCEL_POLL_INTERVAL:
+            self._last_cancel_check = now
+            self.check_cancelled()
+        if self.cancelled or now - self._last_publish < TELEMETRY_BATCH_INTERVAL:
+            return
+        self._last_publish = now
+        steps = self.params.get("steps")
+        self._publish(
+            f"Epoch {self._epoch + 1}/{self.params.get('epochs')}, batch {batch + 1}/{steps or '?'}",
+            self._epoch + 1,
+            self._epoch + ((batch + 1) / steps if steps else 0.0),
+            logs,
+            batch=batch + 1,
+            total_batches=steps,
+        )
+
+    def on_epoch_end(self, epoch, logs=None):
+        if self.cancelled:
+            return
+        logs = dict(logs or {})
+        duration = time.perf_counter() - self._epoch_start
+        logs.setdefault("learning_rate", self._learning_rate())
+        logs["epoch_seconds"] = duration
+        self._update_database(
+            lambda db: record_training_epoch(db, self.session_id, epoch + 1, duration, **logs)
+        )
+        summary = ", ".join(
+            f"{name} {logs[name]:.4f}" for name in ("loss", "accuracy", "val_loss", "val_accuracy") if name in logs
+        )
+        self._publish(f"Epoch {epoch + 1}/{self.params.get('epochs')} done: {summary}", epoch + 1, epoch + 1, logs)
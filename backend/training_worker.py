@@ -0,0 +1,634 @@
+# backend/training_worker.py
+"""
+Standalone worker executing the training job queue.
+Run with: python training_worker.py [--once]
+
+The API only enqueues jobs (the training_jobs table, see database.py). This
+process claims them one at a time and runs the retraining pipeline: zip
+extraction, merging into the training data, then train_model in a child
+process with the training CPU budget (see workload.py). The trained model
+is published as a new registry version and CURRENT is pointed at it; the
+API workers switch to it through watch_model_updates.
+
+While a job runs, a heartbeat thread copies the training progress into the
+job row. Jobs whose worker died stop heartbeating and are put back in the
+queue after TRAINING_JOB_STALE_SECONDS, so a crash or restart does not lose
+them. Training checkpoints every epoch into a per-attempt directory of the
+job (see src/checkpoints.py), so the next attempt resumes where the last
+one stopped. A worker that finds its job reassigned (a heartbeat or the
+ownership check before publishing fails) stops training and leaves the
+job, its records and checkpoints to the new owner. A job cancelled through
+POST /training/{session_id}/cancel is stopped at the next batch boundary
+by the telemetry callback and nothing is published. --once processes the
+queue until it is empty and exits.
+"""
+
+import json
+import os
+import shutil
+import signal
+import socket
+import sys
+import threading
+import zipfile
+
+# Add paths for imports (the same layout as app.py)
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(base_dir)  # project root
+sys.path.append(os.path.join(base_dir, "src"))  # model / training modules
+
+from inference import check_servable
+from workload import TRAINING_IN_SUBPROCESS, run_training_subprocess
+from model_registry import ModelRegistry, read_metadata
+from shared_state import SharedTrainingState
+from model import load_model, timed_phase, train_model
+from training_telemetry import TrainingTelemetry
+from src.checkpoints import CHECKPOINT_STATE_FILE, TrainingCancelled, load_checkpoint_state
+from database import (
+    init_db,
+    get_session_local,
+    update_upload_status,
+    update_retraining_session,
+    record_training_phases,
+    claim_training_job,
+    heartbeat_training_job,
+    release_training_job,
+    requeue_stale_training_jobs,
+    finish_training_job,
+    list_active_training_jobs,
+    training_cancel_requested,
+)
+
+_backend_dir = os.path.dirname(os.path.abspath(__file__))
+# Seeds an empty model registry (the same default as app.MODEL_PATH)
+MODEL_PATH = os.path.join(_backend_dir, "models", "sentinel_model.h5")
+# Seconds between queue polls while idle
+TRAINING_POLL_INTERVAL = float(os.getenv("TRAINING_POLL_INTERVAL", "2"))
+# Seconds between heartbeats of a running job
+TRAINING_HEARTBEAT_INTERVAL = float(os.getenv("TRAINING_HEARTBEAT_INTERVAL", "10"))
+# Running jobs without a heartbeat for this long are requeued
+TRAINING_JOB_STALE_SECONDS = float(os.getenv("TRAINING_JOB_STALE_SECONDS", "120"))
+# Attempts (claims) after which a job that keeps getting requeued is failed
+TRAINING_JOB_MAX_ATTEMPTS = int(os.getenv("TRAINING_JOB_MAX_ATTEMPTS", "3"))
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".m4a")
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+registry = ModelRegistry()
+# Training flag and status shown by the API's /model/status
+training_state = SharedTrainingState()
+_stopping = threading.Event()
+# Set by the heartbeat when the running job was reassigned to another worker
+_job_lost = threading.Event()
+
+
+class JobReassigned(Exception):
+    """The job is no longer running on this worker (it was requeued as stale)."""
+
+
+def confirm_ownership(job_id):
+    """
+    Refresh the heartbeat of the running job before acting on its result.
+
+    Raises:
+        JobReassigned: If the job is no longer running on this worker
+    """
+    db = get_session_local()()
+    try:
+        owned = heartbeat_training_job(db, job_id, WORKER_ID)
+    finally:
+        db.close()
+    if not owned:
+        _job_lost.set()
+        raise JobReassigned(f"Job {job_id} is no longer assigned to worker {WORKER_ID}")
+
+
+def publish_training_status(status):
+    """Set the training status shown by /model/status in every API worker."""
+    training_state.set_training_status(status)
+
+
+def extract_and_organize_zip(zip_path, extract_dir):
+    """
+    Extract zip file and organize audio files into safe/ and danger/ directories.
+    Handles nested zip structures recursively.
+    """
+    os.makedirs(extract_dir, exist_ok=True)
+
+    # Final destination for organized files within the extraction area
+    final_safe_dir = os.path.join(extract_dir, "safe")
+    final_danger_dir = os.path.join(extract_dir, "danger")
+    os.makedirs(final_safe_dir, exist_ok=True)
+    os.makedirs(final_danger_dir, exist_ok=True)
+
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        zip_ref.extractall(extract_dir)
+
+    print(f"📂 Extracted zip to {extract_dir}")
+
+    # Walk through all extracted files recursively
+    found_files = 0
+
+    for root, dirs, files in os.walk(extract_dir):
+        # Skip the final safe/danger dirs we just created to avoid self-copying loop
+        if root == final_safe_dir or root == final_danger_dir:
+            continue
+
+        for file in files:
+            if file.lower().endswith(AUDIO_EXTENSIONS):
+                src_path = os.path.join(root, file)
+                found_files += 1
+
+                # Determine destination
+                # 1. Check if file is already in a 'safe' or 'danger' folder
+                parent_folder = os.path.basename(root).lower()
+                filename = file.lower()
+
+                if parent_folder == "safe":
+                    dest_dir = final_safe_dir
+                elif parent_folder == "danger":
+                    dest_dir = final_danger_dir
+                # 2. Check filename keywords
+                elif any(
+                    k in filename
+                    for k in ["danger", "scream", "distress", "alarm", "emergency"]
+                ):
+                    dest_dir = final_danger_dir
+                else:
+                    # Default to safe if ambiguous (or logic dictates)
+                    dest_dir = final_safe_dir
+
+                # Handle filename collisions
+                dest_path = os.path.join(dest_dir, file)
+                if os.path.exists(dest_path):
+                    base, ext = os.path.splitext(file)
+                    timestamp = int(os.path.getmtime(src_path))
+                    dest_path = os.path.join(dest_dir, f"{base}_{timestamp}{ext}")
+
+                shutil.move(src_path, dest_path)
+
+    print(
+        f"✅ Organized {found_files} audio files into {final_safe_dir} and {final_danger_dir}"
+    )
+    return final_safe_dir, final_danger_dir
+
+
+def audio_files(directory):
+    """Audio file names in a directory ([] if it does not exist)."""
+    if not os.path.exists(directory):
+        return []
+    return [f for f in os.listdir(directory) if f.lower().endswith(AUDIO_EXTENSIONS)]
+
+
+def raise_if_cancel_requested(session_id):
+    """
+    Raise TrainingCancelled if the session's job was asked to cancel.
+
+    Catches cancellations that arrive after fit, which the telemetry
+    callback in the training process can no longer see.
+    """
+    db = get_session_local()()
+    try:
+        cancelled = training_cancel_requested(db, session_id)
+    finally:
+        db.close()
+    if cancelled:
+        raise TrainingCancelled(f"Training of session {session_id} cancelled before publishing")
+
+
+def job_checkpoint_dir(job_id):
+    """Checkpoint directory of a training job (kept across its attempts)."""
+    return registry.checkpoint_dir(f"job-{job_id}")
+
+
+def attempt_checkpoint_dir(job):
+    """
+    Checkpoint directory of this attempt at a job.
+
+    Every attempt writes into its own directory, so a training process
+    left over from an earlier attempt cannot overwrite or delete the files
+    a resumed attempt uses. The directory starts with a copy of the latest
+    checkpoint of the earlier attempts.
+    """
+    job_dir = job_checkpoint_dir(job.id)
+    attempt_dir = os.path.join(job_dir, f"attempt-{job.attempts}")
+    if os.path.exists(attempt_dir):
+        return attempt_dir
+    os.makedirs(attempt_dir)
+
+    earlier = sorted(
+        (name for name in os.listdir(job_dir) if name.startswith("attempt-")),
+        key=lambda name: int(name.split("-", 1)[1]),
+        reverse=True,
+    )
+    for name in earlier:
+        previous_dir = os.path.join(job_dir, name)
+        state = load_checkpoint_state(previous_dir)
+        if state is None:
+            continue
+        try:
+            # The state file last: it is what makes the copy a checkpoint
+            for file_name in ("parent_version", state["model_file"], CHECKPOINT_STATE_FILE):
+                if os.path.exists(os.path.join(previous_dir, file_name)):
+                    shutil.copy2(os.path.join(previous_dir, file_name), attempt_dir)
+        except OSError as e:
+            print(f"⚠️ Could not copy the checkpoint of {name}: {e}")
+            continue
+        print(f"💾 Attempt {job.attempts} of job {job.id} resumes from the checkpoint of {name}")
+        break
+    return attempt_dir
+
+
+def discard_job_checkpoints(job_id):
+    """Delete the checkpoints of a finished job."""
+    shutil.rmtree(job_checkpoint_dir(job_id), ignore_errors=True)
+
+
+def prune_job_checkpoints():
+    """Delete checkpoint directories left behind by jobs that are no longer active."""
+    db = get_session_local()()
+    try:
+        active = {f"job-{job.id}" for job in list_active_training_jobs(db)}
+    finally:
+        db.close()
+    checkpoints_root = os.path.dirname(registry.checkpoint_dir("_"))
+    for name in os.listdir(checkpoints_root):
+        if name not in active:
+            shutil.rmtree(os.path.join(checkpoints_root, name), ignore_errors=True)
+
+
+def train_new_version(
+    data_dir,
+    epochs,
+    fast=False,
+    session_id=None,
+    phase_seconds=None,
+    checkpoint_dir=None,
+    job_id=None,
+):
+    """
+    Train a new registry version from the current one and make it current.
+
+    Args:
+        data_dir: Directory containing safe/ and danger/ subdirectories
+        epochs: Number of training epochs
+        fast: Train only the head on cached backbone embeddings
+        session_id: Retraining session to record per-epoch metrics for
+        phase_seconds: Optional dict to add the training phase timings to
+        checkpoint_dir: Resume from and checkpoint into this directory; a
+            resumed run keeps the parent version it started from
+        job_id: Queue job being run; training stops when it is reassigned,
+            and ownership (and that the session was not cancelled) is
+            confirmed before publishing and switching
+
+    Returns:
+        (training history dict, new version)
+
+    Raises:
+        ValueError: If the parent is a model serving cannot feed
+        JobReassigned: If the job was reassigned (nothing is published)
+        TrainingCancelled: If the session was cancelled before the switch
+    """
+    phase_seconds = {} if phase_seconds is None else phase_seconds
+    parent = registry.current_version()
+    if parent is None:
+        if not os.path.exists(MODEL_PATH):
+            raise FileNotFoundError(f"Model file not found: {MODEL_PATH}")
+        check_servable(read_metadata(MODEL_PATH))
+        parent = registry.import_model(MODEL_PATH)
+    if checkpoint_dir:
+        parent_file = os.path.join(checkpoint_dir, "parent_version")
+        if os.path.exists(parent_file):
+            with open(parent_file) as f:
+                started_from = f.read().strip()
+            parent = started_from if started_from in registry.versions() else parent
+        with open(parent_file, "w") as f:
+            f.write(parent)
+    # The new version takes the parent's input, so refuse before training
+    check_servable(registry.metadata(parent))
+
+    staging_path = registry.staging_model_path()
+    train_kwargs = dict(
+        data_dir=data_dir,
+        model_path=staging_path,
+        epochs=epochs,
+        batch_size=32,
+        validation_split=0.2,
+        fast=fast,
+        callbacks=[TrainingTelemetry(session_id)],
+        checkpoint_dir=checkpoint_dir,
+    )
+    try:
+        if TRAINING_IN_SUBPROCESS:
+            history = run_training_subprocess(
+                base_model_path=registry.model_path(parent), stop_event=_job_lost, **train_kwargs
+            )
+        else:
+            _, history = train_model(
+                existing_model=load_model(registry.model_path(parent)), **train_kwargs
+            )
+            history = history.history
+        if job_id is not None:
+            confirm_ownership(job_id)
+            raise_if_cancel_requested(session_id)
+    except Exception:
+        registry.discard(staging_path)
+        raise
+    version = registry.publish(staging_path, parent=parent)
+    phase_seconds.update(registry.metadata(version).get("phase_seconds", {}))
+    if job_id is not None:
+        # Published but not current: pruned like any superseded version
+        confirm_ownership(job_id)
+        raise_if_cancel_requested(session_id)
+    # The API workers load and warm it, then swap (watch_model_updates)
+    registry.set_current(version)
+    return history, version
+
+
+def run_retrain_job(db, job, params, phase_seconds):
+    """Merge an uploaded zip into the training data and train on all of it."""
+    publish_training_status({
+        "status": "preprocessing",
+        "message": "Extracting and organizing data...",
+        "progress": 10,
+        "epoch": 0,
+        "total_epochs": params["epochs"],
+    })
+    update_retraining_session(db, job.session_id, status="preprocessing")
+
+    # 1. Extract and organize zip file
+    extract_dir = os.path.join(params["upload_dir"], "extracted")
+    shutil.rmtree(extract_dir, ignore_errors=True)  # Left over by an interrupted attempt
+    with timed_phase(phase_seconds, "extract"):
+        safe_dir, danger_dir = extract_and_organize_zip(params["zip_path"], extract_dir)
+
+    safe_files = audio_files(safe_dir)
+    danger_files = audio_files(danger_dir)
+    update_upload_status(
+        db,
+        job.upload_id,
+        status="processing",
+        safe_count=len(safe_files),
+        danger_count=len(danger_files),
+        total_count=len(safe_files) + len(danger_files),
+    )
+
+    # Merge with existing data
+    existing_safe = os.path.join(params["data_dir"], "safe")
+    existing_danger = os.path.join(params["data_dir"], "danger")
+    os.makedirs(existing_safe, exist_ok=True)
+    os.makedirs(existing_danger, exist_ok=True)
+
+    with timed_phase(phase_seconds, "copy"):
+        for file in safe_files:
+            shutil.copy(os.path.join(safe_dir, file), existing_safe)
+        for file in danger_files:
+            shutil.copy(os.path.join(danger_dir, file), existing_danger)
+
+    total_samples = len(audio_files(existing_safe)) + len(audio_files(existing_danger))
+    publish_training_status({
+        "status": "preprocessing",
+        "message": f"Preprocessing {total_samples} audio files...",
+        "progress": 20,
+        "epoch": 0,
+        "total_epochs": params["epochs"],
+    })
+
+    # 2. Train a new model version (preprocessing included); the telemetry
+    # callback reports epoch progress
+    history, version = train_new_version(
+        params["data_dir"],
+        params["epochs"],
+        fast=params["fast"],
+        session_id=job.session_id,
+        phase_seconds=phase_seconds,
+        checkpoint_dir=attempt_checkpoint_dir(job),
+        job_id=job.id,
+    )
+    return history, version, total_samples
+
+
+def run_continue_job(db, job, params, phase_seconds):
+    """Train on the data already in data_dir."""
+    epochs = params["epochs"]
+    publish_training_status({
+        "status": "preprocessing",
+        "message": "Preparing existing data...",
+        "progress": 10,
+        "epoch": 0,
+        "total_epochs": epochs,
+    })
+    update_retraining_session(db, job.session_id, status="preprocessing")
+
+    total_files = len(audio_files(os.path.join(params["data_dir"], "safe"))) + len(
+        audio_files(os.path.join(params["data_dir"], "danger"))
+    )
+    if total_files == 0:
+        raise Exception("No training data found. Please upload data first or use existing datasets.")
+
+    publish_training_status({
+        "status": "preprocessing",
+        "message": f"Preprocessing {total_files} audio files...",
+        "progress": 20,
+        "epoch": 0,
+        "total_epochs": epochs,
+    })
+
+    history, version = train_new_version(
+        params["data_dir"],
+        epochs,
+        fast=params["fast"],
+        session_id=job.session_id,
+        phase_seconds=phase_seconds,
+        checkpoint_dir=attempt_checkpoint_dir(job),
+        job_id=job.id,
+    )
+    return history, version, total_files
+
+
+JOB_RUNNERS = {"retrain": run_retrain_job, "continue": run_continue_job}
+
+
+def save_phase_timings(db, session_id, phase_seconds):
+    """Store the phase timings of a retraining session (failed ones included)."""
+    if phase_seconds:
+        print("⏱️ " + ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in phase_seconds.items()))
+    if session_id is None or not phase_seconds:
+        return
+    try:
+        record_training_phases(db, session_id, phase_seconds)
+    except Exception as e:
+        print(f"⚠️ Could not save phase timings: {e}")
+
+
+def heartbeat(job_id, done):
+    """
+    Refresh the job's heartbeat and progress until done is set.
+
+    Sets _job_lost and stops if the job is no longer assigned to this worker.
+    """
+    db = get_session_local()()
+    try:
+        while not done.wait(TRAINING_HEARTBEAT_INTERVAL):
+            status = training_state.read()["training_status"]
+            try:
+                if not heartbeat_training_job(
+                    db, job_id, WORKER_ID, status.get("progress"), status.get("message")
+                ):
+                    print(f"⚠️ Job {job_id} is no longer assigned to this worker, stopping it")
+                    _job_lost.set()
+                    return
+            except Exception as e:
+                db.rollback()
+                print(f"⚠️ Heartbeat of job {job_id} failed: {e}")
+    finally:
+        db.close()
+
+
+def run_job(job):
+    """
+    Run a claimed job and record the outcome in its session, upload and job row.
+    """
+    params = json.loads(job.params)
+    print(f"👷 Running {job.kind} job {job.id} (attempt {job.attempts}): {params}")
+    db = get_session_local()()
+    phase_seconds = {}
+    done = threading.Event()
+    _job_lost.clear()
+    threading.Thread(target=heartbeat, args=(job.id, done), daemon=True).start()
+
+    try:
+        history, version, total_samples = JOB_RUNNERS[job.kind](db, job, params, phase_seconds)
+
+        final_val_acc = float(history["val_accuracy"][-1])
+        update_retraining_session(
+            db,
+            job.session_id,
+            status="completed",
+            final_accuracy=float(history["accuracy"][-1]),
+            final_val_accuracy=final_val_acc,
+            final_loss=float(history["loss"][-1]),
+            final_val_loss=float(history["val_loss"][-1]),
+            total_samples=total_samples,
+        )
+        if job.upload_id is not None:
+            update_upload_status(db, job.upload_id, status="completed")
+        if finish_training_job(db, job.id, WORKER_ID, "completed", result_version=version):
+            discard_job_checkpoints(job.id)
+        else:
+            print(f"⚠️ Job {job.id} was reassigned while {version} was being made current")
+
+        publish_training_status({
+            "status": "completed",
+            "message": f"Training completed! Model {version} final accuracy: {final_val_acc:.2%}",
+            "progress": 100,
+            "epoch": len(history["loss"]),
+            "total_epochs": params["epochs"],
+        })
+
+    except Exception as e:
+        error_msg = str(e)
+        db.rollback()
+
+        if isinstance(e, JobReassigned) or _job_lost.is_set():
+            # The new owner runs the job and records its outcome
+            print(f"⚠️ Dropped job {job.id}: it was reassigned to another worker")
+            return
+
+        if training_cancel_requested(db, job.session_id):
+            # Stopped by POST /training/{session_id}/cancel (TrainingCancelled)
+            update_retraining_session(db, job.session_id, status="cancelled")
+            if job.upload_id is not None:
+                update_upload_status(db, job.upload_id, status="cancelled")
+            if finish_training_job(db, job.id, WORKER_ID, "cancelled"):
+                discard_job_checkpoints(job.id)
+            publish_training_status({
+                "status": "cancelled",
+                "message": "Training cancelled, the current model is unchanged",
+                "progress": 0,
+                "epoch": 0,
+                "total_epochs": params.get("epochs", 0),
+            })
+            print(f"🛑 Training job {job.id} cancelled")
+            return
+
+        # Update database with error
+        update_retraining_session(db, job.session_id, status="failed", error_message=error_msg)
+        if job.upload_id is not None:
+            update_upload_status(db, job.upload_id, status="failed", error_message=error_msg)
+        if finish_training_job(db, job.id, WORKER_ID, "failed", error_message=error_msg):
+            discard_job_checkpoints(job.id)
+
+        publish_training_status({
+            "status": "error",
+            "message": f"Training failed: {error_msg}",
+            "progress": 0,
+            "epoch": 0,
+            "total_epochs": params.get("epochs", 0),
+        })
+        print(f"❌ Training job {job.id} failed: {e}")
+    finally:
+        done.set()
+        save_phase_timings(db, job.session_id, phase_seconds)
+        db.close()
+
+
+def next_job():
+    """Requeue stale jobs and claim the next one (None if there is none)."""
+    db = get_session_local()()
+    try:
+        requeued = requeue_stale_training_jobs(db, TRAINING_JOB_STALE_SECONDS)
+        if requeued:
+            print(f"♻️ Requeued {requeued} job(s) of workers that stopped heartbeating")
+        job = claim_training_job(db, WORKER_ID, TRAINING_JOB_MAX_ATTEMPTS)
+        if job is not None and not training_state.claim_training():
+            # Another worker on this machine is training: leave it the CPU
+            release_training_job(db, job.id, WORKER_ID)
+            return None
+        return job
+    finally:
+        db.close()
+
+
+def run_worker(once=False):
+    """
+    Claim and run queued jobs until stopped (or, with once, until the queue is empty).
+    """
+    init_db()
+    try:
+        prune_job_checkpoints()
+    except Exception as e:
+        print(f"⚠️ Could not prune old training checkpoints: {e}")
+    print(f"👷 Training worker {WORKER_ID} started (polling every {TRAINING_POLL_INTERVAL}s)")
+    while not _stopping.is_set():
+        try:
+            job = next_job()
+        except Exception as e:
+            print(f"⚠️ Training queue unavailable: {e}")
+            job = None
+
+        if job is None:
+            if once:
+                return
+            _stopping.wait(TRAINING_POLL_INTERVAL)
+            continue
+
+        try:
+            run_job(job)
+        except Exception as e:
+            # Outcome not recorded (e.g. database down): requeued once stale
+            print(f"❌ Could not record the outcome of job {job.id}: {e}")
+        finally:
+            training_state.release_training()
+    print(f"👷 Training worker {WORKER_ID} stopped")
+
+
+def _stop(signum, frame):
+    # Finish the running job; a killed worker's job is requeued when stale
+    print("👷 Stopping after the current job...")
+    _stopping.set()
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    run_worker(once="--once" in sys.argv[1:])
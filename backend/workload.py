@@ -0,0 +1,216 @@
+# backend/workload.py
+"""
+CPU budgets for the serving and training workloads.
+
+TensorFlow's intra/inter-op thread pools are process-wide, so a retrain
+running in the API process competes with /predict for every core no matter
+how its threads are configured. Retraining therefore runs in a spawned
+child process with its own thread budget, optional CPU affinity set and a
+lower scheduling priority, while the API process keeps the serving budget
+(TF_NUM_INTRAOP_THREADS / TF_NUM_INTEROP_THREADS, SERVING_CPUS).
+
+Nothing here imports TensorFlow: the budgets have to be applied before the
+child process initializes it. The child is killed when its parent dies, so
+a killed worker never leaves a training run behind.
+"""
+
+import ctypes
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import traceback
+
+# Run retraining in a separate process (0 = in a thread of the API process)
+TRAINING_IN_SUBPROCESS = os.getenv("TRAINING_IN_SUBPROCESS", "1") == "1"
+# TensorFlow threads of the training process (0 = TensorFlow default)
+TRAINING_INTRAOP_THREADS = int(os.getenv("TRAINING_INTRAOP_THREADS", "0"))
+TRAINING_INTEROP_THREADS = int(os.getenv("TRAINING_INTEROP_THREADS", "0"))
+# CPU sets, e.g. "0-1" and "2-7" (empty = no restriction)
+SERVING_CPUS = os.getenv("SERVING_CPUS", "")
+TRAINING_CPUS = os.getenv("TRAINING_CPUS", "")
+# Niceness added to the training process so serving threads win the CPU
+TRAINING_NICE = int(os.getenv("TRAINING_NICE", "10"))
+
+# prctl option: signal delivered to this process when its parent dies (Linux)
+_PR_SET_PDEATHSIG = 1
+
+# CPUs this process could use before any affinity was applied
+_initial_cpus = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+
+
+def parse_cpu_list(spec):
+    """
+    Parse a CPU list such as "0-3,6".
+
+    Returns:
+        set of CPU ids (empty for an empty spec)
+
+    Raises:
+        ValueError: If the spec is malformed
+    """
+    cpus = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+def set_cpu_affinity(spec):
+    """
+    Restrict the current process to the CPUs in spec (no-op if empty or unsupported).
+
+    Returns:
+        The CPU set now in effect, or None if unchanged
+    """
+    cpus = parse_cpu_list(spec) if spec else None
+    if not cpus or not hasattr(os, "sched_setaffinity"):
+        return None
+    os.sched_setaffinity(0, cpus)
+    return cpus
+
+
+def apply_serving_budget():
+    """Pin the API process to SERVING_CPUS (thread counts are set where TF is imported)."""
+    cpus = set_cpu_affinity(SERVING_CPUS)
+    if cpus:
+        print(f"⚙️ Serving pinned to CPUs {sorted(cpus)}")
+
+
+def _apply_training_budget(intraop_threads, interop_threads, cpus, nice):
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    if nice:
+        os.nice(nice)
+    if intraop_threads:
+        os.environ["OMP_NUM_THREADS"] = str(intraop_threads)
+
+    import tensorflow as tf
+
+    if intraop_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(intraop_threads)
+    if interop_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(interop_threads)
+
+
+def _die_with_parent(parent_pid):
+    """
+    Exit as soon as the parent process is gone.
+
+    Uses PR_SET_PDEATHSIG where available (it fires when the spawning
+    thread exits, which run_training_subprocess blocks until the child is
+    done) and otherwise watches the parent pid from a daemon thread.
+    """
+    try:
+        if ctypes.CDLL(None, use_errno=True).prctl(_PR_SET_PDEATHSIG, signal.SIGKILL) != 0:
+            raise OSError(ctypes.get_errno(), "prctl failed")
+    except (OSError, AttributeError):
+
+        def watch_parent():
+            while os.getppid() == parent_pid:
+                time.sleep(1.0)
+            os._exit(1)
+
+        threading.Thread(target=watch_parent, daemon=True).start()
+    # The parent may have died before the death signal was armed
+    if os.getppid() != parent_pid:
+        os._exit(1)
+
+
+def _training_process(conn, budget, base_model_path, train_kwargs, parent_pid):
+    """Entry point of the training child process."""
+    _die_with_parent(parent_pid)
+    try:
+        _apply_training_budget(**budget)
+
+        from src.model import load_model, train_model
+
+        existing_model = load_model(base_model_path) if base_model_path else None
+        _, history = train_model(existing_model=existing_model, **train_kwargs)
+        conn.send(("ok", history.history))
+    except BaseException:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+def run_training_subprocess(
+    base_model_path=None,
+    intraop_threads=None,
+    interop_threads=None,
+    cpus=None,
+    nice=None,
+    stop_event=None,
+    **train_kwargs,
+):
+    """
+    Run train_model in a spawned child process with the training budget.
+
+    The child loads its own copy of the base model, so nothing it does can
+    touch the models being served, and dies with the calling process.
+    Blocks until training has finished.
+
+    Args:
+        base_model_path: Model to continue training (None to create one)
+        intraop_threads: Default TRAINING_INTRAOP_THREADS
+        interop_threads: Default TRAINING_INTEROP_THREADS
+        cpus: CPU list spec (default TRAINING_CPUS)
+        nice: Niceness increment (default TRAINING_NICE)
+        stop_event: Optional threading.Event; the child is terminated as
+            soon as it is set
+        **train_kwargs: Passed to train_model (data_dir, model_path, epochs, ...)
+
+    Returns:
+        dict: The Keras training history (metric name -> per-epoch values)
+
+    Raises:
+        RuntimeError: If training failed, the process died or it was stopped
+    """
+    budget = {
+        "intraop_threads": TRAINING_INTRAOP_THREADS if intraop_threads is None else intraop_threads,
+        "interop_threads": TRAINING_INTEROP_THREADS if interop_threads is None else interop_threads,
+        # Without a training CPU set, don't inherit the serving one
+        "cpus": parse_cpu_list(TRAINING_CPUS if cpus is None else cpus) or _initial_cpus,
+        "nice": TRAINING_NICE if nice is None else nice,
+    }
+    # "spawn" so the child initializes TensorFlow with its own thread pools
+    context = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(
+        target=_training_process,
+        args=(child_conn, budget, base_model_path, train_kwargs, os.getpid()),
+        name="sentinel-training",
+    )
+    process.start()
+    child_conn.close()
+    print(f"⚙️ Training in process {process.pid} with budget {budget}")
+
+    # poll() also returns when the child dies (the pipe hits EOF)
+    status, payload = None, None
+    try:
+        while not parent_conn.poll(1.0):
+            if stop_event is not None and stop_event.is_set():
+                process.terminate()
+                status, payload = "error", "Training process stopped"
+                break
+        else:
+            status, payload = parent_conn.recv()
+    except EOFError:
+        pass
+    finally:
+        process.join()
+        parent_conn.close()
+    if status is None:
+        status, payload = "error", f"Training process exited with code {process.exitcode}"
+
+    if status != "ok":
+        print(f"❌ Training process failed:\n{payload}")
+        raise RuntimeError(f"Training process failed: {payload.strip().splitlines()[-1]}")
+    return payload
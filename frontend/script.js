@@ -708,6 +708,9 @@ retrainBtn.addEventListener('click', async () => {
                     if (statusData.training_status && statusData.training_status.status === 'error') {
                         retrainStatus.textContent = `❌ Retraining Failed: ${statusData.training_status.message}`;
                         retrainStatus.className = "retrain-status show error";
+                    } else if (statusData.training_status && statusData.training_status.status === 'cancelled') {
+                        retrainStatus.textContent = `🛑 Retraining cancelled: ${statusData.training_status.message}`;
+                        retrainStatus.className = "retrain-status show error";
                     } else {
                         retrainStatus.textContent = "✅ Retraining completed!";
                         retrainStatus.className = "retrain-status show success";
@@ -812,6 +815,9 @@ if (continueTrainingBtn) {
                         if (statusData.training_status && statusData.training_status.status === 'error') {
                             continueTrainingStatus.textContent = `❌ Training Failed: ${statusData.training_status.message}`;
                             continueTrainingStatus.className = "retrain-status show error";
+                        } else if (statusData.training_status && statusData.training_status.status === 'cancelled') {
+                            continueTrainingStatus.textContent = `🛑 Training cancelled: ${statusData.training_status.message}`;
+                            continueTrainingStatus.className = "retrain-status show error";
                         } else {
                             continueTrainingStatus.textContent = "✅ Training completed!";
                             continueTrainingStatus.className = "retrain-status show success";
@@ -880,6 +886,9 @@ if (useExistingDatasetBtn) {
                         if (statusData.training_status && statusData.training_status.status === 'error') {
                             existingDatasetStatus.textContent = `❌ Training Failed: ${statusData.training_status.message}`;
                             existingDatasetStatus.className = "retrain-status show error";
+                        } else if (statusData.training_status && statusData.training_status.status === 'cancelled') {
+                            existingDatasetStatus.textContent = `🛑 Retraining cancelled: ${statusData.training_status.message}`;
+                            existingDatasetStatus.className = "retrain-status show error";
                         } else {
                             existingDatasetStatus.textContent = "✅ Retraining completed!";
                             existingDatasetStatus.className = "retrain-status show success";
@@ -0,0 +1,135 @@
+# src/checkpoints.py
+"""
+Resumable training checkpoints.
+
+EpochCheckpoint saves the whole model every few epochs as a .keras file
+(weights and optimizer state, so a resumed run continues with the same Adam
+moments and learning rate) together with a small state file recording the
+epoch, the validation split seed and the history so far. Each save writes a
+new checkpoint file first and then atomically replaces the state file that
+points to it, so a crash mid-write always leaves the previous checkpoint
+intact. train_model resumes from load_checkpoint and calls
+discard_checkpoint once the trained model is saved.
+"""
+
+import glob
+import json
+import os
+import time
+
+from tensorflow import keras
+
+# Epochs between checkpoints of a full training run
+CHECKPOINT_EVERY_EPOCHS = int(os.getenv("CHECKPOINT_EVERY_EPOCHS", "1"))
+
+CHECKPOINT_STATE_FILE = "checkpoint.json"
+
+
+class TrainingCancelled(Exception):
+    """Raised by train_model when a callback cancelled the run."""
+
+
+def _write_json_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint_state(checkpoint_dir):
+    """
+    Read the state of the latest checkpoint.
+
+    Args:
+        checkpoint_dir: Checkpoint directory of the run
+
+    Returns:
+        State dict (epoch, seed, history, model_file), or None without a
+        usable checkpoint
+    """
+    try:
+        with open(os.path.join(checkpoint_dir, CHECKPOINT_STATE_FILE)) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not os.path.exists(os.path.join(checkpoint_dir, state.get("model_file", ""))):
+        return None
+    return state
+
+
+def load_checkpoint(checkpoint_dir):
+    """
+    Load the latest checkpoint of a run.
+
+    Args:
+        checkpoint_dir: Checkpoint directory of the run
+
+    Returns:
+        (compiled model with its optimizer state, state dict), or
+        (None, None) without a usable checkpoint
+    """
+    state = load_checkpoint_state(checkpoint_dir)
+    if state is None:
+        return None, None
+    try:
+        model = keras.models.load_model(os.path.join(checkpoint_dir, state["model_file"]))
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable checkpoint in {checkpoint_dir}: {e}")
+        return None, None
+    return model, state
+
+
+def discard_checkpoint(checkpoint_dir):
+    """Delete the checkpoint files of a run (the directory itself is kept)."""
+    for path in glob.glob(os.path.join(checkpoint_dir, "checkpoint*")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class EpochCheckpoint(keras.callbacks.Callback):
+    """
+    Save a resumable checkpoint every few epochs.
+
+    Args:
+        checkpoint_dir: Directory for the checkpoint and its state file
+        seed: Validation split seed, reused when the run is resumed
+        history: History of the epochs before this fit (when resuming)
+        every_epochs: Epochs between checkpoints (default: CHECKPOINT_EVERY_EPOCHS)
+    """
+
+    def __init__(self, checkpoint_dir, seed, history=None, every_epochs=None):
+        super().__init__()
+        self.checkpoint_dir = checkpoint_dir
+        self.seed = seed
+        self.history = {name: list(values) for name, values in (history or {}).items()}
+        self.every_epochs = max(1, every_epochs or CHECKPOINT_EVERY_EPOCHS)
+
+    def on_epoch_end(self, epoch, logs=None):
+        for name, value in (logs or {}).items():
+            try:
+                self.history.setdefault(name, []).append(float(value))
+            except (TypeError, ValueError):
+                pass
+        if (epoch + 1) % self.every_epochs or self.model.stop_training:
+            return
+
+        start = time.perf_counter()
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        model_file = f"checkpoint-{epoch + 1:04d}.keras"
+        tmp_path = os.path.join(self.checkpoint_dir, "checkpoint-tmp.keras")
+        self.model.save(tmp_path)
+        os.replace(tmp_path, os.path.join(self.checkpoint_dir, model_file))
+        _write_json_atomic(
+            os.path.join(self.checkpoint_dir, CHECKPOINT_STATE_FILE),
+            {"epoch": epoch + 1, "seed": self.seed, "model_file": model_file, "history": self.history},
+        )
+
+        # Older checkpoints are only removed once the state points to the new one
+        for path in glob.glob(os.path.join(self.checkpoint_dir, "checkpoint-*.keras")):
+            if os.path.basename(path) != model_file:
+                os.remove(path)
+        print(f"💾 Checkpoint of epoch {epoch + 1} saved in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,258 @@
+# src/dataset.py
+"""
+Memory-mapped on-disk training dataset for Sentinel.
+
+Preprocessed spectrogram images are written once into a uint8 .npy file that
+is opened with np.memmap, next to a small JSON index holding the labels and
+source paths. Shuffling and the train/validation split only permute indices,
+and training reads one batch at a time from the memory map, so peak RSS does
+not grow with the size of the dataset.
+
+Batches are served either by MemmapBatchSequence (per-image NumPy
+augmentation between training steps) or by make_tf_dataset, a tf.data
+pipeline that augments whole batches in graph ops on parallel threads and
+prefetches ahead of the model.
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+FEATURES_FILE = "features.npy"
+INDEX_FILE = "index.json"
+# Unaugmented uint8 samples kept in memory by make_tf_dataset (above this, re-read)
+TFDATA_CACHE_MAX_MB = float(os.getenv("TFDATA_CACHE_MAX_MB", "1024"))
+# Samples read from the memory map per read call when filling the cache
+_READ_CHUNK = 256
+
+
+class DatasetWriter:
+    """
+    Append preprocessed samples to a memory-mapped dataset file.
+
+    Args:
+        directory: Dataset directory (created if needed)
+        capacity: Maximum number of samples (e.g. the number of source files)
+        sample_shape: Shape of one sample, e.g. (224, 224, 3)
+        dtype: Storage dtype of the samples
+    """
+
+    def __init__(self, directory, capacity, sample_shape, dtype=np.uint8):
+        self.directory = str(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.features = np.lib.format.open_memmap(
+            os.path.join(self.directory, FEATURES_FILE),
+            mode="w+",
+            dtype=dtype,
+            shape=(max(capacity, 1),) + tuple(sample_shape),
+        )
+        self.labels = []
+        self.paths = []
+
+    def __len__(self):
+        return len(self.labels)
+
+    def append(self, sample, label, path):
+        """Write one sample to the next free row."""
+        self.features[len(self.labels)] = sample
+        self.labels.append(float(label))
+        self.paths.append(str(path))
+
+    def close(self):
+        """Flush the samples and write the index; returns the dataset."""
+        self.features.flush()
+        index = {
+            "count": len(self.labels),
+            "sample_shape": list(self.features.shape[1:]),
+            "dtype": str(self.features.dtype),
+            "labels": self.labels,
+            "paths": self.paths,
+        }
+        del self.features  # Close the writable map before reopening read-only
+
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        with open(f"{index_path}.tmp", "w") as f:
+            json.dump(index, f)
+        os.replace(f"{index_path}.tmp", index_path)
+        return SpectrogramDataset(self.directory)
+
+
+class SpectrogramDataset:
+    """
+    Read-only view of a dataset written by DatasetWriter.
+
+    Attributes:
+        features: np.memmap with shape (count, *sample_shape)
+        labels: float32 array with shape (count,)
+        paths: List of source audio paths
+    """
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        with open(os.path.join(self.directory, INDEX_FILE), "r") as f:
+            index = json.load(f)
+        count = index["count"]
+        features = np.load(os.path.join(self.directory, FEATURES_FILE), mmap_mode="r")
+        self.features = features[:count]
+        self.labels = np.asarray(index["labels"], dtype=np.float32)
+        self.paths = index["paths"]
+
+    def __len__(self):
+        return len(self.labels)
+
+    def split(self, validation_split=0.2, seed=None):
+        """
+        Shuffle and split sample indices (no data is copied).
+
+        Returns:
+            train_indices, val_indices
+        """
+        indices = np.random.default_rng(seed).permutation(len(self))
+        split_idx = int(len(indices) * (1 - validation_split))
+        return indices[:split_idx], indices[split_idx:]
+
+
+class MemmapBatchSequence(keras.utils.Sequence):
+    """
+    Keras Sequence streaming float32 batches from a SpectrogramDataset.
+
+    Args:
+        dataset: SpectrogramDataset to read from
+        indices: Sample indices belonging to this split
+        batch_size: Samples per batch
+        shuffle: Reshuffle the indices after every epoch
+        augmenter: Optional ImageDataGenerator applied per image
+    """
+
+    def __init__(self, dataset, indices, batch_size=32, shuffle=True, augmenter=None):
+        super().__init__()
+        self.dataset = dataset
+        self.indices = np.array(indices)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.augmenter = augmenter
+        if self.shuffle:
+            np.random.shuffle(self.indices)
+
+    def __len__(self):
+        return int(np.ceil(len(self.indices) / self.batch_size))
+
+    def __getitem__(self, batch_idx):
+        batch = self.indices[batch_idx * self.batch_size : (batch_idx + 1) * self.batch_size]
+        batch = np.sort(batch)  # Sequential reads from the memory map
+
+        x = self.dataset.features[batch].astype(np.float32) / 255.0
+        if self.augmenter is not None:
+            for i in range(len(x)):
+                x[i] = self.augmenter.random_transform(x[i])
+        return x, self.dataset.labels[batch]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            np.random.shuffle(self.indices)
+
+
+def augment_batch(images):
+    """
+    Vectorized equivalent of the ImageDataGenerator used for training.
+
+    Draws the same random transform per image (up to 5 degrees of rotation,
+    10% shifts, 10% zoom per axis, no flips) and applies all of them as one
+    bilinear affine warp with nearest fill, in graph ops on the whole batch.
+
+    Args:
+        images: float32 tensor with shape (batch, height, width, channels)
+
+    Returns:
+        Augmented images, same shape
+    """
+    shape = tf.shape(images)
+    n = shape[0]
+    height = tf.cast(shape[1], tf.float32)
+    width = tf.cast(shape[2], tf.float32)
+
+    theta = tf.random.uniform([n], -5.0, 5.0) * (math.pi / 180.0)
+    zoom_x = tf.random.uniform([n], 0.9, 1.1)
+    zoom_y = tf.random.uniform([n], 0.9, 1.1)
+    shift_x = tf.random.uniform([n], -0.1, 0.1) * width
+    shift_y = tf.random.uniform([n], -0.1, 0.1) * height
+
+    # Output pixel -> input pixel, rotating and zooming about the image centre
+    center_x, center_y = (width - 1.0) / 2.0, (height - 1.0) / 2.0
+    a0, a1 = zoom_x * tf.cos(theta), -zoom_x * tf.sin(theta)
+    b0, b1 = zoom_y * tf.sin(theta), zoom_y * tf.cos(theta)
+    a2 = center_x - a0 * center_x - a1 * center_y + shift_x
+    b2 = center_y - b0 * center_x - b1 * center_y + shift_y
+    zeros = tf.zeros([n])
+    transforms = tf.stack([a0, a1, a2, b0, b1, b2, zeros, zeros], axis=1)
+
+    return tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=transforms,
+        output_shape=shape[1:3],
+        fill_value=0.0,
+        interpolation="BILINEAR",
+        fill_mode="NEAREST",
+    )
+
+
+def make_tf_dataset(dataset, indices, batch_size=32, shuffle=True, augment=False, cache=None):
+    """
+    tf.data pipeline streaming float32 batches from a SpectrogramDataset.
+
+    Samples are read from the memory map with parallel calls, optionally kept
+    in memory (unaugmented, as uint8), shuffled, batched, scaled to [0, 1],
+    augmented per batch and prefetched while the model trains.
+
+    Args:
+        dataset: SpectrogramDataset to read from
+        indices: Sample indices belonging to this split
+        batch_size: Samples per batch
+        shuffle: Reshuffle the samples every epoch
+        augment: Apply augment_batch to every batch
+        cache: Keep the unaugmented samples in memory (default: if they fit
+            in TFDATA_CACHE_MAX_MB)
+
+    Returns:
+        tf.data.Dataset of (images, labels) batches
+    """
+    features, labels = dataset.features, dataset.labels
+    sample_shape = tuple(features.shape[1:])
+    indices = np.sort(np.asarray(indices))  # Sequential reads from the memory map
+    if cache is None:
+        sample_bytes = int(np.prod(sample_shape)) * features.dtype.itemsize
+        cache = len(indices) * sample_bytes <= TFDATA_CACHE_MAX_MB * 1024 * 1024
+
+    def read(batch_indices):
+        batch_indices = np.sort(batch_indices)
+        return features[batch_indices], labels[batch_indices]
+
+    def read_batch(batch_indices):
+        x, y = tf.numpy_function(read, [batch_indices], [features.dtype, tf.float32])
+        x.set_shape((None,) + sample_shape)
+        y.set_shape((None,))
+        return x, y
+
+    autotune = tf.data.AUTOTUNE
+    ds = tf.data.Dataset.from_tensor_slices(indices)
+    if cache:
+        # Every sample is read once; later epochs are served from memory
+        ds = ds.batch(_READ_CHUNK).map(read_batch, num_parallel_calls=autotune).unbatch().cache()
+        if shuffle:
+            ds = ds.shuffle(len(indices), reshuffle_each_iteration=True)
+        ds = ds.batch(batch_size)
+    else:
+        if shuffle:
+            ds = ds.shuffle(len(indices), reshuffle_each_iteration=True)
+        ds = ds.batch(batch_size).map(read_batch, num_parallel_calls=autotune)
+
+    ds = ds.map(lambda x, y: (tf.cast(x, tf.float32) / 255.0, y), num_parallel_calls=autotune)
+    if augment:
+        ds = ds.map(lambda x, y: (augment_batch(x), y), num_parallel_calls=autotune)
+    # unbatch() hides the length; Keras needs it to size epochs and progress bars
+    ds = ds.apply(tf.data.experimental.assert_cardinality(math.ceil(len(indices) / batch_size)))
+    return ds.prefetch(autotune)
@@ -0,0 +1,183 @@
+# src/embeddings.py
+"""
+Head-only retraining on cached backbone embeddings.
+
+The MobileNetV2 backbone is frozen, so its pooled 1280-d output for a clip
+never changes between retrains. Fast retraining computes that embedding once
+per sample, keeps it in a FeatureCache keyed by audio content (and by a
+fingerprint of the backbone weights), and fits only the Dense head on the
+cached vectors. The head layers are shared with the full model, so the full
+model is up to date as soon as fitting ends and is saved and exported as
+usual.
+"""
+
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+from tensorflow.keras import layers
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.feature_cache import FeatureCache
+from backend.preprocessing import preprocessing_params
+
+# Images pushed through the backbone per call when filling the cache
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+
+def split_model(model):
+    """
+    Split a Sentinel model at its global average pooling layer.
+
+    Args:
+        model: Model built by create_model (backbone -> pooling -> Dense head)
+
+    Returns:
+        embedding_model, head_layers: A model from the image input to the
+        pooled embedding, and the layers after the pooling layer in order
+
+    Raises:
+        ValueError: If the model has no GlobalAveragePooling2D layer
+    """
+    for i, layer in enumerate(model.layers):
+        if isinstance(layer, layers.GlobalAveragePooling2D):
+            embedding_model = keras.Model(model.inputs, layer.output, name="sentinel_embedding")
+            return embedding_model, model.layers[i + 1 :]
+    raise ValueError("Model has no GlobalAveragePooling2D layer to split at")
+
+
+def backbone_fingerprint(embedding_model):
+    """Short hash of the backbone weights, so a new backbone never reuses stale embeddings."""
+    digest = hashlib.sha256()
+    for weight in embedding_model.weights:
+        digest.update(np.ascontiguousarray(weight.numpy()).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def compute_dataset_embeddings(embedding_model, dataset, cache_dir, batch_size=None):
+    """
+    Pooled backbone embeddings for every sample of a SpectrogramDataset.
+
+    Args:
+        embedding_model: Model from split_model
+        dataset: SpectrogramDataset with the uint8 features the backbone takes
+        cache_dir: Embedding cache location
+        batch_size: Images per backbone call (default: EMBEDDING_BATCH_SIZE)
+
+    Returns:
+        float32 array with shape (len(dataset), embedding_dim)
+    """
+    batch_size = batch_size or EMBEDDING_BATCH_SIZE
+    embedding_dim = embedding_model.output_shape[-1]
+    feature_type = "mel" if embedding_model.input_shape[-1] == 1 else "image"
+    params = dict(
+        preprocessing_params(feature_type),
+        backbone=backbone_fingerprint(embedding_model),
+        embedding_dim=embedding_dim,
+    )
+    cache = FeatureCache(cache_dir, params)
+
+    embeddings = np.empty((len(dataset), embedding_dim), dtype=np.float32)
+    keys = []
+    missing = []
+    for i, path in enumerate(dataset.paths):
+        try:
+            key = cache.key_for_file(path)
+        except OSError:
+            key = None  # Source audio is gone; embed it but don't cache it
+        keys.append(key)
+        cached = cache.get(key) if key else None
+        if cached is not None:
+            embeddings[i] = cached
+        else:
+            missing.append(i)
+
+    embed = tf.function(
+        lambda x: embedding_model(x, training=False),
+        input_signature=[tf.TensorSpec((None,) + embedding_model.input_shape[1:], tf.float32)],
+    )
+    start_time = time.time()
+    for start in range(0, len(missing), batch_size):
+        batch_indices = missing[start : start + batch_size]
+        images = dataset.features[batch_indices].astype(np.float32) / 255.0
+        batch_embeddings = embed(tf.constant(images)).numpy()
+        for i, embedding in zip(batch_indices, batch_embeddings):
+            embeddings[i] = embedding
+            if keys[i]:
+                cache.put(keys[i], embedding)
+
+    stats = cache.stats()
+    print(
+        f"Embedding cache: {stats['hits']} reused, {len(missing)} computed in "
+        f"{time.time() - start_time:.1f}s ({stats['size_bytes'] / 1e6:.1f} MB on disk)"
+    )
+    return embeddings
+
+
+def build_head_model(head_layers, embedding_dim):
+    """Model from a pooled embedding to the prediction, sharing the given layers' weights."""
+    inputs = keras.Input(shape=(embedding_dim,), name="embedding")
+    x = inputs
+    for layer in head_layers:
+        x = layer(x)
+    return keras.Model(inputs, x, name="sentinel_head")
+
+
+def train_head(
+    model,
+    dataset,
+    train_indices,
+    val_indices,
+    epochs,
+    batch_size=32,
+    callbacks=None,
+    cache_dir=None,
+    run_eagerly=False,
+):
+    """
+    Train only the Dense head of a Sentinel model on cached embeddings.
+
+    Spectrogram augmentation is not applied: each sample contributes the
+    embedding of its unaugmented image.
+
+    Args:
+        model: Model built by create_model; its head is updated in place
+        dataset: SpectrogramDataset the indices refer to
+        train_indices: Training sample indices
+        val_indices: Validation sample indices
+        epochs: Number of training epochs
+        batch_size: Batch size for training
+        callbacks: Keras callbacks passed to fit
+        cache_dir: Embedding cache location (default: dataset directory's
+            sibling embedding_cache)
+        run_eagerly: Passed to compile
+
+    Returns:
+        Keras History with the same keys as a full-model fit
+    """
+    embedding_model, head_layers = split_model(model)
+    cache_dir = cache_dir or Path(dataset.directory).parent / "embedding_cache"
+    embeddings = compute_dataset_embeddings(embedding_model, dataset, cache_dir)
+
+    head = build_head_model(head_layers, embeddings.shape[1])
+    head.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=0.001),
+        loss="binary_crossentropy",
+        metrics=["accuracy"],
+        run_eagerly=run_eagerly,
+    )
+    return head.fit(
+        embeddings[train_indices],
+        dataset.labels[train_indices],
+        validation_data=(embeddings[val_indices], dataset.labels[val_indices]),
+        epochs=epochs,
+        batch_size=batch_size,
+        callbacks=callbacks,
+        shuffle=True,
+        verbose=1,
+    )
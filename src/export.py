@@ -0,0 +1,181 @@
+# src/export.py
+"""
+Export trained Sentinel models for lightweight serving.
+
+After training, the Keras model can be converted to a post-training
+quantized TFLite model (int8 or float16) calibrated on training
+spectrograms, and to ONNX. Both are scored on the validation split so the
+accuracy cost of the conversion is recorded in the model metadata. The
+conversion takes longer than a fast retrain, so by default only the format
+the server loads (INFERENCE_BACKEND) is exported.
+"""
+
+import os
+import sys
+
+import numpy as np
+import tensorflow as tf
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.inference import INFERENCE_BACKEND, exported_model_path, load_predictor
+
+# int8 | float16 | none (default: int8 when serving TFLite, otherwise none)
+EXPORT_QUANTIZATION = os.getenv(
+    "EXPORT_QUANTIZATION", "int8" if INFERENCE_BACKEND == "tflite" else "none"
+)
+# Also write an ONNX model (needs the optional tf2onnx package; default: when serving ONNX)
+EXPORT_ONNX = os.getenv("EXPORT_ONNX", "1" if INFERENCE_BACKEND == "onnx" else "0") == "1"
+# Training spectrograms used to calibrate int8 activation ranges
+CALIBRATION_SAMPLES = int(os.getenv("EXPORT_CALIBRATION_SAMPLES", "200"))
+
+
+def _serving_function(model):
+    return tf.function(
+        lambda x: model(x, training=False),
+        input_signature=[tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32, name="input")],
+    )
+
+
+def export_tflite(model, output_path, calibration_images=None, quantization=None):
+    """
+    Convert a Keras model to a quantized TFLite flatbuffer.
+
+    Args:
+        model: Trained Keras model
+        output_path: Path of the .tflite file
+        calibration_images: uint8 array (N, 224, 224, 3) of training
+            spectrograms, required for int8
+        quantization: "int8" (full integer weights and activations, float
+            input/output) or "float16" (default: EXPORT_QUANTIZATION)
+
+    Returns:
+        Path of the written model
+    """
+    quantization = quantization or EXPORT_QUANTIZATION
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if quantization == "int8":
+        if calibration_images is None or len(calibration_images) == 0:
+            raise ValueError("int8 quantization needs calibration images")
+
+        def representative_dataset():
+            for img in calibration_images:
+                yield [img[np.newaxis].astype(np.float32) / 255.0]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    elif quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    else:
+        raise ValueError(f"Unknown quantization {quantization!r}")
+
+    tflite_model = converter.convert()
+    with open(f"{output_path}.tmp", "wb") as f:
+        f.write(tflite_model)
+    os.replace(f"{output_path}.tmp", output_path)
+    return output_path
+
+
+def export_onnx(model, output_path):
+    """
+    Convert a Keras model to ONNX.
+
+    Returns:
+        Path of the written model, or None if tf2onnx is not installed
+    """
+    try:
+        import tf2onnx
+    except ImportError:
+        print("⚠️ tf2onnx not installed, skipping ONNX export")
+        return None
+
+    serving_fn = _serving_function(model)
+    tf2onnx.convert.from_function(
+        serving_fn,
+        input_signature=serving_fn.input_signature,
+        opset=13,
+        output_path=f"{output_path}.tmp",
+    )
+    os.replace(f"{output_path}.tmp", output_path)
+    return output_path
+
+
+def _accuracy(predict_fn, features, indices, labels, batch_size=32):
+    # Rows are read from the (memory-mapped) features one batch at a time
+    scores = np.concatenate([
+        predict_fn(features[indices[i : i + batch_size]].astype(np.float32) / 255.0)
+        for i in range(0, len(indices), batch_size)
+    ])
+    return float(np.mean((scores > 0.5) == (labels > 0.5)))
+
+
+def export_model(model, model_path, dataset, train_indices, val_indices,
+                 quantization=None, onnx=None):
+    """
+    Export the trained model and measure its accuracy against the Keras model.
+
+    Args:
+        model: Trained Keras model
+        model_path: Path of the saved Keras model; exports are written next to it
+        dataset: SpectrogramDataset the model was trained on
+        train_indices: Indices sampled for int8 calibration
+        val_indices: Indices used to compare accuracies
+        quantization: TFLite quantization (default: EXPORT_QUANTIZATION, "none" skips)
+        onnx: Also export ONNX (default: EXPORT_ONNX)
+
+    Returns:
+        dict of metadata per exported backend, e.g. {"tflite": {"path", "size_bytes",
+        "quantization", "keras_val_accuracy", "val_accuracy", "accuracy_delta"}}
+        ({} when nothing is to be exported)
+    """
+    quantization = quantization or EXPORT_QUANTIZATION
+    onnx = EXPORT_ONNX if onnx is None else onnx
+    if quantization == "none" and not onnx:
+        return {}
+    os.makedirs(os.path.dirname(os.path.abspath(model_path)), exist_ok=True)
+
+    rng = np.random.default_rng(0)
+    calibration = np.sort(rng.permutation(train_indices)[:CALIBRATION_SAMPLES])
+    val_indices = np.sort(val_indices)
+    val_labels = dataset.labels[val_indices]
+    keras_accuracy = (
+        _accuracy(
+            lambda x: model(x, training=False).numpy()[:, 0], dataset.features, val_indices, val_labels
+        )
+        if len(val_indices) else None
+    )
+
+    exports = {}
+    if quantization != "none":
+        exports["tflite"] = export_tflite(
+            model,
+            exported_model_path(model_path, "tflite"),
+            calibration_images=dataset.features[calibration],
+            quantization=quantization,
+        )
+    if onnx:
+        exports["onnx"] = export_onnx(model, exported_model_path(model_path, "onnx"))
+
+    results = {}
+    for backend, path in exports.items():
+        if path is None:
+            continue
+        info = {
+            "path": os.path.basename(path),
+            "size_bytes": os.path.getsize(path),
+            "keras_val_accuracy": keras_accuracy,
+        }
+        if backend == "tflite":
+            info["quantization"] = quantization
+        if keras_accuracy is not None:
+            info["val_accuracy"] = _accuracy(
+                load_predictor(model_path, backend), dataset.features, val_indices, val_labels
+            )
+            info["accuracy_delta"] = info["val_accuracy"] - keras_accuracy
+        results[backend] = info
+        print(
+            f"📦 Exported {backend} model ({info['size_bytes'] / 1e6:.1f} MB), "
+            f"accuracy delta vs Keras: {info.get('accuracy_delta')}"
+        )
+    return results
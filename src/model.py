@@ -6,6 +6,12 @@ Model architecture and training functions for Sentinel audio classification.
 import os
 import sys
 import json
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
 
 # Configure TensorFlow for CPU-only BEFORE importing TensorFlow
@@ -22,8 +28,6 @@ import tensorflow as tf
 # Force CPU-only execution immediately after import
 try:
     tf.config.set_visible_devices([], "GPU")
-    # Enable eager execution to fix "numpy() is only available when eager execution is enabled" error
-    tf.config.run_functions_eagerly(True)
 except Exception:
     pass  # Ignore if already configured
 
@@ -31,45 +35,148 @@ from tensorflow import keras
 from tensorflow.keras import layers
 from tensorflow.keras.applications import MobileNetV2
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
-from tensorflow.keras.preprocessing import image
 
 # Add parent directory to path to import preprocessing
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Import preprocessing from backend directory
-from backend.preprocessing import create_spectrogram
+from backend.preprocessing import (
+    MEL_INPUT_SHAPE,
+    audio_files_to_images,
+    preprocessing_params,
+)
+from backend.feature_cache import FeatureCache
+from src.checkpoints import EpochCheckpoint, TrainingCancelled, discard_checkpoint, load_checkpoint
+from src.dataset import DatasetWriter, MemmapBatchSequence, make_tf_dataset
+from src.export import export_model
+from src.embeddings import train_head
+from backend.cascade import train_cascade
 
 # Configuration
 INPUT_SHAPE = (224, 224, 3)
+# mobilenet: ImageNet MobileNetV2 on rendered 224x224 RGB spectrograms
+# compact: small CNN on the native-resolution (128, frames, 1) spectrogram
+#   (offline benchmarking only: serving refuses it, see inference.check_servable)
+ARCHITECTURES = ("mobilenet", "compact")
+# Files featurized per batched spectrogram pass during data preparation
+PREPROCESS_BATCH_SIZE = 32
+# Preprocessing processes (0 = one per CPU core, 1 = run in-process)
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "0"))
+# Debugging aid: run train/eval steps op-by-op (per model, never process-wide)
+TRAIN_RUN_EAGERLY = os.getenv("TRAIN_RUN_EAGERLY", "0") == "1"
+# generator: MemmapBatchSequence with per-image ImageDataGenerator augmentation
+# tfdata: tf.data pipeline with batched graph-op augmentation and prefetching
+INPUT_PIPELINES = ("generator", "tfdata")
+TRAIN_INPUT_PIPELINE = os.getenv("TRAIN_INPUT_PIPELINE", "generator")
+
+
+def raise_if_cancelled(callbacks, epochs_done):
+    """
+    Raise TrainingCancelled if one of the callbacks cancelled the run.
+
+    Callbacks with a check_cancelled() method are asked first, so a
+    cancellation requested after fit is noticed between the later phases.
+    """
+    for callback in callbacks:
+        if hasattr(callback, "check_cancelled"):
+            callback.check_cancelled()
+    if any(getattr(callback, "cancelled", False) for callback in callbacks):
+        raise TrainingCancelled(f"Training cancelled after {epochs_done} epochs")
+
+
+@contextmanager
+def timed_phase(phase_seconds, phase):
+    """Add the wall-clock time of the with-block to phase_seconds[phase]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phase_seconds[phase] = phase_seconds.get(phase, 0.0) + time.perf_counter() - start
+
+
+class SamplesPerSecond(keras.callbacks.Callback):
+    """
+    Log training throughput (samples/sec, validation excluded) per epoch.
+
+    The value is added to the epoch logs as "samples_per_sec", so it ends up
+    in the training history.
+
+    Args:
+        num_samples: Training samples seen per epoch
+    """
+
+    def __init__(self, num_samples):
+        super().__init__()
+        self.num_samples = num_samples
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = self._last_batch_end = time.perf_counter()
 
+    def on_train_batch_end(self, batch, logs=None):
+        self._last_batch_end = time.perf_counter()
 
-def create_model(input_shape=INPUT_SHAPE, num_classes=2, weights=None):
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = self._last_batch_end - self._start
+        samples_per_sec = self.num_samples / seconds if seconds > 0 else 0.0
+        if logs is not None:
+            logs["samples_per_sec"] = samples_per_sec
+        print(f"⏱️ Epoch {epoch + 1}: {samples_per_sec:.1f} samples/sec ({seconds:.1f}s)")
+
+
+def _compact_backbone(inputs):
+    """Separable-convolution feature extractor for single-channel spectrograms."""
+    x = layers.Conv2D(16, 3, padding="same", use_bias=False)(inputs)
+    x = layers.BatchNormalization()(x)
+    x = layers.ReLU()(x)
+    x = layers.MaxPooling2D(2)(x)
+    for filters in (32, 64, 128):
+        x = layers.SeparableConv2D(filters, 3, padding="same", use_bias=False)(x)
+        x = layers.BatchNormalization()(x)
+        x = layers.ReLU()(x)
+        x = layers.MaxPooling2D(2)(x)
+    return x
+
+
+def create_model(input_shape=None, num_classes=2, weights=None, architecture="mobilenet"):
     """
-    Create MobileNetV2-based model for binary audio classification.
+    Create the Sentinel model for binary audio classification.
 
     Args:
-        input_shape: Input image shape (default: (224, 224, 3))
+        input_shape: Input shape (default: (224, 224, 3) for mobilenet,
+            MEL_INPUT_SHAPE for compact)
         num_classes: Number of output classes (default: 2 for binary)
         weights: Path to pretrained weights or None for random init
+            (mobilenet only; None loads ImageNet weights)
+        architecture: One of ARCHITECTURES
 
     Returns:
         Compiled Keras model
     """
-    # Base MobileNetV2 (pretrained on ImageNet, excluding top)
-    base_model = MobileNetV2(
-        input_shape=input_shape,
-        include_top=False,
-        weights="imagenet" if weights is None else None,
-        alpha=1.0,
-    )
+    if architecture not in ARCHITECTURES:
+        raise ValueError(f"Unknown architecture {architecture!r}, expected one of {ARCHITECTURES}")
+
+    if architecture == "compact":
+        # Trained from scratch: there are no pretrained weights for this input
+        inputs = keras.Input(shape=input_shape or MEL_INPUT_SHAPE)
+        x = _compact_backbone(inputs)
+    else:
+        input_shape = input_shape or INPUT_SHAPE
+
+        # Base MobileNetV2 (pretrained on ImageNet, excluding top)
+        base_model = MobileNetV2(
+            input_shape=input_shape,
+            include_top=False,
+            weights="imagenet" if weights is None else None,
+            alpha=1.0,
+        )
 
-    # Freeze base model initially (can be unfrozen during fine-tuning)
-    base_model.trainable = False
+        # Freeze base model initially (can be unfrozen during fine-tuning)
+        base_model.trainable = False
 
-    # Build custom classifier head
-    inputs = keras.Input(shape=input_shape)
+        # Build custom classifier head
+        inputs = keras.Input(shape=input_shape)
 
-    # Preprocess for MobileNetV2
-    x = base_model(inputs, training=False)
+        # Preprocess for MobileNetV2
+        x = base_model(inputs, training=False)
 
     # Global average pooling
     x = layers.GlobalAveragePooling2D()(x)
@@ -88,13 +195,14 @@ def create_model(input_shape=INPUT_SHAPE, num_classes=2, weights=None):
         outputs = layers.Dense(num_classes, activation="softmax", name="predictions")(x)
         loss = "sparse_categorical_crossentropy"
 
-    model = keras.Model(inputs, outputs, name="sentinel_mobilenet")
+    model = keras.Model(inputs, outputs, name=f"sentinel_{architecture}")
 
     # Compile model with optimizer
     model.compile(
         optimizer=keras.optimizers.Adam(learning_rate=0.001),
         loss=loss,
         metrics=["accuracy"],
+        run_eagerly=TRAIN_RUN_EAGERLY,
     )
 
     return model
@@ -120,6 +228,27 @@ def load_model(model_path):
     return None
 
 
+def model_feature_type(model):
+    """Dataset feature type a model consumes: "mel" for single-channel input, else "image"."""
+    return "mel" if model.input_shape[-1] == 1 else "image"
+
+
+def clone_model(model):
+    """
+    Copy a model with its own weights, so training never modifies a model
+    that is being served.
+
+    Args:
+        model: Keras model to copy
+
+    Returns:
+        Uncompiled Keras model with the same architecture and weights
+    """
+    clone = keras.models.clone_model(model)
+    clone.set_weights(model.get_weights())
+    return clone
+
+
 def save_model(model, model_path, metadata=None):
     """
     Save model and optional metadata to disk.
@@ -133,28 +262,90 @@ def save_model(model, model_path, metadata=None):
     model.save(model_path)
 
     if metadata:
-        metadata_path = model_path.replace(".h5", "_metadata.json")
-        with open(metadata_path, "w") as f:
-            json.dump(metadata, f, indent=2)
+        save_metadata(model_path, metadata)
 
 
-def prepare_data_from_directories(data_dir, validation_split=0.2):
+def save_metadata(model_path, metadata):
+    """Write the metadata JSON next to a saved model."""
+    metadata_path = model_path.replace(".h5", "_metadata.json")
+    with open(metadata_path, "w") as f:
+        json.dump(metadata, f, indent=2)
+
+
+def render_audio_files(audio_paths, num_workers=None, feature_type="image"):
     """
-    Prepare training data from directory structure:
+    Render spectrogram images for many audio files, optionally in parallel.
+
+    Files are split into chunks that are rendered with one batched spectrogram
+    pass each. With more than one worker the chunks are distributed over a
+    process pool; results are yielded in input order either way.
+
+    Args:
+        audio_paths: List of paths to audio files
+        num_workers: Number of processes (default: PREPROCESS_WORKERS)
+        feature_type: "image" or "mel" (see preprocessing.FEATURE_TYPES)
+
+    Yields:
+        (image, error) tuples as returned by audio_files_to_images
+    """
+    if num_workers is None:
+        num_workers = PREPROCESS_WORKERS
+    if num_workers <= 0:
+        num_workers = os.cpu_count() or 1
+    featurize = partial(audio_files_to_images, feature_type=feature_type)
+    num_workers = min(num_workers, len(audio_paths)) or 1
+
+    # Small enough chunks to keep every worker busy, large enough to batch
+    chunk_size = max(
+        1, min(PREPROCESS_BATCH_SIZE, math.ceil(len(audio_paths) / (num_workers * 4)))
+    )
+    chunks = [
+        [str(path) for path in audio_paths[i : i + chunk_size]]
+        for i in range(0, len(audio_paths), chunk_size)
+    ]
+
+    if num_workers == 1:
+        for chunk in chunks:
+            yield from featurize(chunk)
+        return
+
+    # "spawn" so workers don't inherit TensorFlow's threads from this process
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=num_workers, mp_context=context) as pool:
+        for results in pool.map(featurize, chunks):
+            yield from results
+
+
+def build_training_dataset(
+    data_dir,
+    use_cache=True,
+    cache_dir=None,
+    num_workers=None,
+    dataset_dir=None,
+    feature_type="image",
+):
+    """
+    Preprocess every audio file under data_dir into a memory-mapped dataset.
+
+    Expects the directory structure:
     data_dir/
         safe/
             audio1.wav
-            audio2.wav
         danger/
             audio1.wav
-            audio2.wav
 
     Args:
         data_dir: Root directory containing class subdirectories
-        validation_split: Fraction of data to use for validation
+        use_cache: Reuse spectrograms of unchanged audio from the feature cache
+        cache_dir: Feature cache location (default: data_dir/feature_cache)
+        num_workers: Preprocessing processes (default: PREPROCESS_WORKERS)
+        dataset_dir: Memory-mapped dataset location (default: data_dir/dataset)
+        feature_type: "image" or "mel"; mel features get their own default
+            cache and dataset directories (suffixed _mel)
 
     Returns:
-        train_generator, val_generator, num_samples
+        SpectrogramDataset with uint8 (224, 224, 3) images, or
+        (128, frames, 1) spectrograms for feature_type "mel"
     """
     data_path = Path(data_dir)
     safe_dir = data_path / "safe"
@@ -172,61 +363,111 @@ def prepare_data_from_directories(data_dir, validation_split=0.2):
     if len(safe_files) == 0 and len(danger_files) == 0:
         raise ValueError(f"No audio files found in {data_dir}")
 
-    # Process audio files to images
-    X = []
-    y = []
-
-    # Create temp directory for spectrograms
-    temp_spec_dir = data_path / "temp_spectrograms"
-    temp_spec_dir.mkdir(exist_ok=True)
-
     print(
         f"Processing {len(safe_files)} safe files and {len(danger_files)} danger files..."
     )
 
-    for file_path in safe_files:
-        try:
-            # Create temporary spectrogram
-            temp_img = temp_spec_dir / f"{file_path.stem}.png"
-
-            if create_spectrogram(str(file_path), str(temp_img)):
-                img = image.load_img(str(temp_img), target_size=(224, 224))
-                img_array = image.img_to_array(img) / 255.0
-                X.append(img_array)
-                y.append(0)  # Safe class
-        except Exception as e:
-            print(f"Error processing {file_path}: {e}")
-            continue
+    suffix = "" if feature_type == "image" else f"_{feature_type}"
+    cache = None
+    if use_cache:
+        cache = FeatureCache(
+            cache_dir or data_path / f"feature_cache{suffix}",
+            preprocessing_params(feature_type),
+        )
 
-    for file_path in danger_files:
-        try:
-            temp_img = temp_spec_dir / f"{file_path.stem}.png"
+    # Safe class = 0, Danger class = 1
+    labeled_files = [(f, 0) for f in safe_files] + [(f, 1) for f in danger_files]
 
-            if create_spectrogram(str(file_path), str(temp_img)):
-                img = image.load_img(str(temp_img), target_size=(224, 224))
-                img_array = image.img_to_array(img) / 255.0
-                X.append(img_array)
-                y.append(1)  # Danger class
-        except Exception as e:
+    # Images are written straight to disk instead of being collected in RAM
+    writer = DatasetWriter(
+        dataset_dir or data_path / f"dataset{suffix}",
+        len(labeled_files),
+        MEL_INPUT_SHAPE if feature_type == "mel" else INPUT_SHAPE,
+    )
+
+    # Unchanged audio is served from the cache, only new files are rendered
+    pending = []
+    for file_path, label in labeled_files:
+        try:
+            key = cache.key_for_file(file_path) if cache else None
+        except OSError as e:
             print(f"Error processing {file_path}: {e}")
             continue
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            writer.append(cached, label, file_path)
+        else:
+            pending.append((file_path, label, key))
+
+    results = render_audio_files(
+        [file_path for file_path, _, _ in pending],
+        num_workers=num_workers,
+        feature_type=feature_type,
+    )
+    for (file_path, label, key), (img, error) in zip(pending, results):
+        if error is not None:
+            print(f"Error processing {file_path}: {error}")
+            continue
+        if cache:
+            cache.put(key, img)
+        writer.append(img, label, file_path)
+
+    if cache:
+        stats = cache.stats()
+        print(
+            f"Feature cache: {stats['hits']} reused, {stats['misses']} new "
+            f"({stats['size_bytes'] / 1e6:.1f} MB on disk)"
+        )
 
-    if len(X) == 0:
+    dataset = writer.close()
+    if len(dataset) == 0:
         raise ValueError("No valid audio files could be processed")
+    return dataset
+
+
+def prepare_data_from_directories(
+    data_dir,
+    validation_split=0.2,
+    use_cache=True,
+    cache_dir=None,
+    num_workers=None,
+    batch_size=32,
+    feature_type="image",
+    seed=None,
+):
+    """
+    Prepare training data from directory structure:
+    data_dir/
+        safe/
+            audio1.wav
+            audio2.wav
+        danger/
+            audio1.wav
+            audio2.wav
 
-    # Convert to numpy arrays
-    X = np.array(X, dtype=np.float32)
-    y = np.array(y, dtype=np.float32)
+    Args:
+        data_dir: Root directory containing class subdirectories
+        validation_split: Fraction of data to use for validation
+        use_cache: Reuse spectrograms of unchanged audio from the feature cache
+        cache_dir: Feature cache location (default: data_dir/feature_cache)
+        num_workers: Preprocessing processes (default: PREPROCESS_WORKERS)
+        batch_size: Samples per batch streamed from the dataset
+        feature_type: "image" (MobileNetV2 input) or "mel" (compact model input)
+        seed: Seed of the train/validation split (None: a new random split)
 
-    # Shuffle data
-    indices = np.random.permutation(len(X))
-    X = X[indices]
-    y = y[indices]
+    Returns:
+        train_generator, val_generator, num_samples
+    """
+    dataset = build_training_dataset(
+        data_dir,
+        use_cache=use_cache,
+        cache_dir=cache_dir,
+        num_workers=num_workers,
+        feature_type=feature_type,
+    )
 
-    # Split into train/validation
-    split_idx = int(len(X) * (1 - validation_split))
-    X_train, X_val = X[:split_idx], X[split_idx:]
-    y_train, y_val = y[:split_idx], y[split_idx:]
+    # Shuffle and split indices only; batches are read from the memory map
+    train_indices, val_indices = dataset.split(validation_split, seed=seed)
 
     # Apply data augmentation
     datagen = ImageDataGenerator(
@@ -238,10 +479,14 @@ def prepare_data_from_directories(data_dir, validation_split=0.2):
         fill_mode="nearest",
     )
 
-    train_generator = datagen.flow(X_train, y_train, batch_size=32, shuffle=True)
-    val_generator = datagen.flow(X_val, y_val, batch_size=32, shuffle=False)
+    train_generator = MemmapBatchSequence(
+        dataset, train_indices, batch_size=batch_size, shuffle=True, augmenter=datagen
+    )
+    val_generator = MemmapBatchSequence(
+        dataset, val_indices, batch_size=batch_size, shuffle=False, augmenter=datagen
+    )
 
-    num_samples = len(X)
+    num_samples = len(dataset)
 
     return train_generator, val_generator, num_samples
 
@@ -253,6 +498,11 @@ def train_model(
     batch_size=32,
     validation_split=0.2,
     existing_model=None,
+    fast=False,
+    architecture=None,
+    pipeline=None,
+    callbacks=None,
+    checkpoint_dir=None,
 ):
     """
     Train the Sentinel model on audio data.
@@ -264,71 +514,201 @@ def train_model(
         batch_size: Batch size for training
         validation_split: Fraction of data for validation
         existing_model: Existing model to continue training, or None to create new
+        fast: Train only the Dense head on cached backbone embeddings
+            (no augmentation, see src/embeddings.py)
+        architecture: Architecture of a newly created model (see
+            ARCHITECTURES, default mobilenet); the data is prepared for
+            whichever input the trained model takes
+        pipeline: Input pipeline for full training, "generator" or "tfdata"
+            (default: TRAIN_INPUT_PIPELINE, see INPUT_PIPELINES)
+        callbacks: Extra Keras callbacks (e.g. TrainingTelemetry), run after
+            the built-in ones so the epoch logs include samples_per_sec; one
+            that stops training and sets a truthy ``cancelled`` attribute
+            cancels the run (see raise_if_cancelled, checked after fit and
+            between the later phases)
+        checkpoint_dir: Save resumable checkpoints of full training here and
+            resume from the latest one (see src/checkpoints.py); fast
+            retraining is not checkpointed
 
     Returns:
-        Trained model and training history
+        Trained model and training history; the wall-clock time of each
+        phase is saved in the metadata as phase_seconds
+
+    Raises:
+        TrainingCancelled: A callback cancelled the run (nothing is saved,
+            the checkpoint is kept)
     """
+    pipeline = pipeline or TRAIN_INPUT_PIPELINE
+    if pipeline not in INPUT_PIPELINES:
+        raise ValueError(f"Unknown input pipeline {pipeline!r}, expected one of {INPUT_PIPELINES}")
+
+    phase_seconds = {}
+    checkpoint_dir = None if fast else checkpoint_dir
+
     # Load or create model
-    if existing_model is not None:
-        model = existing_model
-        print("Using provided model for retraining...")
-
-        # Recompile to reset optimizer state
-        print("Recompiling model to reset optimizer state...")
-        model.compile(
-            optimizer=keras.optimizers.Adam(learning_rate=0.001),
-            loss="binary_crossentropy",  # Assuming binary classification as per create_model
-            metrics=["accuracy"],
-        )
-    elif os.path.exists(model_path):
-        print(f"Loading existing model from {model_path}...")
-        model = load_model(model_path)
-        if model is None:
-            print("Failed to load model, creating new one...")
-            model = create_model()
-    else:
-        print("Creating new model...")
-        model = create_model()
+    with timed_phase(phase_seconds, "load_model"):
+        checkpoint_model, checkpoint = load_checkpoint(checkpoint_dir) if checkpoint_dir else (None, None)
+        if checkpoint_model is not None:
+            # Weights and optimizer state as of the last checkpoint
+            model = checkpoint_model
+            model.run_eagerly = TRAIN_RUN_EAGERLY
+            print(f"Resuming from the checkpoint after epoch {checkpoint['epoch']}...")
+        elif existing_model is not None:
+            model = existing_model
+            print("Using provided model for retraining...")
+
+            # Recompile to reset optimizer state
+            print("Recompiling model to reset optimizer state...")
+            model.compile(
+                optimizer=keras.optimizers.Adam(learning_rate=0.001),
+                loss="binary_crossentropy",  # Assuming binary classification as per create_model
+                metrics=["accuracy"],
+                run_eagerly=TRAIN_RUN_EAGERLY,
+            )
+        elif os.path.exists(model_path):
+            print(f"Loading existing model from {model_path}...")
+            model = load_model(model_path)
+            if model is None:
+                print("Failed to load model, creating new one...")
+                model = create_model(architecture=architecture or "mobilenet")
+        else:
+            print("Creating new model...")
+            model = create_model(architecture=architecture or "mobilenet")
+
+    # A resumed run keeps its validation split (a checkpoint of the final epoch redoes that epoch)
+    seed = checkpoint["seed"] if checkpoint else int(np.random.default_rng().integers(2**31))
+    initial_epoch = min(checkpoint["epoch"], epochs - 1) if checkpoint else 0
+    previous_history = {
+        name: values[:initial_epoch] for name, values in (checkpoint or {}).get("history", {}).items()
+    }
 
     # Prepare data
-    print(f"Loading data from {data_dir}...")
-    train_gen, val_gen, num_samples = prepare_data_from_directories(
-        data_dir, validation_split=validation_split
-    )
+    feature_type = model_feature_type(model)
+    print(f"Loading data from {data_dir} ({feature_type} features)...")
+    with timed_phase(phase_seconds, "preprocessing"):
+        train_gen, val_gen, num_samples = prepare_data_from_directories(
+            data_dir,
+            validation_split=validation_split,
+            batch_size=batch_size,
+            feature_type=feature_type,
+            seed=seed,
+        )
 
     print(f"Training on {num_samples} samples...")
 
     # Callbacks with optimization techniques
-    callbacks = [
+    all_callbacks = [
         keras.callbacks.EarlyStopping(
             monitor="val_loss", patience=5, restore_best_weights=True, verbose=1
         ),
         keras.callbacks.ReduceLROnPlateau(
             monitor="val_loss", factor=0.5, patience=3, min_lr=1e-7, verbose=1
         ),
-    ]
+        SamplesPerSecond(len(train_gen.indices)),
+    ] + list(callbacks or [])
+    if checkpoint_dir:
+        all_callbacks.append(EpochCheckpoint(checkpoint_dir, seed, history=previous_history))
 
     # Train model
-    history = model.fit(
-        train_gen,
-        epochs=epochs,
-        validation_data=val_gen,
-        callbacks=callbacks,
-        verbose=1,
-    )
+    with timed_phase(phase_seconds, "fit"):
+        if fast:
+            print("Fast retraining: fitting the head on cached backbone embeddings...")
+            history = train_head(
+                model,
+                train_gen.dataset,
+                train_gen.indices,
+                val_gen.indices,
+                epochs=epochs,
+                batch_size=batch_size,
+                callbacks=all_callbacks,
+                cache_dir=Path(data_dir) / "embedding_cache",
+                run_eagerly=TRAIN_RUN_EAGERLY,
+            )
+        else:
+            train_data, val_data = train_gen, val_gen
+            if pipeline == "tfdata":
+                # Same augmentation as the generators (validation included)
+                train_data = make_tf_dataset(
+                    train_gen.dataset, train_gen.indices, batch_size, shuffle=True, augment=True
+                )
+                val_data = make_tf_dataset(
+                    val_gen.dataset, val_gen.indices, batch_size, shuffle=False, augment=True
+                )
+            print(f"Input pipeline: {pipeline}")
+            history = model.fit(
+                train_data,
+                epochs=epochs,
+                initial_epoch=initial_epoch,
+                validation_data=val_data,
+                callbacks=all_callbacks,
+                verbose=1,
+            )
+            for name, values in previous_history.items():
+                history.history[name] = values + history.history.get(name, [])
+
+    epochs_done = len(history.history.get("loss", []))
+    raise_if_cancelled(all_callbacks, epochs_done)
 
     # Save model
     metadata = {
         "epochs_trained": epochs,
+        "training_mode": "head_only" if fast else "full",
+        "input_pipeline": None if fast else pipeline,
+        "architecture": model.name.replace("sentinel_", "", 1),
+        "feature_type": feature_type,
         "total_samples": num_samples,
         "last_accuracy": float(history.history["accuracy"][-1]),
         "last_val_accuracy": float(history.history["val_accuracy"][-1]),
         "last_loss": float(history.history["loss"][-1]),
         "last_val_loss": float(history.history["val_loss"][-1]),
+        "samples_per_sec": float(np.mean(history.history["samples_per_sec"])),
     }
 
-    save_model(model, model_path, metadata=metadata)
+    os.makedirs(os.path.dirname(os.path.abspath(model_path)), exist_ok=True)
+
+    # Cheap first stage that answers obviously safe clips without the model
+    with timed_phase(phase_seconds, "cascade"):
+        try:
+            # Read the validation rows from the memory map one batch at a time
+            features, val_indices = train_gen.dataset.features, val_gen.indices
+            deep_scores = np.concatenate([
+                model(
+                    features[val_indices[i : i + batch_size]].astype(np.float32) / 255.0, training=False
+                ).numpy()[:, 0]
+                for i in range(0, len(val_indices), batch_size)
+            ])
+            metadata["cascade"] = train_cascade(
+                model_path,
+                train_gen.dataset,
+                train_gen.indices,
+                val_gen.indices,
+                deep_scores=deep_scores,
+                cache_dir=Path(data_dir) / "cascade_cache",
+            )
+        except Exception as e:
+            print(f"⚠️ Cascade training failed, /predict will always use the model: {e}")
+
+    raise_if_cancelled(all_callbacks, epochs_done)
+
+    # Quantized TFLite / ONNX exports for lightweight serving (see src/export.py)
+    with timed_phase(phase_seconds, "export"):
+        try:
+            metadata["exports"] = export_model(
+                model, model_path, train_gen.dataset, train_gen.indices, val_gen.indices
+            )
+        except Exception as e:
+            print(f"⚠️ Model export failed, serving will need the Keras backend: {e}")
+
+    raise_if_cancelled(all_callbacks, epochs_done)
+
+    with timed_phase(phase_seconds, "save"):
+        save_model(model, model_path)
+    metadata["phase_seconds"] = phase_seconds
+    save_metadata(model_path, metadata)
+    if checkpoint_dir:
+        discard_checkpoint(checkpoint_dir)
 
+    print("⏱️ " + ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in phase_seconds.items()))
     print("Model training completed and saved!")
 
     return model, history
@@ -3,14 +3,47 @@
 Prediction functions for Sentinel audio classification.
 """
 import numpy as np
-import tensorflow as tf
-from tensorflow.keras.preprocessing import image
 import sys
 import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 # Add parent directory to path to import preprocessing
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from src.preprocessing import create_spectrogram
+from backend.preprocessing import (
+    DURATION,
+    audio_to_array,
+    compute_mel_spectrogram_db,
+    iter_audio_windows,
+    load_audio,
+    load_audio_bytes,
+    render_spectrogram,
+    waveforms_to_arrays,
+)
+# Windows quieter than this RMS (about -60 dBFS) are skipped as silent
+from backend.cascade import SILENCE_RMS_THRESHOLD
+
+# Long recordings: distance between window starts and windows per model call
+LONG_AUDIO_HOP = float(os.getenv('LONG_AUDIO_HOP', str(DURATION / 2)))
+LONG_AUDIO_BATCH_SIZE = int(os.getenv('LONG_AUDIO_BATCH_SIZE', '32'))
+
+# Multi-file prediction: files per model call and decode/featurize threads
+PREDICT_BATCH_SIZE = int(os.getenv('PREDICT_BATCH_SIZE', '64'))
+PREDICT_DECODE_WORKERS = int(os.getenv('PREDICT_DECODE_WORKERS', str(os.cpu_count() or 1)))
+
+
+def _result_from_probability(probability):
+    """Build a prediction dict from a danger probability."""
+    # Binary classification: 0 = Safe, 1 = Danger
+    class_idx = 1 if probability > 0.5 else 0
+    confidence = abs(probability - 0.5) * 2  # Convert to [0, 1] confidence
+
+    return {
+        'prediction': int(class_idx),
+        'class': 'danger' if class_idx == 1 else 'safe',
+        'confidence': float(confidence),
+        'probability': float(probability)  # Raw probability (0=Safe, 1=Danger)
+    }
+
 
 def predict_audio(model, audio_path):
     """
@@ -23,63 +56,173 @@ def predict_audio(model, audio_path):
     Returns:
         dict with 'prediction' (0 or 1), 'class' (str), 'confidence' (float), 'probability' (float)
     """
-    import tempfile
-    
-    # Create temporary spectrogram
-    temp_dir = os.path.join(os.path.dirname(audio_path), "temp_predict")
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_img_path = os.path.join(temp_dir, "temp_spec.png")
-    
-    try:
-        # Process audio to spectrogram
-        success = create_spectrogram(audio_path, temp_img_path)
-        if not success:
-            raise Exception("Failed to create spectrogram")
-        
-        # Load and preprocess image
-        img = image.load_img(temp_img_path, target_size=(224, 224))
-        img_array = image.img_to_array(img) / 255.0
-        img_batch = np.expand_dims(img_array, axis=0)
-        
-        # Predict
-        prediction = model.predict(img_batch, verbose=0)[0][0]
-        
-        # Binary classification: 0 = Safe, 1 = Danger
-        class_idx = 1 if prediction > 0.5 else 0
-        confidence = abs(prediction - 0.5) * 2  # Convert to [0, 1] confidence
-        
-        return {
-            'prediction': int(class_idx),
-            'class': 'danger' if class_idx == 1 else 'safe',
-            'confidence': float(confidence),
-            'probability': float(prediction)  # Raw probability (0=Safe, 1=Danger)
-        }
-    finally:
-        # Clean up temp file
-        try:
-            if os.path.exists(temp_img_path):
-                os.remove(temp_img_path)
-        except:
-            pass
-
-def predict_batch(model, audio_paths):
+    # Spectrogram rendered in memory (same pixels as the training PNGs)
+    img_array = audio_to_array(audio_path)
+    if img_array is None:
+        raise Exception("Failed to create spectrogram")
+
+    prediction = model.predict(img_array[np.newaxis], verbose=0)[0][0]
+    return _result_from_probability(prediction)
+
+
+def _featurize_source(source):
+    """Decode one file (path or raw bytes) and render its uint8 spectrogram image."""
+    if isinstance(source, (bytes, bytearray)):
+        y = load_audio_bytes(bytes(source))
+    else:
+        y = load_audio(str(source))
+    return render_spectrogram(compute_mel_spectrogram_db(y))
+
+
+def iter_predict_batch(model, audio_sources, batch_size=None, num_workers=None,
+                       predict_fn=None):
+    """
+    Score many files, yielding results as each model batch completes.
+
+    Files are decoded and featurized on num_workers threads while earlier
+    batches run through the model; at most two batches of featurized files
+    are held in memory, so audio_sources can be a lazy iterator of any size.
+
+    Args:
+        model: Trained Keras model (unused if predict_fn is given)
+        audio_sources: Iterable of paths or raw file bytes
+        batch_size: Files per model call (default: PREDICT_BATCH_SIZE)
+        num_workers: Decode/featurize threads (default: PREDICT_DECODE_WORKERS)
+        predict_fn: Optional callable mapping an (N, 224, 224, 3) batch to
+            N danger probabilities, used instead of model.predict
+
+    Yields:
+        (index, result, error) in completion order, where index is the
+        position in audio_sources, result the prediction dict (None on
+        failure) and error the failure message (None on success)
+    """
+    batch_size = batch_size or PREDICT_BATCH_SIZE
+    num_workers = num_workers or PREDICT_DECODE_WORKERS
+    if predict_fn is None:
+        predict_fn = lambda x: model.predict(x, verbose=0)[:, 0]
+
+    sources = enumerate(audio_sources)
+    in_flight = {}  # future -> index
+    ready = []  # (index, uint8 image) waiting for the model
+
+    with ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix='featurize') as pool:
+        def fill():
+            while len(in_flight) < 2 * batch_size:
+                try:
+                    index, source = next(sources)
+                except StopIteration:
+                    return
+                in_flight[pool.submit(_featurize_source, source)] = index
+
+        fill()
+        while in_flight or ready:
+            if in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = in_flight.pop(future)
+                    try:
+                        ready.append((index, future.result()))
+                    except Exception as e:
+                        yield index, None, str(e)
+                fill()
+
+            if len(ready) >= batch_size or (ready and not in_flight):
+                batch, ready = ready[:batch_size], ready[batch_size:]
+                x = np.stack([img for _, img in batch]).astype(np.float32) / 255.0
+                try:
+                    scores = predict_fn(x)
+                except Exception as e:
+                    for index, _ in batch:
+                        yield index, None, str(e)
+                    continue
+                for (index, _), score in zip(batch, scores):
+                    yield index, _result_from_probability(score), None
+
+
+def predict_batch(model, audio_paths, batch_size=None, num_workers=None):
     """
     Make predictions on multiple audio files.
     
     Args:
         model: Trained Keras model
         audio_paths: List of paths to audio files
+        batch_size: Files per model call (default: PREDICT_BATCH_SIZE)
+        num_workers: Decode/featurize threads (default: PREDICT_DECODE_WORKERS)
     
     Returns:
-        List of prediction dictionaries
+        List of prediction dictionaries aligned with audio_paths (None for
+        files that could not be processed)
     """
-    results = []
-    for audio_path in audio_paths:
-        try:
-            result = predict_audio(model, audio_path)
-            results.append(result)
-        except Exception as e:
-            print(f"Error predicting {audio_path}: {e}")
-            results.append(None)
+    results = [None] * len(audio_paths)
+    for index, result, error in iter_predict_batch(
+        model, audio_paths, batch_size=batch_size, num_workers=num_workers
+    ):
+        if error is not None:
+            print(f"Error predicting {audio_paths[index]}: {error}")
+        results[index] = result
     return results
 
+
+def predict_long_audio(model, audio_source, hop_seconds=None, batch_size=None,
+                       predict_fn=None):
+    """
+    Score a recording of any length with overlapping DURATION-second windows.
+
+    The file is stream-decoded, silent windows are skipped by an RMS energy
+    gate and the rest are scored batch_size windows at a time, so memory use
+    does not depend on the recording length.
+
+    Args:
+        model: Trained Keras model (unused if predict_fn is given)
+        audio_source: Path, file-like object or raw bytes of the recording
+        hop_seconds: Distance between window starts (default: LONG_AUDIO_HOP)
+        batch_size: Windows per model call (default: LONG_AUDIO_BATCH_SIZE)
+        predict_fn: Optional callable mapping an (N, 224, 224, 3) batch to
+            N danger probabilities, used instead of model.predict
+
+    Returns:
+        dict with the aggregate 'class', 'confidence' and 'probability' (the
+        highest window score), window counts and a per-window 'timeline'
+    """
+    hop_seconds = hop_seconds or LONG_AUDIO_HOP
+    batch_size = batch_size or LONG_AUDIO_BATCH_SIZE
+    if predict_fn is None:
+        predict_fn = lambda x: model.predict(x, verbose=0)[:, 0]
+
+    timeline = []
+    pending = []  # (timeline entry, waveform) waiting to be scored
+
+    def score_pending():
+        scores = predict_fn(waveforms_to_arrays(np.stack([w for _, w in pending])))
+        for (entry, _), score in zip(pending, scores):
+            entry['class'] = 'danger' if score > 0.5 else 'safe'
+            entry['probability'] = float(score)
+        pending.clear()
+
+    for start, waveform in iter_audio_windows(audio_source, hop_seconds=hop_seconds):
+        entry = {'start': round(start, 3), 'end': round(start + DURATION, 3)}
+        timeline.append(entry)
+        if np.sqrt(np.mean(np.square(waveform))) < SILENCE_RMS_THRESHOLD:
+            entry['class'] = 'silent'
+            entry['probability'] = None
+            continue
+        pending.append((entry, waveform))
+        if len(pending) >= batch_size:
+            score_pending()
+    if pending:
+        score_pending()
+
+    scores = [e['probability'] for e in timeline if e['probability'] is not None]
+    probability = max(scores) if scores else 0.0
+    class_idx = 1 if probability > 0.5 else 0
+
+    return {
+        'prediction': class_idx,
+        'class': 'danger' if class_idx == 1 else 'safe',
+        'confidence': float(abs(probability - 0.5) * 2),
+        'probability': float(probability),  # Highest window probability
+        'windows': len(timeline),
+        'scored_windows': len(scores),
+        'danger_windows': sum(1 for e in timeline if e['class'] == 'danger'),
+        'timeline': timeline,
+    }
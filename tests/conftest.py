@@ -0,0 +1,14 @@
+# tests/conftest.py
+"""
+Make the project importable the way the services run it: the repository
+root (backend.X / src.X imports) and backend/ (app-style top-level imports
+such as ``import database``).
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "backend")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,29 @@
+# tests/test_batching.py
+"""Failure handling of the /predict micro-batching queue."""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from backend.batching import MicroBatcher
+
+
+def sum_scores(x):
+    return x.reshape(len(x), -1).sum(axis=1)
+
+
+def test_batch_that_cannot_be_stacked_fails_without_stopping_the_batcher():
+    batcher = MicroBatcher(sum_scores, max_batch_size=4, max_wait_ms=50)
+
+    async def main():
+        results = await asyncio.gather(
+            batcher.submit(np.ones((2, 2))),
+            batcher.submit(np.ones((3, 3))),
+            return_exceptions=True,
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+        assert not batcher._task.done()
+        return await batcher.submit_many([np.ones((2, 2)), np.zeros((2, 2))])
+
+    assert asyncio.run(main()) == pytest.approx([4.0, 0.0])
@@ -0,0 +1,112 @@
+# tests/test_model_registry.py
+"""Publishing, switching, rolling back and pruning model registry versions."""
+
+import json
+import os
+
+import pytest
+
+from backend.model_registry import MODEL_FILENAME, LoadedModels, ModelRegistry
+
+
+def train(registry, val_accuracy=0.9):
+    """Stand-in for a training run: write a model and its metadata into staging."""
+    staging_path = registry.staging_model_path()
+    with open(staging_path, "wb") as f:
+        f.write(b"weights")
+    with open(staging_path.replace(".h5", "_metadata.json"), "w") as f:
+        json.dump({"last_val_accuracy": val_accuracy}, f)
+    return staging_path
+
+
+def publish_versions(registry, count):
+    parent = None
+    for _ in range(count):
+        parent = registry.publish(train(registry), parent=parent)
+        registry.set_current(parent)
+    return registry.versions()
+
+
+def test_publish_numbers_versions_without_switching(tmp_path):
+    registry = ModelRegistry(tmp_path)
+    first = registry.publish(train(registry))
+    second = registry.publish(train(registry, val_accuracy=0.95), parent=first)
+
+    assert (first, second) == ("v0001", "v0002")
+    assert registry.versions() == ["v0001", "v0002"]
+    assert registry.current_version() is None
+    metadata = registry.metadata(second)
+    assert metadata["parent_version"] == first and metadata["last_val_accuracy"] == 0.95
+    assert os.path.exists(registry.model_path(second))
+
+
+def test_staging_and_checkpoint_directories_are_not_versions(tmp_path):
+    registry = ModelRegistry(tmp_path)
+    registry.discard(train(registry))
+    train(registry)
+    registry.checkpoint_dir("job-1")
+
+    assert registry.versions() == []
+    assert registry.publish(train(registry)) == "v0001"
+
+
+def test_set_current_and_roll_back(tmp_path):
+    registry = ModelRegistry(tmp_path, keep=5)
+    publish_versions(registry, 3)
+    assert registry.current_version() == "v0003"
+
+    previous = registry.previous_version("v0003")
+    registry.set_current(previous)
+    assert registry.current_version() == "v0002"
+    assert registry.previous_version("v0001") is None
+    assert registry.previous_version("v0042") is None
+    # Reopening the registry (another worker) follows CURRENT
+    assert ModelRegistry(tmp_path).current_version() == "v0002"
+
+    with pytest.raises(KeyError):
+        registry.set_current("v0042")
+    assert registry.current_version() == "v0002"
+
+
+def test_prune_keeps_the_newest_versions_and_the_current_one(tmp_path):
+    registry = ModelRegistry(tmp_path, keep=2)
+    publish_versions(registry, 3)
+    assert registry.versions() == ["v0002", "v0003"]
+
+    registry.set_current("v0002")
+    registry.publish(train(registry), parent="v0002")
+    registry.publish(train(registry), parent="v0002")
+    registry.prune()
+    assert registry.versions() == ["v0002", "v0004", "v0005"]
+    assert registry.current_version() == "v0002"
+
+
+def test_import_seeds_an_empty_registry_once(tmp_path):
+    deployed = tmp_path / "deployed" / MODEL_FILENAME
+    deployed.parent.mkdir()
+    deployed.write_bytes(b"weights")
+    deployed.with_name("sentinel_model.tflite").write_bytes(b"tflite")
+
+    registry = ModelRegistry(tmp_path / "registry")
+    assert registry.import_model(str(deployed)) == "v0001"
+    assert registry.current_version() == "v0001"
+    assert os.path.exists(registry.model_path("v0001").replace(".h5", ".tflite"))
+    assert registry.metadata("v0001")["parent_version"] is None
+
+    assert registry.import_model(str(deployed)) == "v0001"
+    assert registry.versions() == ["v0001"]
+
+
+def test_loaded_models_stay_within_the_memory_budget():
+    loaded = LoadedModels(max_bytes=100)
+    loaded.put("v0001", "model 1", 40)
+    loaded.put("v0002", "model 2", 40)
+    assert loaded.get("v0001") == "model 1"  # Now the most recently used
+
+    loaded.put("v0003", "model 3", 40)
+    assert loaded.versions() == ["v0001", "v0003"]
+    assert loaded.get("v0002") is None
+
+    # The newest entry is kept even when it alone exceeds the budget
+    loaded.put("v0004", "model 4", 500)
+    assert loaded.versions() == ["v0004"]
@@ -0,0 +1,169 @@
+# tests/test_prediction_cache.py
+"""Caching and in-flight request coalescing of the /predict result cache."""
+
+import asyncio
+import io
+
+import pytest
+
+from backend.prediction_cache import PredictionCache
+
+
+class SlowCompute:
+    """compute() for get_or_compute that counts calls and waits to be released."""
+
+    def __init__(self, result="danger"):
+        self.result = result
+        self.calls = 0
+        self.release = None
+        self.cancelled = False
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def run_concurrently(cache, key, compute, callers, **kwargs):
+    """Start several identical requests, release the computation, gather them."""
+
+    async def main():
+        compute.release = asyncio.Event()
+        tasks = [
+            asyncio.ensure_future(cache.get_or_compute(key, compute, **kwargs))
+            for _ in range(callers)
+        ]
+        await asyncio.sleep(0)
+        compute.release.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    return asyncio.run(main())
+
+
+def test_concurrent_identical_requests_compute_once():
+    cache = PredictionCache(max_entries=8, ttl_seconds=60)
+    compute = SlowCompute()
+
+    assert run_concurrently(cache, "clip", compute, callers=5) == ["danger"] * 5
+    assert compute.calls == 1
+    metrics = cache.metrics()
+    assert (metrics["misses"], metrics["coalesced"], metrics["in_flight"]) == (1, 4, 0)
+
+    # Later requests are served from the cache
+    assert run_concurrently(cache, "clip", compute, callers=1) == ["danger"]
+    assert compute.calls == 1 and cache.hits == 1
+
+
+def test_different_keys_are_not_coalesced():
+    cache = PredictionCache(max_entries=8, ttl_seconds=60)
+    compute = SlowCompute()
+
+    async def main():
+        compute.release = asyncio.Event()
+        tasks = [asyncio.ensure_future(cache.get_or_compute(key, compute)) for key in ("a", "b")]
+        await asyncio.sleep(0)
+        compute.release.set()
+        return await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert compute.calls == 2
+
+
+def test_failures_reach_every_caller_and_are_not_cached():
+    cache = PredictionCache(max_entries=8, ttl_seconds=60)
+    compute = SlowCompute(result=RuntimeError("model crashed"))
+
+    results = run_concurrently(cache, "clip", compute, callers=3)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert compute.calls == 1
+
+    compute.result = "safe"
+    assert run_concurrently(cache, "clip", compute, callers=1) == ["safe"]
+    assert compute.calls == 2
+
+
+def test_uncacheable_results_are_shared_but_not_stored():
+    cache = PredictionCache(max_entries=8, ttl_seconds=60)
+    compute = SlowCompute(result={"error": "queue full"})
+
+    def cacheable(result):
+        return "error" not in result
+
+    results = run_concurrently(cache, "clip", compute, callers=3, cacheable=cacheable)
+    assert results == [{"error": "queue full"}] * 3
+    assert compute.calls == 1
+    assert cache.metrics()["entries"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    cache = PredictionCache(max_entries=8, ttl_seconds=60)
+    compute = SlowCompute()
+
+    async def main():
+        compute.release = asyncio.Event()
+        first = asyncio.ensure_future(cache.get_or_compute("clip", compute))
+        second = asyncio.ensure_future(cache.get_or_compute("clip", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        compute.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "danger"
+    assert compute.calls == 1 and not compute.cancelled
+
+
+def test_computation_is_cancelled_once_every_caller_is_gone():
+    cache = PredictionCache(max_entries=8, ttl_seconds=60)
+    compute = SlowCompute()
+
+    async def main():
+        compute.release = asyncio.Event()
+        callers = [asyncio.ensure_future(cache.get_or_compute("clip", compute)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert compute.cancelled
+    assert cache.metrics()["in_flight"] == 0 and cache.metrics()["entries"] == 0
+
+
+def test_expired_and_evicted_entries_are_recomputed():
+    compute = SlowCompute()
+    expired = PredictionCache(max_entries=8, ttl_seconds=0)
+    run_concurrently(expired, "clip", compute, callers=1)
+    run_concurrently(expired, "clip", compute, callers=1)
+    assert compute.calls == 2
+
+    compute = SlowCompute()
+    small = PredictionCache(max_entries=1, ttl_seconds=60)
+    for key in ("a", "b", "a"):
+        run_concurrently(small, key, compute, callers=1)
+    assert compute.calls == 3 and small.evictions == 2
+
+
+def test_keys_depend_on_content_model_version_and_variant():
+    key = PredictionCache.key_for(b"clip", 1)
+    assert key == PredictionCache.key_for(b"clip", 1)
+    assert key != PredictionCache.key_for(b"other clip", 1)
+    assert key != PredictionCache.key_for(b"clip", 2)
+    assert key != PredictionCache.key_for(b"clip", 1, variant="long")
+
+
+def test_file_keys_match_byte_keys_and_rewind():
+    data = bytes(range(256)) * 5000
+    upload = io.BytesIO(data)
+    key = PredictionCache.key_for_file(upload, 3, variant="long", chunk_size=4096)
+    assert key == PredictionCache.key_for(data, 3, variant="long")
+    assert upload.tell() == 0
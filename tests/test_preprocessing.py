@@ -0,0 +1,62 @@
+# tests/test_preprocessing.py
+"""Parity of the batched mel-spectrogram engine with the librosa path it replaced."""
+
+import librosa
+import numpy as np
+import pytest
+
+from backend.preprocessing import (
+    DURATION,
+    FFT_CHUNK_SIZE,
+    FMAX,
+    N_MELS,
+    SAMPLE_RATE,
+    batch_mel_spectrogram_db,
+    compute_mel_spectrogram_db,
+)
+
+# Maximum allowed difference in dB against librosa (float32 FFT round-off)
+PARITY_TOLERANCE_DB = 0.01
+
+
+def librosa_mel_db(y):
+    mel = librosa.feature.melspectrogram(y=y, sr=SAMPLE_RATE, n_mels=N_MELS, fmax=FMAX)
+    return librosa.power_to_db(mel, ref=np.max)
+
+
+def make_waveforms(n, seed=0):
+    """Noisy chirps, so every mel band carries energy."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(SAMPLE_RATE * DURATION)) / SAMPLE_RATE
+    freqs = rng.uniform(100, 4000, size=(n, 1))
+    tones = np.sin(2 * np.pi * freqs * t * (1 + t / DURATION))
+    noise = rng.uniform(0.01, 0.2, size=(n, 1)) * rng.standard_normal((n, t.size))
+    return (0.5 * tones + noise).astype(np.float32)
+
+
+def test_single_clip_matches_librosa():
+    y = make_waveforms(1, seed=1)[0]
+    ours = compute_mel_spectrogram_db(y)
+    reference = librosa_mel_db(y)
+
+    assert ours.shape == reference.shape
+    np.testing.assert_allclose(ours, reference, atol=PARITY_TOLERANCE_DB, rtol=0)
+
+
+@pytest.mark.parametrize("n", [3, FFT_CHUNK_SIZE + 5])
+def test_batch_matches_librosa(n):
+    waveforms = make_waveforms(n, seed=n)
+    ours = batch_mel_spectrogram_db(waveforms)
+    reference = np.stack([librosa_mel_db(y) for y in waveforms])
+
+    assert ours.shape == reference.shape
+    np.testing.assert_allclose(ours, reference, atol=PARITY_TOLERANCE_DB, rtol=0)
+
+
+def test_batch_is_per_clip():
+    """Each clip is scaled to its own maximum, regardless of its batch neighbours."""
+    waveforms = make_waveforms(4, seed=2)
+    waveforms[1] *= 0.01
+    batched = batch_mel_spectrogram_db(waveforms)
+    for i, y in enumerate(waveforms):
+        np.testing.assert_allclose(batched[i], compute_mel_spectrogram_db(y), atol=1e-4, rtol=0)
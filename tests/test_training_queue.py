@@ -0,0 +1,209 @@
+# tests/test_training_queue.py
+"""Claiming, requeueing and ownership rules of the database training queue."""
+
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import (
+    Base,
+    RetrainingSession,
+    TrainingJob,
+    add_missing_columns,
+    cancel_training_job,
+    claim_training_job,
+    create_retraining_session,
+    enqueue_training_job,
+    finish_training_job,
+    heartbeat_training_job,
+    release_training_job,
+    requeue_stale_training_jobs,
+    training_cancel_requested,
+)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Sessions on a fresh SQLite queue, shared by threads like the worker's."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'queue.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+def enqueue(db, key, session_id=None):
+    job, _ = enqueue_training_job(
+        db, "retrain", json.dumps({"epochs": 1}), key, session_id=session_id
+    )
+    return job
+
+
+def make_stale(db, job_id):
+    db.query(TrainingJob).filter(TrainingJob.id == job_id).update(
+        {"heartbeat_at": datetime.utcnow() - timedelta(minutes=10)}
+    )
+    db.commit()
+
+
+def test_duplicate_submissions_coalesce_while_active(db):
+    job, created = enqueue_training_job(db, "retrain", "{}", "upload-1")
+    duplicate, duplicate_created = enqueue_training_job(db, "retrain", "{}", "upload-1")
+    assert created and not duplicate_created
+    assert duplicate.id == job.id
+
+    finish_training_job(db, job.id, None, "completed")
+    again, created_again = enqueue_training_job(db, "retrain", "{}", "upload-1")
+    assert created_again and again.id != job.id
+
+
+def test_concurrent_workers_claim_each_job_once(session_factory, db):
+    job_ids = {enqueue(db, f"upload-{i}").id for i in range(3)}
+    claims = []
+    start = threading.Barrier(6)
+
+    def worker(worker_id):
+        session = session_factory()
+        try:
+            start.wait()
+            while (job := claim_training_job(session, worker_id)) is not None:
+                claims.append((job.id, worker_id))
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker, args=(f"worker-{i}",)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(job_id for job_id, _ in claims) == sorted(job_ids)
+    for job_id, worker_id in claims:
+        job = db.get(TrainingJob, job_id)
+        db.refresh(job)
+        assert (job.status, job.worker_id, job.attempts) == ("running", worker_id, 1)
+
+
+def test_claim_fails_jobs_out_of_attempts(db):
+    job = enqueue(db, "upload-1")
+    for _ in range(2):
+        assert claim_training_job(db, "worker-a", max_attempts=2).id == job.id
+        make_stale(db, job.id)
+        assert requeue_stale_training_jobs(db, stale_seconds=60) == 1
+
+    assert claim_training_job(db, "worker-a", max_attempts=2) is None
+    db.refresh(job)
+    assert job.status == "failed" and job.active_key is None
+
+
+def test_release_does_not_count_the_attempt(db):
+    job = enqueue(db, "upload-1")
+    claim_training_job(db, "worker-a")
+    release_training_job(db, job.id, "worker-a")
+    db.refresh(job)
+    assert (job.status, job.worker_id, job.attempts) == ("queued", None, 0)
+
+
+def test_requeued_job_no_longer_belongs_to_its_old_worker(db):
+    job = enqueue(db, "upload-1")
+    claim_training_job(db, "worker-a")
+    assert heartbeat_training_job(db, job.id, "worker-a", progress=40)
+
+    make_stale(db, job.id)
+    assert requeue_stale_training_jobs(db, stale_seconds=60) == 1
+    reclaimed = claim_training_job(db, "worker-b")
+    assert reclaimed.id == job.id and reclaimed.attempts == 2
+
+    assert not heartbeat_training_job(db, job.id, "worker-a")
+    assert not finish_training_job(db, job.id, "worker-a", "completed", result_version="v0002")
+    db.refresh(job)
+    assert (job.status, job.worker_id, job.result_version) == ("running", "worker-b", None)
+
+    assert finish_training_job(db, job.id, "worker-b", "completed", result_version="v0002")
+    db.refresh(job)
+    assert (job.status, job.active_key, job.progress) == ("completed", None, 100)
+
+
+def test_fresh_heartbeats_are_not_requeued(db):
+    job = enqueue(db, "upload-1")
+    claim_training_job(db, "worker-a")
+    assert requeue_stale_training_jobs(db, stale_seconds=60) == 0
+    db.refresh(job)
+    assert job.status == "running"
+
+
+def test_cancel_queued_job_takes_effect_at_once(db):
+    job = enqueue(db, "upload-1", session_id=7)
+    cancelled = cancel_training_job(db, 7)
+    assert cancelled.id == job.id
+    assert (cancelled.status, cancelled.active_key) == ("cancelled", None)
+    assert claim_training_job(db, "worker-a") is None
+    assert cancel_training_job(db, 8) is None
+
+
+def test_cancel_running_job_is_left_to_its_worker(db):
+    job = enqueue(db, "upload-1", session_id=7)
+    claim_training_job(db, "worker-a")
+    assert not training_cancel_requested(db, 7)
+
+    cancelled = cancel_training_job(db, 7)
+    assert cancelled.status == "running" and cancelled.cancel_requested
+    assert training_cancel_requested(db, 7)
+
+    # Its worker died: the stale job is cancelled rather than run again
+    make_stale(db, job.id)
+    requeue_stale_training_jobs(db, stale_seconds=60)
+    db.refresh(job)
+    assert job.status == "cancelled"
+    assert claim_training_job(db, "worker-b") is None
+
+
+def test_heartbeat_progress_reaches_the_session(db):
+    session = create_retraining_session(db, upload_id=None, epochs=3)
+    job = enqueue(db, "upload-1", session_id=session.id)
+    claim_training_job(db, "worker-a")
+
+    assert heartbeat_training_job(db, job.id, "worker-a", progress=40, message="Epoch 2/3")
+    db.refresh(session)
+    assert (session.progress, session.progress_message) == (40, "Epoch 2/3")
+    assert session.heartbeat_at is not None
+
+    # A worker that lost the job no longer moves the session either
+    make_stale(db, job.id)
+    requeue_stale_training_jobs(db, stale_seconds=60)
+    assert not heartbeat_training_job(db, job.id, "worker-a", progress=90)
+    db.refresh(session)
+    assert session.progress == 40
+
+
+def test_missing_columns_are_added_to_existing_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(
+            text("CREATE TABLE retraining_sessions (id INTEGER PRIMARY KEY, status VARCHAR(50))")
+        )
+        conn.execute(text("INSERT INTO retraining_sessions (id, status) VALUES (1, 'completed')"))
+    Base.metadata.create_all(bind=engine)
+
+    add_missing_columns(engine)
+    columns = {column["name"] for column in inspect(engine).get_columns("retraining_sessions")}
+    assert {"progress", "progress_message", "heartbeat_at", "final_accuracy"} <= columns
+
+    session = sessionmaker(bind=engine)()
+    assert session.get(RetrainingSession, 1).status == "completed"
+    session.close()
+    add_missing_columns(engine)  # Idempotent
+    engine.dispose()